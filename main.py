@@ -22,6 +22,7 @@ TOTP密码管理器主程序
 
 import sys
 import base64
+import multiprocessing
 from typing import NoReturn
 
 from PySide6.QtWidgets import QApplication
@@ -29,7 +30,6 @@ from PySide6.QtGui import QIcon, QPixmap
 
 from src.ui.main_window import MainWindow
 from src.core.totp_manager import TOTPManager
-from src.core.encryption import EncryptionManager
 from src.utils.config import ConfigManager
 
 from load_icon_data import ICON_BASE64
@@ -53,14 +53,11 @@ class TOTPApp:
         except Exception as e:
             print(f"设置应用图标失败: {e}")
         
-        # 初始化配置管理器
-        self.config = ConfigManager()
+        # 初始化配置管理器（整个应用共用这一份配置）
+        self.config = ConfigManager.shared()
         
-        # 初始化加密管理器
-        self.encryption = EncryptionManager()
-        
-        # 初始化TOTP管理器
-        self.totp_manager = TOTPManager()
+        # 初始化TOTP管理器（加密管理器由它创建）
+        self.totp_manager = TOTPManager(config=self.config)
         
         # 创建主窗口
         self.main_window = MainWindow(self.totp_manager)
@@ -68,7 +65,10 @@ class TOTPApp:
     def run(self):
         """运行应用"""
         self.main_window.show()
-        return self.app.exec()
+        result = self.app.exec()
+        # 退出前写入延迟保存的修改
+        self.totp_manager.flush()
+        return result
 
 
 def main():
@@ -82,4 +82,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序在修改密码时会启动工作进程
+    multiprocessing.freeze_support()
     main()
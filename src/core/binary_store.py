@@ -0,0 +1,284 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+二进制保险库存储模块
+快照使用带版本号的二进制容器：固定长度的文件头、定长记录组成的偏移表和数据区。
+读取时通过mmap直接按偏移切片，列出元数据不需要解析或复制密文；修改仍追加到日志
+"""
+
+import base64
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.journal_store import JournalStore, load_for_import, migrate_legacy
+
+MAGIC = b"TOTPVLT\x00"
+FORMAT_VERSION = 1
+
+# 文件头：魔数、格式版本、保留、条目数、元数据长度
+HEADER = struct.Struct("<8sHHII")
+# 偏移表记录：创建时间、条目在数据区的偏移、6个字段的长度
+RECORD = struct.Struct("<dI6I")
+# 同一条目的字段在数据区中按此顺序相邻存放；密文和盐值直接保存原始字节，不再做base64编码
+FIELDS = ("id", "name", "issuer", "icon", "encrypted_key", "salt")
+# 原始记录元组的字段顺序（与TOTPEntry.to_record一致）
+RECORD_FIELDS = FIELDS + ("created_time",)
+
+
+def record_from_dict(entry_data: Dict, secrets: bool = True) -> Tuple:
+    """条目字典（密文为base64）转换为原始记录元组；secrets为False时不转换密文和盐值（对应字段为None）"""
+    encrypted_key = entry_data.get("encrypted_key") if secrets else None
+    salt = entry_data.get("salt") if secrets else None
+    return (entry_data.get("id") or "", entry_data.get("name") or "", entry_data.get("issuer") or "",
+            entry_data.get("icon") or "", base64.b64decode(encrypted_key) if encrypted_key else None,
+            base64.b64decode(salt) if salt else None, entry_data.get("created_time") or 0)
+
+
+def record_to_dict(record: Tuple, secrets: bool = True) -> Dict:
+    """原始记录元组转换为条目字典；secrets为False时不包含密文和盐值"""
+    entry_id, name, issuer, icon, encrypted_key, salt, created_time = record
+    entry_data = {"id": entry_id, "name": name, "issuer": issuer, "icon": icon, "created_time": created_time}
+    if secrets:
+        entry_data["encrypted_key"] = base64.b64encode(encrypted_key).decode() if encrypted_key else None
+        entry_data["salt"] = base64.b64encode(salt).decode() if salt else None
+    return entry_data
+
+
+def encode_records(meta: Dict, records: Iterable[Tuple]) -> bytes:
+    """把元数据和原始记录元组编码为二进制容器，密文原样写入数据区"""
+    table = bytearray()
+    blobs = bytearray()
+    count = 0
+    for entry_id, name, issuer, icon, encrypted_key, salt, created_time in records:
+        fields = (entry_id.encode('utf-8'), name.encode('utf-8'), issuer.encode('utf-8'),
+                  icon.encode('utf-8'), encrypted_key or b"", salt or b"")
+        table += RECORD.pack(float(created_time or 0), len(blobs), *map(len, fields))
+        blobs += b"".join(fields)
+        count += 1
+    
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, len(meta_bytes))
+    return b"".join((header, meta_bytes, bytes(table), bytes(blobs)))
+
+
+def encode_vault(data: Dict) -> bytes:
+    """把数据字典编码为二进制容器：条目可以是原始记录元组（records），或格式同JSON数据文件的条目字典（entries）"""
+    meta = {key: value for key, value in data.items() if key not in ("entries", "records")}
+    if "records" in data:
+        return encode_records(meta, data["records"])
+    return encode_records(meta, (record_from_dict(entry_data) for entry_data in data.get("entries", [])))
+
+
+class VaultView:
+    """只读的保险库文件视图（按需切片读取字段，不复制整个文件）"""
+    
+    def __init__(self, buffer):
+        self.buffer = buffer
+        try:
+            magic, version, _, self.count, meta_length = HEADER.unpack_from(buffer, 0)
+        except struct.error as e:
+            raise ValueError(f"保险库文件不完整: {e}")
+        if magic != MAGIC:
+            raise ValueError("不是保险库文件")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的保险库文件版本: {version}")
+        
+        self.table_offset = HEADER.size + meta_length
+        self.blob_offset = self.table_offset + self.count * RECORD.size
+        if self.blob_offset > len(buffer):
+            raise ValueError("保险库文件不完整")
+        self.meta = json.loads(buffer[HEADER.size:self.table_offset].decode('utf-8'))
+    
+    def raw_record(self, index: int, secrets: bool = True) -> Tuple:
+        """读取第index条原始记录元组；secrets为False时不读取密文和盐值（对应字段为None）"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self._slice(RECORD.unpack_from(self.buffer, self.table_offset + index * RECORD.size), secrets)
+    
+    def raw_records(self, secrets: bool = True) -> Iterator[Tuple]:
+        """按顺序遍历原始记录元组（可直接交给TOTPEntry.from_record）"""
+        table = self.buffer[self.table_offset:self.blob_offset]
+        for values in RECORD.iter_unpack(table):
+            yield self._slice(values, secrets)
+    
+    def record(self, index: int, secrets: bool = True) -> Dict:
+        """读取第index条记录，转换为条目字典"""
+        return record_to_dict(self.raw_record(index, secrets), secrets)
+    
+    def records(self, secrets: bool = True) -> Iterator[Dict]:
+        """按顺序遍历记录，转换为条目字典"""
+        for record in self.raw_records(secrets):
+            yield record_to_dict(record, secrets)
+    
+    def _slice(self, values: tuple, secrets: bool) -> Tuple:
+        """按偏移表记录切出字段（同一条目的字段在数据区中相邻，只需切片一次）"""
+        created_time, offset, id_length, name_length, issuer_length, icon_length, key_length, salt_length = values
+        start = self.blob_offset + offset
+        name_start = id_length
+        issuer_start = name_start + name_length
+        icon_start = issuer_start + issuer_length
+        key_start = icon_start + icon_length
+        salt_start = key_start + key_length
+        end = start + (salt_start + salt_length if secrets else key_start)
+        if end > len(self.buffer):
+            raise ValueError("保险库文件不完整")
+        
+        chunk = self.buffer[start:end]
+        encrypted_key = salt = None
+        if secrets:
+            encrypted_key = chunk[key_start:salt_start] or None
+            salt = chunk[salt_start:] or None
+        return (chunk[:name_start].decode('utf-8'), chunk[name_start:issuer_start].decode('utf-8'),
+                chunk[issuer_start:icon_start].decode('utf-8'), chunk[icon_start:key_start].decode('utf-8'),
+                encrypted_key, salt, created_time)
+
+
+@contextmanager
+def open_vault(path: Path) -> Iterator[VaultView]:
+    """以mmap方式只读打开保险库文件"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("保险库文件为空")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield VaultView(buffer)
+
+
+class BinaryVaultStore(JournalStore):
+    """二进制快照 + 追加日志存储类
+    
+    文件布局：文件头 | 元数据JSON（version、keyring、seq等） | 偏移表 | 数据区。
+    日志格式与JournalStore相同，只有快照文件的编码不同
+    """
+    
+    PARTIAL_SNAPSHOT_READ = True
+    RAW_RECORDS = True
+    
+    def __init__(self, path: Path, compact_threshold: int = 1000, legacy_path: Optional[Path] = None):
+        super().__init__(path, compact_threshold)
+        # 日志放在 totp_data.vault.journal，避免与JSON数据文件的日志重名
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+    
+    def exists(self) -> bool:
+        """检查快照或待迁移的JSON数据文件是否存在"""
+        return super().exists() or bool(self.legacy_path and self.legacy_path.exists())
+    
+    def has_data(self) -> bool:
+        """检查是否已有初始化过的保险库数据（读取快照清单，快照不存在时检查待迁移的JSON数据文件）
+        
+        快照存在但无法读取时也视为已有数据，不能被当作新保险库重新初始化
+        """
+        if not self.path.exists() and self.legacy_path and self.legacy_path.exists():
+            return JournalStore(self.legacy_path).has_data()
+        return super().has_data()
+    
+    def load_all(self) -> Dict:
+        """读取快照并重放日志（首次打开时先导入JSON数据文件）"""
+        self._migrate_legacy()
+        return super().load_all()
+    
+    def load_records(self, secrets: bool = True) -> Dict:
+        """同load_all（secrets为False时同load_index），但条目为原始记录元组，放在records中
+        
+        快照中的条目从mmap切片后直接交给TOTPEntry.from_record，只有日志中修改过的条目需要从字典转换
+        """
+        self._migrate_legacy()
+        return self._load(secrets, raw=True)
+    
+    def get_many_records(self, entry_ids: List[str]) -> Dict[str, Tuple]:
+        """同get_many，但返回原始记录元组"""
+        return self._get_many(entry_ids, raw=True)
+    
+    def list_metadata(self) -> List[Dict]:
+        """列出快照中的条目元数据，不读取密文"""
+        if not self.path.exists():
+            return []
+        with open_vault(self.path) as view:
+            return list(view.records(secrets=False))
+    
+    def _read_snapshot(self, secrets: bool = True) -> Dict:
+        """通过mmap读取快照（格式错误或与清单校验和不符时抛出ValueError）；secrets为False时不读取密文"""
+        with open_vault(self.path) as view:
+            self._verify_snapshot(view.meta, view.buffer)
+            data = dict(view.meta)
+            data["entries"] = list(view.records(secrets))
+        return data
+    
+    def _read_snapshot_records(self, secrets: bool = True) -> Dict:
+        """通过mmap读取快照，条目为原始记录元组（与清单校验和不符时抛出ValueError）"""
+        with open_vault(self.path) as view:
+            self._verify_snapshot(view.meta, view.buffer)
+            data = dict(view.meta)
+            data["records"] = list(view.raw_records(secrets))
+        return data
+    
+    def _record_from_dict(self, entry_data: Dict, secrets: bool = True) -> Tuple:
+        """日志中的条目字典转换为原始记录元组"""
+        return record_from_dict(entry_data, secrets)
+    
+    def _build_snapshot_index(self, entries: List) -> Dict:
+        """建立快照条目查找表：ID -> 偏移表中的位置（与快照中的条目顺序一致），条目可以是字典或原始记录元组"""
+        return {(entry[0] if isinstance(entry, tuple) else entry["id"]): position
+                for position, entry in enumerate(entries)}
+    
+    def _read_snapshot_entries(self, entry_ids: List[str], raw: bool = False) -> Dict:
+        """按位置从快照中切出指定条目；raw为True时返回原始记录元组"""
+        result = {}
+        if not self._snapshot_index:
+            return result
+        with open_vault(self.path) as view:
+            positions = self._snapshot_index
+            for entry_id in entry_ids:
+                position = positions.get(entry_id)
+                if position is None:
+                    continue
+                record = view.raw_record(position) if position < view.count else None
+                if record is None or record[0] != entry_id:
+                    # 后台压缩刚替换了快照、查找表还没更新时，按当前文件重新建立
+                    positions = self._build_snapshot_index(view.raw_records(secrets=False))
+                    position = positions.get(entry_id)
+                    if position is None:
+                        continue
+                    record = view.raw_record(position)
+                result[entry_id] = record if raw else record_to_dict(record)
+        return result
+    
+    def _encode_snapshot(self, data: Dict) -> bytes:
+        """编码为二进制容器"""
+        return encode_vault(data)
+    
+    def _migrate_legacy(self):
+        """快照不存在且有JSON数据文件时导入，导入后把旧文件改名保留
+        
+        JSON数据文件无法读取或导入失败时抛出IOError，不能当作空保险库继续
+        """
+        if self.path.exists() or not self.legacy_path or not self.legacy_path.exists():
+            return
+        migrate_legacy(self.legacy_path, self.write_snapshot)
+
+
+def convert_file(source: Path, target: Path) -> bool:
+    """在JSON数据文件和二进制保险库文件之间转换（按扩展名判断格式，.vault为二进制）"""
+    def open_store(path: Path) -> JournalStore:
+        return BinaryVaultStore(path) if Path(path).suffix == ".vault" else JournalStore(path)
+    
+    return open_store(target).write_snapshot(load_for_import(open_store(source)))
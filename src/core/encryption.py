@@ -22,57 +22,257 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import base64
 import hashlib
-import json
+import hmac
 import os
-from typing import Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
 from cryptography.fernet import Fernet
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from src.core import kdf
+from src.core.vault_store import VaultStore, create_store
 from src.utils.config import ConfigManager
 
 
 class EncryptionManager:
     """加密管理器类"""
     
-    def __init__(self):
-        self.config = ConfigManager()
+    # 独立密码的验证数据
+    PASSWORD_TEST_DATA = "totp_password_validation_2024"
+    
+    # 快速解锁PIN的KDF参数：故意保持廉价，安全性依赖尝试次数限制和只保存在内存中
+    QUICK_UNLOCK_KDF_PARAMS = {"algorithm": kdf.PBKDF2_SHA256, "iterations": 10000}
+    
+    def __init__(self, store: Optional[VaultStore] = None, config: Optional[ConfigManager] = None):
+        # 配置：未指定时使用进程内共享的实例
+        self.config = config if config is not None else ConfigManager.shared()
+        # 保险库存储，用于判断是否已有加密数据（未指定时按配置创建）
+        self.store = store
         self._fernet: Optional[Fernet] = None
         self._salt: Optional[bytes] = None
+        # 保险库数据密钥（Fernet格式），由主密码派生的密钥包装后存储
+        self._vault_key: Optional[bytes] = None
+        
+        # 会话级派生密钥缓存：(salt, KDF参数) -> Fernet，按LRU淘汰
+        # 只为当前会话的密码服务，锁定或clear()时清空
+        self._key_cache: "OrderedDict[Tuple[bytes, Tuple], Fernet]" = OrderedDict()
+        self._session_nonce = os.urandom(16)
+        self._session_digest: Optional[bytes] = None
+        
+        # 快速解锁记录：用PIN派生的密钥包装的会话密钥，只保存在内存中
+        self._quick_unlock: Optional[Dict] = None
     
     def _generate_salt(self) -> bytes:
         """生成随机盐值"""
         return os.urandom(16)
     
-    def _derive_key(self, password: str, salt: bytes) -> bytes:
+    def _legacy_kdf_params(self) -> Dict:
+        """旧格式条目（独立盐值）使用的KDF参数"""
+        return {
+            "algorithm": kdf.PBKDF2_SHA256,
+            "iterations": self.config.get("encryption.key_derivation_iterations", 100000)
+        }
+    
+    def _derive_key(self, password: str, salt: bytes, params: Optional[Dict] = None) -> bytes:
         """从密码派生密钥"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=self.config.get("encryption.key_derivation_iterations", 100000),
-            backend=default_backend()
-        )
-        return base64.urlsafe_b64encode(kdf.derive(password.encode()))
+        if params is None:
+            params = self._legacy_kdf_params()
+        return base64.urlsafe_b64encode(kdf.derive(password.encode(), salt, params))
+    
+    def _password_digest(self, password: str) -> bytes:
+        """计算密码的会话摘要（带随机密钥，不落盘）"""
+        return hashlib.blake2b(password.encode(), key=self._session_nonce, digest_size=32).digest()
+    
+    def _is_session_password(self, password: str) -> bool:
+        """判断密码是否为当前会话的密码"""
+        if self._session_digest is None:
+            return False
+        return hmac.compare_digest(self._password_digest(password), self._session_digest)
+    
+    def _begin_session(self, password: str):
+        """开始新的会话，密码变化时清空密钥缓存"""
+        if not self._is_session_password(password):
+            self._key_cache.clear()
+            self._session_digest = self._password_digest(password)
+    
+    def _end_session(self):
+        """结束会话并清空密钥缓存"""
+        self._key_cache.clear()
+        self._session_digest = None
+    
+    def _get_fernet(self, password: str, salt: bytes, params: Optional[Dict] = None) -> Fernet:
+        """获取派生密钥对应的Fernet实例，会话密码命中缓存时不再运行KDF"""
+        if params is None:
+            params = self._legacy_kdf_params()
+        
+        cache_key = (bytes(salt), kdf.params_key(params))
+        in_session = self._is_session_password(password)
+        if in_session:
+            fernet = self._key_cache.get(cache_key)
+            if fernet is not None:
+                self._key_cache.move_to_end(cache_key)
+                return fernet
+        
+        fernet = Fernet(self._derive_key(password, salt, params))
+        
+        # 只缓存当前会话密码派生的密钥，其他密码（例如验证错误密码）不进入缓存
+        if in_session:
+            self._key_cache[cache_key] = fernet
+            max_size = max(1, self.config.get("encryption.key_cache_size", 16))
+            while len(self._key_cache) > max_size:
+                self._key_cache.popitem(last=False)
+        return fernet
     
     def initialize_encryption(self, password: str) -> bool:
         """使用密码初始化加密系统"""
         try:
+            self._begin_session(password)
             self._salt = self._generate_salt()
-            key = self._derive_key(password, self._salt)
-            self._fernet = Fernet(key)
+            self._fernet = self._get_fernet(password, self._salt)
+            self._vault_key = None
             return True
         except Exception:
             return False
     
+    def create_vault_key(self, password: str) -> Optional[Dict]:
+        """生成随机的保险库数据密钥，返回用主密码包装后的密钥环"""
+        try:
+            self._begin_session(password)
+            self._vault_key = Fernet.generate_key()
+            self._fernet = Fernet(self._vault_key)
+            self._salt = None
+            return self.wrap_vault_key(password)
+        except Exception:
+            return None
+    
+    def wrap_vault_key(self, password: str) -> Optional[Dict]:
+        """用主密码派生的密钥包装当前数据密钥（修改密码时只需重新包装这32字节）"""
+        if not self._vault_key:
+            return None
+        
+        try:
+            # 与独立密码使用相同的盐值和KDF参数，解锁时一次派生即可同时完成验证和解包
+            salt = self.get_password_salt() or self._generate_salt()
+            params = self.get_password_kdf_params()
+            
+            return self._build_keyring(self._get_fernet(password, salt, params), salt, params)
+        except Exception:
+            return None
+    
+    def _build_keyring(self, wrapping_fernet: Fernet, salt: bytes, params: Dict,
+                       vault_key: Optional[bytes] = None) -> Dict:
+        """包装数据密钥（默认为当前数据密钥）并生成密钥环"""
+        wrapped_key = wrapping_fernet.encrypt(vault_key or self._vault_key)
+        
+        # 密钥环头部记录算法和参数，保险库可以独立于配置解锁
+        kdf_record = dict(params)
+        kdf_record["salt"] = base64.b64encode(salt).decode()
+        return {
+            "kdf": kdf_record,
+            "wrapped_key": wrapped_key.decode()
+        }
+    
+    def needs_kdf_upgrade(self, keyring: Dict, policy: Optional[Dict] = None) -> bool:
+        """检查密钥环使用的KDF参数是否弱于策略参数policy（为None时读取当前策略）"""
+        try:
+            _, params = self.get_keyring_kdf_params(keyring)
+            return kdf.is_weaker(params, policy or self.get_kdf_policy())
+        except Exception:
+            return False
+    
+    def upgrade_vault_key(self, password: str, policy: Optional[Dict] = None) -> Optional[Dict]:
+        """按策略参数policy（为None时读取当前策略）和新盐值重新包装数据密钥，返回新的密钥环
+        
+        只在当前会话内调用；密码记录需要在新密钥环写入数据文件后再用sync_password_record同步
+        """
+        if not self._vault_key or not self._is_session_password(password):
+            return None
+        
+        try:
+            salt = self._generate_salt()
+            params = kdf.normalize_params(policy) if policy else self.get_kdf_policy()
+            return self._build_keyring(self._get_fernet(password, salt, params), salt, params)
+        except Exception:
+            return None
+    
+    def prepare_rekey(self, new_password: str) -> Optional[Tuple[bytes, Dict, Fernet]]:
+        """生成新的数据密钥并用新密码包装，返回(数据密钥, 密钥环, 包装密钥)
+        
+        不改变当前状态，新的数据文件提交后再调用activate_vault_key切换
+        """
+        try:
+            salt = self._generate_salt()
+            params = self.get_kdf_policy()
+            new_vault_key = Fernet.generate_key()
+            wrapping_fernet = Fernet(self._derive_key(new_password, salt, params))
+            return new_vault_key, self._build_keyring(wrapping_fernet, salt, params, new_vault_key), wrapping_fernet
+        except Exception:
+            return None
+    
+    def activate_vault_key(self, password: str, vault_key: bytes, keyring: Dict, wrapping_fernet: Fernet):
+        """切换到新的数据密钥和会话密码，并同步密码记录（不再重复派生密钥）"""
+        self._end_session()
+        self._begin_session(password)
+        salt, params = self.get_keyring_kdf_params(keyring)
+        self._key_cache[(bytes(salt), kdf.params_key(params))] = wrapping_fernet
+        
+        self._fernet = Fernet(vault_key)
+        self._vault_key = vault_key
+        self._salt = None
+        self.sync_password_record(password, keyring)
+    
+    def get_vault_key(self) -> Optional[bytes]:
+        """获取当前的数据密钥（仅用于重新加密时交给工作进程）"""
+        return self._vault_key
+    
+    def sync_password_record(self, password: str, keyring: Dict) -> bool:
+        """让独立密码记录与密钥环使用相同的盐值和KDF参数
+        
+        密钥环是解锁的依据，密码记录只是它的副本；升级中途崩溃留下的旧记录在下次解锁时补齐。
+        会话缓存中已有密钥环的派生密钥，同步不会再次运行KDF
+        """
+        try:
+            salt, params = self.get_keyring_kdf_params(keyring)
+            record = self._get_password_record()
+            if record and record[0] == salt and record[1] == params:
+                return True
+            if not self._is_session_password(password):
+                return False
+            
+            self._store_password_record(self._get_fernet(password, salt, params), salt, params)
+            return True
+        except Exception:
+            return False
+    
+    def unwrap_vault_key(self, password: str, keyring: Dict) -> bool:
+        """用主密码解包保险库数据密钥"""
+        try:
+            salt, params = self.get_keyring_kdf_params(keyring)
+            
+            self._begin_session(password)
+            wrapping_fernet = self._get_fernet(password, salt, params)
+            vault_key = wrapping_fernet.decrypt(keyring["wrapped_key"].encode())
+            
+            self._fernet = Fernet(vault_key)
+            self._vault_key = vault_key
+            self._salt = None
+            return True
+        except Exception:
+            return False
+    
+    def get_keyring_kdf_params(self, keyring: Dict) -> Tuple[bytes, Dict]:
+        """读取密钥环头部记录的盐值和KDF参数"""
+        record = dict(keyring["kdf"])
+        salt = base64.b64decode(record.pop("salt"))
+        return salt, kdf.normalize_params(record)
+    
     def unlock(self, password: str, salt: bytes) -> bool:
         """使用密码解锁加密系统"""
         try:
+            self._begin_session(password)
             self._salt = salt
-            key = self._derive_key(password, salt)
-            self._fernet = Fernet(key)
+            self._fernet = self._get_fernet(password, salt)
+            self._vault_key = None
             return True
         except Exception:
             return False
@@ -114,9 +314,8 @@ class EncryptionManager:
     def decrypt_totp_key(self, encrypted_data: bytes, salt: bytes, password: str) -> Optional[str]:
         """解密TOTP密钥"""
         try:
-            # 使用提供的salt和密码重新派生密钥进行解密
-            key = self._derive_key(password, salt)
-            temp_fernet = Fernet(key)
+            # 使用提供的salt和密码获取密钥（会话密码命中缓存，不再重复派生）
+            temp_fernet = self._get_fernet(password, salt)
             decrypted = temp_fernet.decrypt(encrypted_data)
             return decrypted.decode()
         except Exception:
@@ -128,7 +327,11 @@ class EncryptionManager:
     
     def is_initialized(self) -> bool:
         """检查加密系统是否已初始化"""
-        return self._fernet is not None and self._salt is not None
+        return self._fernet is not None and (self._salt is not None or self._vault_key is not None)
+    
+    def has_vault_key(self) -> bool:
+        """检查是否已解包保险库数据密钥"""
+        return self._vault_key is not None
     
     def has_encrypted_data(self) -> bool:
         """检查是否存在已加密的数据（用于判断是否已经设置过密码）"""
@@ -136,19 +339,10 @@ class EncryptionManager:
         if self._has_password_set():
             return True
         
-        # 为了向后兼容，检查TOTP数据文件
-        from pathlib import Path
-        data_file = Path("data") / "totp_data.json"
-        if data_file.exists():
-            try:
-                with open(data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # 如果数据文件存在且包含版本信息，说明已经初始化过
-                    # 即使条目为空，只要文件存在就认为已经设置过密码
-                    return "version" in data
-            except (json.JSONDecodeError, IOError):
-                return False
-        return False
+        # 为了向后兼容，检查存储中是否已有初始化过的保险库
+        # 即使条目为空，只要存在版本信息就认为已经设置过密码
+        store = self.store if self.store is not None else create_store(self.config)
+        return store.has_data()
     
     def _has_password_set(self) -> bool:
         """检查是否已设置独立密码（通过配置）"""
@@ -157,82 +351,122 @@ class EncryptionManager:
     def set_password(self, password: str) -> bool:
         """设置独立的主密码（不依赖TOTP数据）"""
         try:
-            # 生成新的盐值用于密码验证
-            password_salt = self._generate_salt()
-            iterations = self.config.get("password.iterations", 100000)
-            
-            # 使用PBKDF2派生密码哈希
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=password_salt,
-                iterations=iterations,
-                backend=default_backend()
-            )
-            
-            # 派生密码哈希并创建Fernet密钥
-            password_hash = kdf.derive(password.encode())
-            fernet_key = base64.urlsafe_b64encode(password_hash)
-            test_fernet = Fernet(fernet_key)
-            
-            # 创建测试加密数据并存储
-            test_data = "totp_password_validation_2024"
-            encrypted_test_data = test_fernet.encrypt(test_data.encode())
+            # 校准结果和密码记录作为一个事务，只写入一次配置文件；中途失败时两者都不保存
+            with self.config.transaction():
+                # 生成新的盐值用于密码验证，KDF参数按当前策略（需要时在本机校准）
+                password_salt = self._generate_salt()
+                params = self.get_kdf_policy(recalibrate=True)
+                
+                # 派生密码密钥（进入会话缓存，随后包装数据密钥时不再重复派生）
+                self._begin_session(password)
+                test_fernet = self._get_fernet(password, password_salt, params)
+                
+                self._store_password_record(test_fernet, password_salt, params)
             
-            # 保存密码设置信息到配置
-            self.config.set("password.is_set", True)
-            self.config.set("password.salt", base64.b64encode(password_salt).decode())
-            self.config.set("password.iterations", iterations)
-            self.config.set("password.test_data", base64.b64encode(encrypted_test_data).decode())
+            # 同时初始化加密系统，以便后续使用（复用刚派生的密钥）
+            self._salt = password_salt
+            self._fernet = test_fernet
+            self._vault_key = None
             
-            # 同时初始化加密系统，以便后续使用
-            success = self.initialize_encryption(password)
-            
-            return success
+            return True
         except Exception:
             return False
     
+    def _store_password_record(self, test_fernet: Fernet, salt: bytes, params: Dict):
+        """创建测试加密数据，并把密码设置信息保存到配置（写入失败时抛出IOError）"""
+        encrypted_test_data = test_fernet.encrypt(self.PASSWORD_TEST_DATA.encode())
+        
+        # 作为一个事务写入，配置文件中不会出现新盐值配旧测试数据的记录
+        with self.config.transaction():
+            self.config.set("password.is_set", True)
+            self.config.set("password.salt", base64.b64encode(salt).decode())
+            self.config.set("password.kdf", params)
+            if params["algorithm"] == kdf.PBKDF2_SHA256:
+                self.config.set("password.iterations", params["iterations"])
+            self.config.set("password.test_data", base64.b64encode(encrypted_test_data).decode())
+    
+    def get_password_kdf_params(self) -> Dict:
+        """获取独立密码使用的KDF参数（旧配置只有迭代次数）"""
+        params = self.config.get("password.kdf")
+        if params:
+            return kdf.normalize_params(params)
+        return {"algorithm": kdf.PBKDF2_SHA256, "iterations": self.config.get("password.iterations", 100000)}
+    
+    def get_kdf_policy(self, recalibrate: bool = False) -> Dict:
+        """获取当前策略要求的KDF参数，开启自动校准时按目标解锁耗时在本机测速
+        
+        校准结果会写入共享配置，应在主线程调用；后台任务使用调用前取得的参数
+        """
+        algorithm = self.config.get("encryption.kdf_algorithm", kdf.PBKDF2_SHA256)
+        
+        if not self.config.get("encryption.kdf_auto_calibrate", True):
+            if algorithm == kdf.SCRYPT:
+                return kdf.normalize_params({"algorithm": kdf.SCRYPT})
+            return {
+                "algorithm": kdf.PBKDF2_SHA256,
+                "iterations": self.config.get("password.iterations", 100000)
+            }
+        
+        params = self.config.get("encryption.kdf_params")
+        if recalibrate or not params or params.get("algorithm") != algorithm:
+            params = kdf.calibrate(algorithm, self.config.get("encryption.kdf_target_ms", 250))
+            self.config.set("encryption.kdf_params", params)
+        return kdf.normalize_params(params)
+    
+    def _get_password_record(self) -> Optional[Tuple[bytes, Dict, bytes]]:
+        """读取独立密码的盐值、KDF参数和测试数据"""
+        if not self._has_password_set():
+            return None
+        
+        salt_b64 = self.config.get("password.salt")
+        test_data_b64 = self.config.get("password.test_data")
+        
+        if not salt_b64 or not test_data_b64:
+            return None
+        
+        return base64.b64decode(salt_b64), self.get_password_kdf_params(), base64.b64decode(test_data_b64)
+    
     def verify_password(self, password: str) -> bool:
         """验证独立存储的密码"""
         try:
-            # 检查是否已设置密码
-            if not self._has_password_set():
-                return False
-            
-            # 从配置中获取盐值、迭代次数和测试数据
-            salt_b64 = self.config.get("password.salt")
-            iterations = self.config.get("password.iterations", 100000)
-            test_data_b64 = self.config.get("password.test_data")
-            
-            if not salt_b64 or not test_data_b64:
+            # 检查是否已设置密码，并获取盐值、迭代次数和测试数据
+            record = self._get_password_record()
+            if not record:
                 return False
+            salt, params, encrypted_test_data = record
             
-            salt = base64.b64decode(salt_b64)
-            encrypted_test_data = base64.b64decode(test_data_b64)
-            
-            # 使用相同的参数派生密码哈希
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=iterations,
-                backend=default_backend()
-            )
-            
-            # 派生密码哈希并创建Fernet密钥
-            password_hash = kdf.derive(password.encode())
-            fernet_key = base64.urlsafe_b64encode(password_hash)
-            
-            # 尝试解密测试数据
-            test_fernet = Fernet(fernet_key)
+            # 使用相同的参数派生密钥并尝试解密测试数据
+            test_fernet = self._get_fernet(password, salt, params)
             decrypted = test_fernet.decrypt(encrypted_test_data).decode()
             
             # 验证解密后的数据是否与预期匹配
-            return decrypted == "totp_password_validation_2024"
+            return decrypted == self.PASSWORD_TEST_DATA
         except Exception:
             # 如果解密失败（密码错误），返回False
             return False
     
+    def unlock_vault(self, password: str, keyring: Optional[Dict] = None) -> bool:
+        """解锁保险库：只派生一次密钥，同时完成密码验证和数据密钥解包"""
+        try:
+            self._begin_session(password)
+            
+            if keyring:
+                # 密钥环本身经过认证，解包成功即说明密码正确；密码记录只是它的副本，
+                # 两者不一致（例如参数升级中途崩溃）时仍以密钥环为准
+                if not self.unwrap_vault_key(password, keyring):
+                    self._end_session()
+                    return False
+                return True
+            
+            # 派生的密码密钥进入会话缓存，随后迁移时包装数据密钥直接复用
+            if not self._has_password_set() or not self.verify_password(password):
+                self._end_session()
+                return False
+            return True
+        except Exception:
+            self._end_session()
+            return False
+    
     def get_password_salt(self) -> Optional[bytes]:
         """获取密码验证盐值"""
         salt_b64 = self.config.get("password.salt")
@@ -240,10 +474,71 @@ class EncryptionManager:
             return base64.b64decode(salt_b64)
         return None
     
-    def clear(self):
-        """清除加密状态"""
+    def enable_quick_unlock(self, pin: str, max_attempts: int = 3) -> bool:
+        """启用快速解锁：用PIN派生的密钥包装当前数据密钥（只保存在内存中）
+        
+        不包装主密码：即使PIN被离线穷举，泄露的也只是本保险库的数据密钥，而不是可能在别处复用的主密码
+        """
+        if not self._vault_key or not pin:
+            return False
+        
+        try:
+            salt = self._generate_salt()
+            pin_fernet = Fernet(self._derive_key(pin, salt, self.QUICK_UNLOCK_KDF_PARAMS))
+            self._quick_unlock = {
+                "salt": salt,
+                "wrapped": pin_fernet.encrypt(self._vault_key),
+                "max_attempts": max(1, max_attempts),
+                "attempts_left": max(1, max_attempts)
+            }
+            return True
+        except Exception:
+            return False
+    
+    def disable_quick_unlock(self):
+        """停用快速解锁并丢弃包装后的会话密钥"""
+        self._quick_unlock = None
+    
+    def has_quick_unlock(self) -> bool:
+        """检查是否可以用PIN快速解锁"""
+        return self._quick_unlock is not None
+    
+    def get_quick_unlock_attempts(self) -> int:
+        """获取剩余的PIN尝试次数"""
+        return self._quick_unlock["attempts_left"] if self._quick_unlock else 0
+    
+    def quick_unlock(self, pin: str) -> bool:
+        """用PIN恢复数据密钥（不恢复会话密码）
+        
+        每次失败扣减尝试次数，用完后丢弃记录，只能输入完整的主密码解锁
+        """
+        record = self._quick_unlock
+        if not record:
+            return False
+        
+        try:
+            pin_fernet = Fernet(self._derive_key(pin, record["salt"], self.QUICK_UNLOCK_KDF_PARAMS))
+            vault_key = pin_fernet.decrypt(record["wrapped"])
+        except Exception:
+            record["attempts_left"] -= 1
+            if record["attempts_left"] <= 0:
+                self._quick_unlock = None
+            return False
+        
+        record["attempts_left"] = record["max_attempts"]
+        self._vault_key = vault_key
+        self._fernet = Fernet(vault_key)
+        self._salt = None
+        return True
+    
+    def clear(self, keep_quick_unlock: bool = False):
+        """清除加密状态（锁定时可保留快速解锁记录）"""
         self._fernet = None
         self._salt = None
+        self._vault_key = None
+        self._end_session()
+        if not keep_quick_unlock:
+            self._quick_unlock = None
     
     def validate_password(self, password: str, salt: bytes) -> bool:
         """验证密码是否正确"""
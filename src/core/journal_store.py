@@ -0,0 +1,503 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+日志存储模块
+数据文件作为快照，每次修改只向日志文件追加一条记录；加载时在快照上重放日志，
+日志过长时压缩为新的快照（先写临时文件再原子替换）；每次写入快照时另写一个很小的清单文件，
+启动时检查保险库状态只需读取清单
+"""
+
+import json
+import os
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+SECRET_FIELDS = ("encrypted_key", "salt")
+MANIFEST_FORMAT = 1
+
+
+def strip_secrets(entry_data: Dict) -> Dict:
+    """去掉条目的密文和盐值，只保留元数据"""
+    return {key: value for key, value in entry_data.items() if key not in SECRET_FIELDS}
+
+
+def load_for_import(store: "JournalStore") -> Dict:
+    """读取整个存储用于导入另一种格式，缺少ID的条目（早期版本写入）补上ID"""
+    data = store.load_all()
+    for entry_data in data.get("entries", []):
+        entry_data.setdefault("id", uuid.uuid4().hex)
+    return data
+
+
+def migrate_legacy(legacy_path: Path, write_snapshot: Callable[[Dict], bool]):
+    """把旧的JSON数据文件（连同日志和清单）交给write_snapshot导入，成功后把旧文件改名保留
+    
+    旧数据文件无法读取或导入失败时抛出IOError，调用方不能当作空保险库继续
+    """
+    legacy_store = JournalStore(legacy_path)
+    try:
+        data = load_for_import(legacy_store)
+    except (ValueError, IOError) as e:
+        raise IOError(f"旧数据文件无法读取: {e}") from e
+    if not write_snapshot(data):
+        raise IOError("导入旧数据文件失败")
+    
+    for path in (legacy_store.path, legacy_store.journal_path, legacy_store.manifest_path):
+        if path.exists():
+            path.replace(path.with_name(path.name + ".migrated"))
+
+
+class JournalStore:
+    """快照 + 追加日志存储类
+    
+    日志格式（每行一条JSON）：
+        {"journal_id": 日志ID}                       第一行，必须与快照中的journal_id一致
+        {"seq": 序号, "op": "put", "entry": 条目字典}
+        {"seq": 序号, "op": "delete", "id": 条目ID}
+        {"seq": 序号, "op": "batch", "records": [不带序号的记录, ...]}   多条修改写成一行，整批原子生效
+    快照中的seq表示已包含的最后一条记录，重放时跳过序号不大于它的记录，其后的记录必须连续；
+    每次完整写入快照都会换一个journal_id，从备份恢复的快照不会被其他快照的日志污染
+    
+    清单文件（快照文件名加.manifest，几百字节的JSON）：
+        {"format": 清单格式, "version": 数据版本, "kdf": KDF算法和参数（不含盐值）,
+         "entry_count": 快照中的条目数, "seq": 快照序号, "journal_id": 日志ID,
+         "size": 快照文件大小, "crc32": 快照文件的CRC32}
+    清单与快照大小不符时视为过期，从快照重建
+    """
+    
+    # 快照格式能否只读取元数据（为False时_read_snapshot总返回含密文的完整条目）
+    PARTIAL_SNAPSHOT_READ = False
+    # 快照格式能否直接读写原始记录元组（TOTPEntry.to_record的格式，在数据字典中放在records而不是entries），
+    # 为True时提供load_records和get_many_records，TOTPManager读写快照不经过条目字典和base64；
+    # 这样的子类还需实现_read_snapshot_records（读取快照，条目放在records中）和
+    # _record_from_dict（日志中的条目字典转换为原始记录元组），_load和_get_many的raw参数只对它们有效
+    RAW_RECORDS = False
+    
+    def __init__(self, path: Path, compact_threshold: int = 1000):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.manifest_path = self.path.with_name(self.path.name + ".manifest")
+        self.compact_threshold = max(1, compact_threshold)
+        
+        # 序号单调递增，完整写入快照也占用一个序号，保证后台压缩不会用旧状态覆盖新快照
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._journal_records = 0
+        self._journal_id: Optional[str] = None
+        # 快照条目的查找表（格式由子类决定）和快照之后日志中修改过的条目（ID -> (序号, 条目或None)），
+        # 用于get_many按需读取密文
+        self._snapshot_index: Optional[Dict] = None
+        self._overlay: Dict[str, Tuple[int, Optional[Dict]]] = {}
+        # 日志文件锁和快照文件锁（压缩在后台线程中进行）
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+    
+    def exists(self) -> bool:
+        """检查快照文件是否存在"""
+        return self.path.exists()
+    
+    def has_data(self) -> bool:
+        """检查是否已有初始化过的保险库数据（清单记录了版本信息），不读取快照本身
+        
+        快照存在但无法读取时也视为已有数据，不能被当作新保险库重新初始化
+        """
+        manifest = self.read_manifest()
+        if manifest is None:
+            return self.path.exists()
+        return manifest.get("version") is not None
+    
+    def read_manifest(self) -> Optional[Dict]:
+        """读取快照清单（格式版本、KDF参数、条目数、校验和）
+        
+        清单缺失或已过期（旧版本写入的快照、手动替换过快照）时读取快照重建；
+        没有快照或快照损坏时返回None
+        """
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return None
+        
+        manifest = self._load_manifest()
+        if manifest is not None and manifest.get("size") == size:
+            return manifest
+        
+        with self._snapshot_lock:
+            try:
+                raw = self.path.read_bytes()
+                data = self._read_snapshot(secrets=False)
+            except (ValueError, IOError):
+                return None
+            manifest = self._build_manifest(data, raw)
+            self._write_manifest(manifest)
+        return manifest
+    
+    @property
+    def last_seq(self) -> int:
+        """最后分配的序号"""
+        return self._seq
+    
+    def can_append(self) -> bool:
+        """快照有日志ID时才能追加日志（旧数据文件需要先完整写入一次快照）"""
+        return self._journal_id is not None
+    
+    def needs_compaction(self) -> bool:
+        """日志记录数达到阈值时需要压缩"""
+        return self._journal_records >= self.compact_threshold
+    
+    def load_all(self) -> Dict:
+        """读取快照并重放日志，返回数据字典（快照文件损坏时抛出ValueError）"""
+        return self._load(secrets=True)
+    
+    def load_index(self) -> Dict:
+        """同load_all，但条目不含密文和盐值（之后用get_many按需读取）"""
+        return self._load(secrets=False)
+    
+    def _load(self, secrets: bool, raw: bool = False) -> Dict:
+        """读取快照并重放日志；raw为True时条目为原始记录元组，放在records中（只用于RAW_RECORDS的格式）"""
+        key = "records" if raw else "entries"
+        with self._lock:
+            if not self.path.exists():
+                # 没有快照的日志不属于任何保险库（例如数据文件被手动删除），直接丢弃
+                if self.journal_path.exists():
+                    self.journal_path.unlink()
+                self._seq = self._snapshot_seq = self._journal_records = 0
+                self._journal_id = None
+                self._snapshot_index = {}
+                self._overlay = {}
+                return {key: []}
+            
+            data = self._read_snapshot_records(secrets) if raw else self._read_snapshot(secrets)
+            
+            snapshot_seq = data.get("seq", 0)
+            self._journal_id = data.get("journal_id")
+            records = self._read_journal(snapshot_seq)
+            
+            # 按ID重放，保持条目原有顺序
+            snapshot_entries = data.get(key, [])
+            self._snapshot_index = self._build_snapshot_index(snapshot_entries)
+            self._overlay = {}
+            entries = {}
+            strip = not secrets and not self.PARTIAL_SNAPSHOT_READ
+            for index, entry_data in enumerate(snapshot_entries):
+                if raw:
+                    entries[entry_data[0]] = entry_data
+                else:
+                    entries[entry_data.get("id") or index] = strip_secrets(entry_data) if strip else entry_data
+            
+            last_seq = snapshot_seq
+            pending = 0
+            for record in records:
+                if record["seq"] <= snapshot_seq:
+                    continue
+                for change in (record["records"] if record["op"] == "batch" else [record]):
+                    if change["op"] == "put":
+                        entry_data = change["entry"]
+                        if raw:
+                            entries[entry_data["id"]] = self._record_from_dict(entry_data, secrets)
+                        else:
+                            entries[entry_data["id"]] = entry_data if secrets else strip_secrets(entry_data)
+                        self._overlay[entry_data["id"]] = (record["seq"], entry_data)
+                    elif change["op"] == "delete":
+                        entries.pop(change["id"], None)
+                        self._overlay[change["id"]] = (record["seq"], None)
+                last_seq = max(last_seq, record["seq"])
+                pending += 1
+            
+            data[key] = list(entries.values())
+            self._seq = last_seq
+            self._snapshot_seq = snapshot_seq
+            self._journal_records = pending
+            return data
+    
+    def _read_journal(self, snapshot_seq: int) -> List[Dict]:
+        """读取属于当前快照的日志记录
+        
+        日志ID不匹配时丢弃整个日志；末尾写了一半的记录（崩溃）或不连续的记录会被截掉，
+        避免之后的追加接在残缺行后面
+        """
+        if not self.journal_path.exists():
+            return []
+        
+        records = []
+        valid_size = 0
+        expected_seq = snapshot_seq + 1
+        with open(self.journal_path, 'rb') as f:
+            header = f.readline()
+            try:
+                journal_id = json.loads(header.decode('utf-8')).get("journal_id")
+            except (UnicodeDecodeError, json.JSONDecodeError, AttributeError):
+                journal_id = None
+            if not header.endswith(b"\n") or journal_id is None or journal_id != self._journal_id:
+                f.close()
+                self.journal_path.unlink()
+                return []
+            valid_size = len(header)
+            
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    break
+                if record["seq"] > snapshot_seq:
+                    if record["seq"] != expected_seq:
+                        break
+                    expected_seq += 1
+                records.append(record)
+                valid_size += len(line)
+        
+        if valid_size != self.journal_path.stat().st_size:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+                f.flush()
+                os.fsync(f.fileno())
+        return records
+    
+    def get(self, entry_id: str) -> Optional[Dict]:
+        """按ID读取条目"""
+        return self.get_many([entry_id]).get(entry_id)
+    
+    def get_many(self, entry_ids: List[str]) -> Dict[str, Dict]:
+        """按ID批量读取完整条目（含密文），不存在的ID不出现在结果中"""
+        return self._get_many(entry_ids, raw=False)
+    
+    def _get_many(self, entry_ids: List[str], raw: bool) -> Dict:
+        """按ID批量读取条目：日志中修改过的条目取自内存，其余从快照读取"""
+        if self._snapshot_index is None:
+            self.load_index()
+        
+        with self._lock:
+            result = {}
+            missing = []
+            for entry_id in entry_ids:
+                if entry_id in self._overlay:
+                    entry_data = self._overlay[entry_id][1]
+                    if entry_data is not None:
+                        result[entry_id] = self._record_from_dict(entry_data) if raw else dict(entry_data)
+                else:
+                    missing.append(entry_id)
+            if missing:
+                result.update(self._read_snapshot_entries(missing, raw))
+            return result
+    
+    def iterate(self) -> Iterator[Dict]:
+        """按顺序遍历条目"""
+        return iter(self.load_all().get("entries", []))
+    
+    def put(self, entry_data: Dict) -> bool:
+        """写入单个条目"""
+        return self.batch([{"op": "put", "entry": entry_data}])
+    
+    def delete(self, entry_id: str) -> bool:
+        """删除单个条目"""
+        return self.batch([{"op": "delete", "id": entry_id}])
+    
+    def batch(self, records: List[Dict]) -> bool:
+        """追加一批修改（一次写入并fsync），耗时与保险库大小无关
+        
+        多条修改写成一条batch记录：崩溃时写了一半的行会被整行截掉，不会只重放其中一部分
+        """
+        if not records:
+            return True
+        
+        with self._lock:
+            seq = self._seq + 1
+            if len(records) == 1:
+                record = dict(records[0], seq=seq)
+            else:
+                record = {"seq": seq, "op": "batch", "records": records}
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            overlay = {}
+            for change in records:
+                if change["op"] == "put":
+                    overlay[change["entry"]["id"]] = change["entry"]
+                elif change["op"] == "delete":
+                    overlay[change["id"]] = None
+            
+            size = self.journal_path.stat().st_size if self.journal_path.exists() else 0
+            try:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    if f.tell() == 0:
+                        f.write(json.dumps({"journal_id": self._journal_id}) + "\n")
+                    f.write(line + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            except (IOError, OSError):
+                # 截掉可能写了一半的行，序号不前进，之后的记录仍然连续
+                try:
+                    with open(self.journal_path, 'r+b') as f:
+                        f.truncate(size)
+                except (IOError, OSError):
+                    pass
+                return False
+            
+            self._seq = seq
+            self._journal_records += len(records)
+            for entry_id, entry_data in overlay.items():
+                self._overlay[entry_id] = (self._seq, entry_data)
+            return True
+    
+    def write_snapshot(self, data: Dict) -> bool:
+        """完整写入快照并清空日志（密钥环变化等需要整体原子提交的修改）"""
+        with self._snapshot_lock, self._lock:
+            self._seq += 1
+            journal_id = uuid.uuid4().hex
+            if not self._write_snapshot_file(data, self._seq, journal_id):
+                return False
+            self._snapshot_seq = self._seq
+            self._journal_id = journal_id
+            self._snapshot_index = self._build_snapshot_index(self._snapshot_entries(data))
+            self._overlay = {}
+            
+            try:
+                if self.journal_path.exists():
+                    self.journal_path.unlink()
+            except OSError:
+                # 残留的旧记录序号不大于快照，重放时会被跳过
+                pass
+            self._journal_records = 0
+            return True
+    
+    def compact(self, data: Dict, seq: int) -> bool:
+        """把截至seq的日志合并进新快照，可在后台线程中调用
+        
+        data必须是序号为seq时的完整状态；快照已经更新时直接返回
+        """
+        with self._snapshot_lock:
+            if seq <= self._snapshot_seq:
+                return True
+            # 压缩后的快照与原快照加日志等价，沿用同一个日志ID
+            if not self._write_snapshot_file(data, seq, self._journal_id):
+                return False
+            self._snapshot_seq = seq
+            
+            # 快照替换后再重写日志；两步之间崩溃时，旧记录会因序号不大于快照而被跳过
+            with self._lock:
+                try:
+                    records = [record for record in self._read_journal(seq) if record["seq"] > seq]
+                    temp_file = self.journal_path.with_suffix(".journal.tmp")
+                    with open(temp_file, 'w', encoding='utf-8') as f:
+                        f.write(json.dumps({"journal_id": self._journal_id}) + "\n")
+                        for record in records:
+                            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_file, self.journal_path)
+                    self._journal_records = len(records)
+                    # 已合并进快照的修改不再需要单独保存
+                    self._snapshot_index = self._build_snapshot_index(self._snapshot_entries(data))
+                    self._overlay = {entry_id: value for entry_id, value in self._overlay.items()
+                                     if value[0] > seq}
+                except (IOError, OSError):
+                    return False
+            return True
+    
+    def _write_snapshot_file(self, data: Dict, seq: int, journal_id: Optional[str]) -> bool:
+        """先写临时文件再替换，避免写入中途失败损坏快照"""
+        try:
+            data = dict(data, seq=seq, journal_id=journal_id)
+            raw = self._encode_snapshot(data)
+            temp_file = self.path.with_suffix(".tmp")
+            with open(temp_file, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.path)
+        except (IOError, OSError):
+            return False
+        # 清单写入失败不影响快照，下次读取清单时会发现过期并重建
+        self._write_manifest(self._build_manifest(data, raw))
+        return True
+    
+    def _build_manifest(self, data: Dict, raw: bytes) -> Dict:
+        """根据快照数据和文件内容生成清单"""
+        kdf = (data.get("keyring") or {}).get("kdf")
+        return {
+            "format": MANIFEST_FORMAT,
+            "version": data.get("version"),
+            "kdf": {key: value for key, value in kdf.items() if key != "salt"} if kdf else None,
+            "entry_count": len(self._snapshot_entries(data)),
+            "seq": data.get("seq", 0),
+            "journal_id": data.get("journal_id"),
+            "size": len(raw),
+            "crc32": zlib.crc32(raw)
+        }
+    
+    def _load_manifest(self) -> Optional[Dict]:
+        """读取清单文件，不存在或格式不符时返回None"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (ValueError, IOError):
+            return None
+        if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+            return None
+        return manifest
+    
+    def _write_manifest(self, manifest: Dict) -> bool:
+        """先写临时文件再替换清单文件"""
+        try:
+            temp_file = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(temp_file, self.manifest_path)
+            return True
+        except (IOError, OSError):
+            return False
+    
+    def _read_snapshot(self, secrets: bool = True) -> Dict:
+        """读取快照文件（格式错误或与清单校验和不符时抛出ValueError）；
+        JSON快照总要完整解析，secrets参数不起作用
+        """
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        self._verify_snapshot(data, raw)
+        return data
+    
+    def _verify_snapshot(self, data: Dict, raw) -> None:
+        """用清单中的校验和检查快照内容，不符时抛出ValueError；data为快照中的元数据，raw为文件内容
+        
+        清单与快照属于同一次写入（日志ID、序号、大小都相同）但校验和不同，说明快照内容已损坏；
+        旧数据文件没有日志ID，无法确认清单是否对应它，不做校验
+        """
+        manifest = self._load_manifest() if data.get("journal_id") else None
+        if (manifest is not None and manifest.get("journal_id") == data["journal_id"]
+                and manifest.get("seq") == data.get("seq", 0) and manifest.get("size") == len(raw)
+                and manifest.get("crc32") != zlib.crc32(raw)):
+            raise ValueError("快照校验和不匹配，数据文件可能已损坏")
+    
+    def _snapshot_entries(self, data: Dict) -> List:
+        """待写入快照的条目：原始记录元组（records）或条目字典（entries）"""
+        return data["records"] if "records" in data else data.get("entries", [])
+    
+    def _build_snapshot_index(self, entries: List[Dict]) -> Dict:
+        """建立快照条目查找表：JSON快照已完整解析，直接按ID保存条目"""
+        return {entry_data["id"]: entry_data for entry_data in entries if entry_data.get("id")}
+    
+    def _read_snapshot_entries(self, entry_ids: List[str], raw: bool = False) -> Dict[str, Dict]:
+        """从快照中读取指定条目（JSON快照不支持原始记录，raw不起作用）"""
+        return {entry_id: dict(self._snapshot_index[entry_id])
+                for entry_id in entry_ids if entry_id in self._snapshot_index}
+    
+    def _encode_snapshot(self, data: Dict) -> bytes:
+        """把数据字典编码为快照文件内容"""
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,119 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+密钥派生模块
+支持PBKDF2-SHA256和scrypt，并可按目标解锁耗时在本机自动校准参数
+"""
+
+import os
+import time
+from typing import Dict, Tuple
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+PBKDF2_SHA256 = "pbkdf2-sha256"
+SCRYPT = "scrypt"
+
+# 校准结果的下限，保证不会弱于原来固定的参数
+MIN_PBKDF2_ITERATIONS = 100000
+MIN_SCRYPT_N = 2 ** 14
+MAX_SCRYPT_N = 2 ** 20  # r=8时约占用1GB内存
+
+DEFAULT_PARAMS = {"algorithm": PBKDF2_SHA256, "iterations": MIN_PBKDF2_ITERATIONS}
+
+
+def normalize_params(params: Dict) -> Dict:
+    """补全KDF参数（旧数据没有algorithm字段，视为PBKDF2-SHA256）"""
+    algorithm = params.get("algorithm", PBKDF2_SHA256)
+    if algorithm == PBKDF2_SHA256:
+        return {"algorithm": PBKDF2_SHA256,
+                "iterations": int(params.get("iterations", MIN_PBKDF2_ITERATIONS))}
+    if algorithm == SCRYPT:
+        return {"algorithm": SCRYPT,
+                "n": int(params.get("n", MIN_SCRYPT_N)),
+                "r": int(params.get("r", 8)),
+                "p": int(params.get("p", 1))}
+    raise ValueError(f"不支持的密钥派生算法: {algorithm}")
+
+
+def params_key(params: Dict) -> Tuple:
+    """把KDF参数转换为可哈希的键（用于密钥缓存）"""
+    return tuple(sorted(normalize_params(params).items()))
+
+
+def is_weaker(params: Dict, policy: Dict) -> bool:
+    """判断参数是否弱于策略（算法不同时也视为需要升级）"""
+    params = normalize_params(params)
+    policy = normalize_params(policy)
+    if params["algorithm"] != policy["algorithm"]:
+        return True
+    if params["algorithm"] == SCRYPT:
+        return any(params[name] < policy[name] for name in ("n", "r", "p"))
+    return params["iterations"] < policy["iterations"]
+
+
+def derive(password: bytes, salt: bytes, params: Dict, length: int = 32) -> bytes:
+    """按参数派生密钥"""
+    params = normalize_params(params)
+    if params["algorithm"] == SCRYPT:
+        kdf = Scrypt(salt=salt, length=length, n=params["n"], r=params["r"], p=params["p"],
+                     backend=default_backend())
+    else:
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=length,
+            salt=salt,
+            iterations=params["iterations"],
+            backend=default_backend()
+        )
+    return kdf.derive(password)
+
+
+def benchmark(params: Dict, rounds: int = 2) -> float:
+    """测量一次派生的耗时（秒），取多次中的最短值以减少抖动"""
+    salt = os.urandom(16)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        derive(b"kdf-calibration", salt, params)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(algorithm: str = PBKDF2_SHA256, target_ms: int = 250) -> Dict:
+    """在本机测量KDF速度，返回耗时接近目标的参数"""
+    target = target_ms / 1000.0
+    
+    if algorithm == SCRYPT:
+        # scrypt耗时与n近似成正比，n必须是2的幂
+        elapsed = max(benchmark({"algorithm": SCRYPT, "n": MIN_SCRYPT_N}), 1e-6)
+        n = MIN_SCRYPT_N
+        while n < MAX_SCRYPT_N and elapsed * (n * 2) / MIN_SCRYPT_N <= target:
+            n *= 2
+        return {"algorithm": SCRYPT, "n": n, "r": 8, "p": 1}
+    
+    if algorithm == PBKDF2_SHA256:
+        # PBKDF2耗时与迭代次数成正比，先用较少的迭代次数测速再按比例放大
+        sample = 20000
+        elapsed = max(benchmark({"algorithm": PBKDF2_SHA256, "iterations": sample}), 1e-6)
+        iterations = int(sample * target / elapsed) // 1000 * 1000
+        return {"algorithm": PBKDF2_SHA256, "iterations": max(iterations, MIN_PBKDF2_ITERATIONS)}
+    
+    raise ValueError(f"不支持的密钥派生算法: {algorithm}")
@@ -0,0 +1,302 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+SQLite存储模块
+条目按行存储（密文为BLOB），名称、发行者和创建时间建有索引，使用WAL模式；
+首次打开时自动迁移旧的totp_data.json
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.core.journal_store import migrate_legacy
+
+
+class SqliteStore:
+    """SQLite存储类（实现VaultStore接口）"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            issuer TEXT NOT NULL DEFAULT '',
+            encrypted_key BLOB,
+            salt BLOB,
+            icon TEXT NOT NULL DEFAULT '',
+            created_time REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_position ON entries(position);
+        CREATE INDEX IF NOT EXISTS idx_entries_name ON entries(name);
+        CREATE INDEX IF NOT EXISTS idx_entries_issuer ON entries(issuer);
+        CREATE INDEX IF NOT EXISTS idx_entries_created_time ON entries(created_time);
+    """
+    
+    COLUMNS = "id, name, issuer, encrypted_key, salt, icon, created_time"
+    INDEX_COLUMNS = "id, name, issuer, icon, created_time"
+    # 单条SQL语句中参数个数的上限（旧版SQLite为999）
+    MAX_VARIABLES = 900
+    
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        # 旧的JSON数据文件，首次打开时迁移
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._conn: Optional[sqlite3.Connection] = None
+        # 连接会在后台线程（参数升级等）中使用，所有操作串行执行
+        self._lock = threading.RLock()
+    
+    def exists(self) -> bool:
+        """检查数据库（或待迁移的旧数据文件）是否存在"""
+        return self.path.exists() or bool(self.legacy_path and self.legacy_path.exists())
+    
+    def has_data(self) -> bool:
+        """检查是否已有初始化过的保险库数据
+        
+        数据库或待迁移的旧数据文件存在但无法读取时也视为已有数据，不能被当作新保险库重新初始化
+        """
+        if not self.exists():
+            return False
+        with self._lock:
+            try:
+                return self._connect().execute("SELECT 1 FROM meta WHERE key = 'version'").fetchone() is not None
+            except (sqlite3.Error, IOError):
+                return True
+    
+    @property
+    def last_seq(self) -> int:
+        """SQLite存储没有日志序号"""
+        return 0
+    
+    def can_append(self) -> bool:
+        """是否可以只写入修改的条目"""
+        return True
+    
+    def needs_compaction(self) -> bool:
+        """WAL由SQLite自动检查点，不需要压缩"""
+        return False
+    
+    def compact(self, data: Dict, seq: int) -> bool:
+        """把WAL合并回数据库文件"""
+        with self._lock:
+            try:
+                self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                return True
+            except sqlite3.Error:
+                return False
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库（首次打开时建表并迁移旧数据）"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 自动提交模式，事务由_transaction显式控制
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            try:
+                self._migrate_legacy()
+            except IOError:
+                # 旧数据没有导入时不保留连接，下次打开时重新尝试
+                self._conn = None
+                conn.close()
+                raise
+        return self._conn
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务，异常时回滚"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Connection]:
+        """读操作：持有连接锁，数据库被锁定或损坏时把sqlite3.Error转换为IOError"""
+        with self._lock:
+            try:
+                yield self._connect()
+            except sqlite3.Error as e:
+                raise IOError(f"数据库无法读取: {e}") from e
+    
+    def _migrate_legacy(self):
+        """数据库为空且存在旧数据文件时导入，导入后把旧文件改名保留
+        
+        旧数据文件无法读取或导入失败时抛出IOError：此时打开的是一个空数据库，
+        之后的写入会让旧数据再也不会被导入
+        """
+        if not self.legacy_path or not self.legacy_path.exists():
+            return
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'version'").fetchone():
+            return
+        migrate_legacy(self.legacy_path, self.write_snapshot)
+    
+    @staticmethod
+    def _decode(value: Optional[str]) -> Optional[bytes]:
+        return base64.b64decode(value) if value else None
+    
+    @staticmethod
+    def _encode(value: Optional[bytes]) -> Optional[str]:
+        return base64.b64encode(value).decode() if value else None
+    
+    def _entry_params(self, entry_data: Dict) -> tuple:
+        """条目字典转换为行参数（密文以BLOB存储）"""
+        return (
+            entry_data["id"],
+            entry_data["name"],
+            entry_data.get("issuer") or "",
+            self._decode(entry_data.get("encrypted_key")),
+            self._decode(entry_data.get("salt")),
+            entry_data.get("icon") or "",
+            entry_data.get("created_time", 0.0)
+        )
+    
+    def _row_to_dict(self, row: tuple) -> Dict:
+        """行转换为条目字典（与TOTPEntry.to_dict格式一致）"""
+        entry_id, name, issuer, encrypted_key, salt, icon, created_time = row
+        return {
+            "id": entry_id,
+            "name": name,
+            "issuer": issuer,
+            "encrypted_key": self._encode(encrypted_key),
+            "salt": self._encode(salt),
+            "icon": icon,
+            "created_time": created_time
+        }
+    
+    def load_all(self) -> Dict:
+        """读取全部数据（按原有顺序）"""
+        return self._load(secrets=True)
+    
+    def load_index(self) -> Dict:
+        """同load_all，但不读取密文和盐值列"""
+        return self._load(secrets=False)
+    
+    def _load(self, secrets: bool) -> Dict:
+        with self._reading() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if secrets:
+                rows = conn.execute(f"SELECT {self.COLUMNS} FROM entries ORDER BY position")
+                data = {"entries": [self._row_to_dict(row) for row in rows]}
+            else:
+                rows = conn.execute(f"SELECT {self.INDEX_COLUMNS} FROM entries ORDER BY position")
+                data = {"entries": [dict(zip(("id", "name", "issuer", "icon", "created_time"), row))
+                                    for row in rows]}
+        
+        if "version" in meta:
+            data["version"] = meta["version"]
+        if "keyring" in meta:
+            data["keyring"] = json.loads(meta["keyring"])
+        return data
+    
+    def get(self, entry_id: str) -> Optional[Dict]:
+        """按ID读取条目（主键查询）"""
+        with self._reading() as conn:
+            row = conn.execute(f"SELECT {self.COLUMNS} FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+    
+    def get_many(self, entry_ids: List[str]) -> Dict[str, Dict]:
+        """按ID批量读取完整条目（主键查询），不存在的ID不出现在结果中"""
+        result = {}
+        with self._reading() as conn:
+            for start in range(0, len(entry_ids), self.MAX_VARIABLES):
+                chunk = entry_ids[start:start + self.MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(f"SELECT {self.COLUMNS} FROM entries WHERE id IN ({placeholders})", chunk):
+                    result[row[0]] = self._row_to_dict(row)
+        return result
+    
+    def iterate(self) -> Iterator[Dict]:
+        """按顺序遍历条目"""
+        with self._reading() as conn:
+            rows = conn.execute(f"SELECT {self.COLUMNS} FROM entries ORDER BY position").fetchall()
+        return (self._row_to_dict(row) for row in rows)
+    
+    def put(self, entry_data: Dict) -> bool:
+        """写入单个条目"""
+        return self.batch([{"op": "put", "entry": entry_data}])
+    
+    def delete(self, entry_id: str) -> bool:
+        """删除单个条目"""
+        return self.batch([{"op": "delete", "id": entry_id}])
+    
+    def batch(self, records: List[Dict]) -> bool:
+        """在一个事务中应用一批修改记录（put/delete），只写入相关的行"""
+        if not records:
+            return True
+        
+        with self._lock:
+            try:
+                with self._transaction() as conn:
+                    for record in records:
+                        if record["op"] == "put":
+                            # 已存在的条目保持原有位置，新条目排在最后
+                            conn.execute(
+                                f"INSERT INTO entries (position, {self.COLUMNS}) "
+                                "VALUES ((SELECT COALESCE(MAX(position), -1) + 1 FROM entries), ?, ?, ?, ?, ?, ?, ?) "
+                                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, issuer = excluded.issuer, "
+                                "encrypted_key = excluded.encrypted_key, salt = excluded.salt, "
+                                "icon = excluded.icon, created_time = excluded.created_time",
+                                self._entry_params(record["entry"])
+                            )
+                        elif record["op"] == "delete":
+                            conn.execute("DELETE FROM entries WHERE id = ?", (record["id"],))
+                return True
+            except sqlite3.Error:
+                return False
+    
+    def write_snapshot(self, data: Dict) -> bool:
+        """在一个事务中替换全部数据（密钥环变化等需要整体原子提交的修改）"""
+        with self._lock:
+            try:
+                with self._transaction() as conn:
+                    conn.execute("DELETE FROM entries")
+                    conn.executemany(
+                        f"INSERT INTO entries (position, {self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        ((position,) + self._entry_params(entry_data)
+                         for position, entry_data in enumerate(data.get("entries", [])))
+                    )
+                    
+                    conn.execute("DELETE FROM meta")
+                    meta = {"version": data.get("version", "1.0.0"), "last_updated": str(data.get("last_updated", 0))}
+                    if data.get("keyring"):
+                        meta["keyring"] = json.dumps(data["keyring"])
+                    conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta.items())
+                return True
+            except sqlite3.Error:
+                return False
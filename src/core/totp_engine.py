@@ -0,0 +1,110 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+TOTP计算引擎模块
+缓存解码后的密钥和预先计算好的HMAC状态，批量生成TOTP代码（RFC 4226 / RFC 6238）
+"""
+
+import base64
+import hashlib
+import hmac
+import struct
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class TOTPEngine:
+    """TOTP计算引擎类"""
+    
+    def __init__(self, secret_loader: Callable[[Any], Optional[str]],
+                 digits: int = 6, period: int = 30, digest=hashlib.sha1):
+        # secret_loader(entry) 返回条目的明文base32密钥，仅在条目首次计算时调用
+        self._secret_loader = secret_loader
+        self.digits = digits
+        self.period = period
+        self._digest = digest
+        self._modulus = 10 ** digits
+        # 以密文为键保存已初始化的HMAC对象（内外填充已预先计算好）
+        self._states: Dict[bytes, hmac.HMAC] = {}
+    
+    @staticmethod
+    def decode_secret(secret: str) -> bytes:
+        """解码base32密钥（与pyotp一致：自动补齐填充，忽略大小写）"""
+        missing_padding = len(secret) % 8
+        if missing_padding:
+            secret += "=" * (8 - missing_padding)
+        return base64.b32decode(secret, casefold=True)
+    
+    def prepare(self, token: bytes, secret: str) -> bool:
+        """为指定条目预先计算HMAC状态"""
+        try:
+            key = self.decode_secret(secret)
+        except Exception:
+            return False
+        self._states[token] = hmac.new(key, digestmod=self._digest)
+        return True
+    
+    def _get_state(self, entry) -> Optional[hmac.HMAC]:
+        """获取条目的HMAC状态，首次使用时解密并初始化"""
+        token = entry.encrypted_key
+        if not token:
+            return None
+        
+        state = self._states.get(token)
+        if state is None:
+            secret = self._secret_loader(entry)
+            if not secret or not self.prepare(token, secret):
+                return None
+            state = self._states[token]
+        return state
+    
+    def _truncate(self, state: hmac.HMAC, counter_bytes: bytes) -> str:
+        """动态截断HMAC结果得到验证码"""
+        mac = state.copy()
+        mac.update(counter_bytes)
+        digest = mac.digest()
+        offset = digest[-1] & 0x0F
+        code = (struct.unpack_from(">I", digest, offset)[0] & 0x7FFFFFFF) % self._modulus
+        return str(code).zfill(self.digits)
+    
+    def timecode(self, for_time: Optional[float] = None) -> int:
+        """获取指定时间所在的时间步"""
+        if for_time is None:
+            for_time = time.time()
+        return int(for_time) // self.period
+    
+    def generate(self, entry, for_time: Optional[float] = None) -> Optional[str]:
+        """生成单个条目的TOTP代码"""
+        return self.generate_many([entry], for_time)[0]
+    
+    def generate_many(self, entries: Iterable, for_time: Optional[float] = None) -> List[Optional[str]]:
+        """一次性为多个条目生成TOTP代码，返回与输入顺序一致的列表"""
+        counter_bytes = struct.pack(">Q", self.timecode(for_time))
+        codes: List[Optional[str]] = []
+        for entry in entries:
+            state = self._get_state(entry)
+            codes.append(self._truncate(state, counter_bytes) if state is not None else None)
+        return codes
+    
+    def discard(self, token: Optional[bytes]):
+        """丢弃指定条目的HMAC状态"""
+        if token:
+            self._states.pop(token, None)
+    
+    def clear(self):
+        """清除所有缓存的密钥状态"""
+        self._states.clear()
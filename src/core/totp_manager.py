@@ -21,34 +21,57 @@ TOTP管理器模块
 """
 
 import base64
-import json
+import hmac
+import multiprocessing
 import os
+import threading
 import time
-from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pyotp
 from cryptography.fernet import Fernet
 
 from src.core.encryption import EncryptionManager
+from src.core.vault_store import VaultStore, create_store
+from src.core.totp_engine import TOTPEngine
 from src.utils.config import ConfigManager
 
 
+def _reencrypt_chunk(old_key: bytes, new_key: bytes, tokens: List[bytes]) -> List[bytes]:
+    """用新的数据密钥重新加密一批条目密文（在进程池中运行，必须是模块级函数）"""
+    old_fernet = Fernet(old_key)
+    new_fernet = Fernet(new_key)
+    return [new_fernet.encrypt(old_fernet.decrypt(token)) for token in tokens]
+
+
 class TOTPEntry:
-    """TOTP条目类"""
+    """TOTP条目类
+    
+    使用__slots__，条目很多时每个实例不再携带__dict__；密文和盐值以原始字节保存
+    """
+    
+    __slots__ = ("id", "name", "issuer", "encrypted_key", "salt", "icon", "created_time", "secret_loaded")
     
     def __init__(self, name: str, issuer: str = "", encrypted_key: bytes = None, 
-                 salt: bytes = None, icon: str = ""):
+                 salt: bytes = None, icon: str = "", entry_id: Optional[str] = None):
+        # 稳定的条目ID，日志记录按ID定位条目（名称可以修改）
+        self.id = entry_id or uuid.uuid4().hex
         self.name = name
         self.issuer = issuer
         self.encrypted_key = encrypted_key
         self.salt = salt
         self.icon = icon
         self.created_time = time.time()
+        # 只加载了元数据时为False，密文在首次使用时从存储读取
+        self.secret_loaded = True
     
     def to_dict(self) -> Dict:
         """转换为字典"""
         return {
+            "id": self.id,
             "name": self.name,
             "issuer": self.issuer,
             "encrypted_key": base64.b64encode(self.encrypted_key).decode() if self.encrypted_key else None,
@@ -57,52 +80,395 @@ class TOTPEntry:
             "created_time": self.created_time
         }
     
+    def to_record(self) -> Tuple:
+        """转换为原始记录元组：(id, name, issuer, icon, encrypted_key, salt, created_time)
+        
+        字段顺序与二进制保险库格式一致，密文和盐值直接使用原始字节，不经过base64和中间字典
+        """
+        return (self.id, self.name, self.issuer, self.icon, self.encrypted_key, self.salt, self.created_time)
+    
+    @classmethod
+    def from_record(cls, record: Tuple, secrets: bool = True) -> 'TOTPEntry':
+        """从原始记录元组创建实例（to_record的逆操作）；secrets为False时记录不含密文，之后按需读取"""
+        entry = cls.__new__(cls)
+        entry.id, entry.name, entry.issuer, entry.icon, encrypted_key, salt, entry.created_time = record
+        entry.encrypted_key = encrypted_key or None
+        entry.salt = salt or None
+        entry.secret_loaded = secrets
+        return entry
+    
     @classmethod
     def from_dict(cls, data: Dict) -> 'TOTPEntry':
         """从字典创建实例"""
         entry = cls(
             name=data["name"],
             issuer=data.get("issuer", ""),
-            icon=data.get("icon", "")
+            icon=data.get("icon", ""),
+            entry_id=data.get("id")
         )
         
-        if data.get("encrypted_key") and data.get("salt"):
-            entry.encrypted_key = base64.b64decode(data["encrypted_key"])
-            entry.salt = base64.b64decode(data["salt"])
+        if "encrypted_key" in data:
+            entry.load_secret(data)
+        else:
+            entry.secret_loaded = False
         
         entry.created_time = data.get("created_time", time.time())
         return entry
+    
+    def load_secret(self, data: Dict):
+        """从条目字典设置密文和盐值（新格式的条目由保险库数据密钥加密，不再携带独立盐值）"""
+        self.encrypted_key = base64.b64decode(data["encrypted_key"]) if data.get("encrypted_key") else None
+        self.salt = base64.b64decode(data["salt"]) if data.get("salt") else None
+        self.secret_loaded = True
+    
+    def load_secret_record(self, record: Optional[Tuple]):
+        """从原始记录元组设置密文和盐值（记录不存在时两者为None）"""
+        self.encrypted_key = (record[4] or None) if record else None
+        self.salt = (record[5] or None) if record else None
+        self.secret_loaded = True
 
 
 class TOTPManager:
     """TOTP管理器类"""
     
-    def __init__(self):
-        self.encryption = EncryptionManager()
-        self.config = ConfigManager()
-        # 使用data目录保存TOTP数据
-        self.data_file = Path("data") / "totp_data.json"
-        self._entries: List[TOTPEntry] = []
+    # 重新加密时每批的条目数，以及启用进程池的最少条目数（条目较少时进程启动开销更大）
+    REKEY_CHUNK_SIZE = 500
+    REKEY_PARALLEL_THRESHOLD = 2000
+    
+    def __init__(self, store: Optional[VaultStore] = None, config: Optional[ConfigManager] = None):
+        # 配置：未指定时使用进程内共享的实例，加密管理器与界面使用同一份配置
+        self.config = config if config is not None else ConfigManager.shared()
+        # 存储后端：未指定时按配置storage.backend创建（默认为data目录下的JSON快照 + 日志）
+        self.store = store if store is not None else create_store(self.config)
+        # 存储支持原始记录元组时（二进制快照），读写快照不经过条目字典和base64
+        self._raw_records = bool(getattr(self.store, "RAW_RECORDS", False))
+        self.encryption = EncryptionManager(store=self.store, config=self.config)
+        self._compact_thread: Optional[threading.Thread] = None
+        # 旧数据文件没有日志ID、条目没有ID，需要先完整写入一次快照才能只写入修改
+        self._needs_snapshot = False
+        # 数据文件存在但无法读取（损坏、截断）时的错误信息；此时拒绝解锁和任何写入，避免用空保险库覆盖原有数据
+        self._load_error: Optional[str] = None
+        # 条目按ID索引（保持插入顺序），另有名称到ID的二级索引（名称可以重复）
+        self._entries: Dict[str, TOTPEntry] = {}
+        self._name_index: Dict[str, List[str]] = {}
+        # 进行中的批量修改：待写入的记录、是否需要完整快照，以及回滚用的原条目索引和被修改的字段
+        self._batch: Optional[Dict] = None
+        # 延迟写入：修改只标记为待写入，后台线程在最后一次修改后等待一小段时间再统一写入
+        self._write_behind = bool(self.config.get("storage.write_behind", False))
+        self._flush_delay = self.config.get("storage.write_behind_delay_ms", 500) / 1000
+        self._pending_records: List[Dict] = []
+        self._pending_snapshot = False
+        self._flush_deadline: Optional[float] = None
+        self._flush_thread: Optional[threading.Thread] = None
+        self._flush_condition = threading.Condition()
+        # 后台写入失败时调用，参数为错误信息（在写入线程中调用，界面可以传入信号的emit）
+        self.flush_error_callback: Optional[Callable[[str], None]] = None
+        # 延迟写入设置修改后（包括其他程序修改配置文件）立即生效
+        self.config.add_observer("storage.write_behind*", self._on_write_behind_changed)
+        # 密钥环：用主密码包装后的保险库数据密钥
+        self._keyring: Optional[Dict] = None
         self._current_password: Optional[str] = None
-        
-        # 确保data目录存在
-        Path("data").mkdir(exist_ok=True)
+        # 是否已解锁（PIN快速解锁后数据密钥可用，但没有会话密码）
+        self._unlocked = False
+        # 数据文件写入锁（后台参数升级与界面操作可能同时保存）
+        self._save_lock = threading.RLock()
+        # TOTP计算引擎，缓存每个条目解密后的HMAC状态
+        self._engine = TOTPEngine(self.decrypt_secret)
+        # 当前时间窗口的代码缓存：密文 -> 代码，窗口结束（过期时间戳）时整体失效
+        self._code_cache: Dict[bytes, str] = {}
+        self._code_cache_step: Optional[int] = None
+        self._code_cache_expires_at = 0.0
         
         # 不自动加载数据，等待密码初始化后再加载
     
     def initialize_with_password(self, password: str) -> bool:
         """使用密码初始化加密系统"""
+        # 已有的数据文件无法读取时不设置新密码
+        if not self._load_data():
+            return False
         # 使用新的独立密码存储方法
         success = self.encryption.set_password(password)
         if success:
-            self._current_password = password
-            self._load_data()
+            self._engine.clear()
+            self._clear_code_cache()
+            # 为新密码生成保险库数据密钥，能用该密码解密的旧条目一并迁移
+            self._keyring = None
+            success = self._migrate_legacy_entries(password)
+            if success:
+                self._current_password = password
+                self._unlocked = True
         return success
     
+    def unlock(self, password: str) -> bool:
+        """使用主密码解锁保险库，旧格式数据在首次解锁时自动迁移
+        
+        数据文件无法读取时返回False（原因见get_load_error），不会当作空保险库处理
+        """
+        self._engine.clear()
+        self._clear_code_cache()
+        if not self._load_data():
+            return False
+        
+        if self._keyring:
+            # 新格式：一次密钥派生同时完成密码验证和数据密钥解包
+            if not self.encryption.unlock_vault(password, self._keyring):
+                return False
+            self._current_password = password
+            self._unlocked = True
+            self.encryption.sync_password_record(password, self._keyring)
+            # 仍有旧条目（例如上次迁移中断）时继续迁移
+            if any(entry.salt for entry in self._entries.values()):
+                self._migrate_legacy_entries(password)
+            elif self._needs_snapshot:
+                # 立即写入为没有ID的旧条目分配的ID
+                self._save_data()
+            return True
+        
+        # 旧格式：先验证密码，再生成数据密钥并迁移所有条目
+        if not self.encryption.unlock_vault(password):
+            legacy_entries = [entry for entry in self._entries.values() if entry.encrypted_key and entry.salt]
+            if not legacy_entries:
+                return False
+            first_entry = legacy_entries[0]
+            if not self.encryption.validate_password_with_encrypted_data(
+                    password, first_entry.salt, first_entry.encrypted_key):
+                return False
+        
+        if not self._migrate_legacy_entries(password):
+            return False
+        self._current_password = password
+        self._unlocked = True
+        return True
+    
+    def _migrate_legacy_entries(self, password: str) -> bool:
+        """把使用独立盐值加密的旧条目改为由保险库数据密钥加密"""
+        self._load_secrets(list(self._entries.values()))
+        if not self._keyring:
+            keyring = self.encryption.create_vault_key(password)
+            if not keyring:
+                return False
+            self._keyring = keyring
+        
+        for entry in self._entries.values():
+            if not entry.encrypted_key or not entry.salt:
+                continue
+            # 同一盐值只派生一次密钥（会话密钥缓存）
+            secret_key = self.encryption.decrypt_totp_key(entry.encrypted_key, entry.salt, password)
+            if secret_key is None:
+                # 无法用当前密码解密的条目保持原样，不丢弃数据
+                continue
+            encrypted_key = self.encryption.encrypt_data(secret_key)
+            if not encrypted_key:
+                return False
+            entry.encrypted_key = encrypted_key
+            entry.salt = None
+        
+        return self._save_data()
+    
+    def get_kdf_policy(self) -> Dict:
+        """获取当前策略要求的KDF参数（可能在本机校准并写入配置，应在主线程调用）"""
+        return self.encryption.get_kdf_policy()
+    
+    def needs_kdf_upgrade(self, policy: Optional[Dict] = None) -> bool:
+        """检查保险库的密钥派生参数是否弱于策略参数policy（为None时读取当前策略）"""
+        return bool(self._keyring) and self.encryption.needs_kdf_upgrade(self._keyring, policy)
+    
+    def upgrade_kdf(self, policy: Optional[Dict] = None) -> bool:
+        """参数弱于策略时按新参数重新包装数据密钥，解锁后在后台线程调用
+        
+        policy为主线程中用get_kdf_policy取得的策略参数，后台线程不再校准或修改配置中的策略；
+        条目由数据密钥加密，不需要重新加密；新密钥环随数据文件原子替换一起生效，
+        任何时刻崩溃都只会留下旧密钥环或新密钥环中的一个
+        """
+        password = self._current_password
+        keyring = self._keyring
+        if not password or not keyring or not self.encryption.needs_kdf_upgrade(keyring, policy):
+            return False
+        
+        new_keyring = self.encryption.upgrade_vault_key(password, policy)
+        if not new_keyring:
+            return False
+        
+        with self._save_lock:
+            # 升级期间已锁定或密钥环已被替换时放弃本次升级
+            if self._current_password != password or self._keyring is not keyring:
+                return False
+            self._keyring = new_keyring
+            if not self._save_data():
+                self._keyring = keyring
+                return False
+        
+        # 新密钥环落盘后再同步密码记录
+        self.encryption.sync_password_record(password, new_keyring)
+        return True
+    
     def unlock_with_password(self, password: str, salt: bytes) -> bool:
         """使用密码解锁加密系统"""
         return self.encryption.unlock(password, salt)
     
+    def rekey(self, old_password: str, new_password: str,
+              progress_callback: Optional[Callable[[int, int], None]] = None) -> bool:
+        """修改主密码并轮换保险库数据密钥
+        
+        新密码只派生一次密钥；所有条目用新的数据密钥重新加密，条目较多时分批交给进程池并行处理。
+        只有全部条目成功后才通过一次原子替换写入数据文件，中途失败不会改动原有数据。
+        progress_callback(已完成数, 总数) 在调用线程中随每批完成调用
+        """
+        if not old_password or not new_password:
+            return False
+        
+        if not self._keyring:
+            return False
+        if self._current_password is not None:
+            # 有会话密码时直接比较，错误的旧密码不会打断当前会话
+            if not hmac.compare_digest(old_password.encode(), self._current_password.encode()):
+                return False
+        elif not self.encryption.unlock_vault(old_password, self._keyring):
+            return False
+        old_keyring = self._keyring
+        
+        # 仍由独立盐值加密（无法迁移）的条目会导致轮换后无法解密，直接放弃
+        entries = list(self._entries.values())
+        self._load_secrets(entries)
+        if any(entry.salt for entry in entries):
+            return False
+        
+        prepared = self.encryption.prepare_rekey(new_password)
+        if not prepared:
+            return False
+        new_vault_key, new_keyring, wrapping_fernet = prepared
+        
+        tokens = [entry.encrypted_key for entry in entries]
+        new_tokens = self._reencrypt_tokens(self.encryption.get_vault_key(), new_vault_key,
+                                            tokens, progress_callback)
+        if new_tokens is None:
+            return False
+        
+        with self._save_lock:
+            # 期间条目被修改或密钥环被替换时放弃，避免覆盖其他改动
+            if self._keyring is not old_keyring or [entry.encrypted_key for entry in self._entries.values()] != tokens:
+                return False
+            
+            for entry, new_token in zip(entries, new_tokens):
+                entry.encrypted_key = new_token
+            self._keyring = new_keyring
+            if not self._save_data():
+                for entry, token in zip(entries, tokens):
+                    entry.encrypted_key = token
+                self._keyring = old_keyring
+                return False
+        
+        # 数据文件已提交，切换到新的数据密钥和会话密码
+        self.encryption.activate_vault_key(new_password, new_vault_key, new_keyring, wrapping_fernet)
+        # 快速解锁包装的是旧数据密钥，需要重新设置PIN
+        self.encryption.disable_quick_unlock()
+        self._current_password = new_password
+        self._engine.clear()
+        self._clear_code_cache()
+        return True
+    
+    def _reencrypt_tokens(self, old_key: bytes, new_key: bytes, tokens: List[bytes],
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> Optional[List[bytes]]:
+        """分批重新加密密文，任何一批失败都返回None"""
+        total = len(tokens)
+        chunk_size = self.REKEY_CHUNK_SIZE
+        chunks = [tokens[i:i + chunk_size] for i in range(0, total, chunk_size)]
+        results: List[Optional[List[bytes]]] = [None] * len(chunks)
+        done = 0
+        
+        if progress_callback:
+            progress_callback(0, total)
+        
+        try:
+            workers = min(os.cpu_count() or 1, len(chunks))
+            if total < self.REKEY_PARALLEL_THRESHOLD or workers < 2:
+                for index, chunk in enumerate(chunks):
+                    results[index] = _reencrypt_chunk(old_key, new_key, chunk)
+                    done += len(chunk)
+                    if progress_callback:
+                        progress_callback(done, total)
+            else:
+                # 使用spawn启动子进程，避免在已有Qt线程的进程中fork
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                    futures = {
+                        executor.submit(_reencrypt_chunk, old_key, new_key, chunk): index
+                        for index, chunk in enumerate(chunks)
+                    }
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        results[index] = future.result()
+                        done += len(chunks[index])
+                        if progress_callback:
+                            progress_callback(done, total)
+        except Exception:
+            return None
+        
+        return [token for chunk in results for token in chunk]
+    
+    def lock(self, keep_quick_unlock: bool = True):
+        """锁定：清除会话密码以及内存中的密钥和代码缓存
+        
+        已启用快速解锁时只保留用PIN包装后的会话密钥
+        """
+        self.flush()
+        self._current_password = None
+        self._unlocked = False
+        self._engine.clear()
+        self._clear_code_cache()
+        self.encryption.clear(keep_quick_unlock=keep_quick_unlock)
+    
+    def is_locked(self) -> bool:
+        """检查保险库是否已锁定"""
+        return not self._unlocked
+    
+    def get_current_password(self) -> Optional[str]:
+        """获取当前会话密码（锁定时或PIN快速解锁后为None）"""
+        return self._current_password
+    
+    def verify_password(self, password: str) -> bool:
+        """在已解锁的会话中验证主密码（查看明文密钥等操作前调用）
+        
+        PIN快速解锁后没有会话密码，需要用密钥环验证一次（运行一次KDF），成功后恢复会话密码
+        """
+        if not password or not self._unlocked:
+            return False
+        if self._current_password is not None:
+            return hmac.compare_digest(password.encode(), self._current_password.encode())
+        if not self._keyring or not self.encryption.unlock_vault(password, self._keyring):
+            return False
+        self._current_password = password
+        return True
+    
+    def enable_quick_unlock(self, pin: str) -> bool:
+        """为当前会话设置快速解锁PIN"""
+        if not self._unlocked:
+            return False
+        max_attempts = self.config.get("app.quick_unlock_attempts", 3)
+        return self.encryption.enable_quick_unlock(pin, max_attempts)
+    
+    def disable_quick_unlock(self):
+        """停用快速解锁"""
+        self.encryption.disable_quick_unlock()
+    
+    def has_quick_unlock(self) -> bool:
+        """检查是否可以用PIN快速解锁"""
+        return self.encryption.has_quick_unlock()
+    
+    def get_quick_unlock_attempts(self) -> int:
+        """获取剩余的PIN尝试次数"""
+        return self.encryption.get_quick_unlock_attempts()
+    
+    def quick_unlock(self, pin: str) -> bool:
+        """用PIN恢复锁定前的会话，不运行主密码的KDF
+        
+        只恢复数据密钥：旧格式条目在完整解锁时已经迁移，之后的操作不需要主密码
+        """
+        if not self.encryption.quick_unlock(pin):
+            return False
+        self._unlocked = True
+        return True
+    
     def is_encryption_initialized(self) -> bool:
         """检查加密系统是否已初始化"""
         return self.encryption.is_initialized()
@@ -111,44 +477,300 @@ class TOTPManager:
         """检查是否已经设置过密码（通过检查是否存在加密数据）"""
         return self.encryption.has_encrypted_data()
     
-    def _load_data(self):
-        """加载TOTP数据"""
-        if self.data_file.exists():
+    def get_load_error(self) -> Optional[str]:
+        """最近一次读取数据文件失败的原因，没有失败时为None"""
+        return self._load_error
+    
+    def _load_data(self) -> bool:
+        """加载TOTP数据（快照 + 日志重放），只读取条目元数据，密文在首次使用时按需读取
+        
+        数据文件不存在时得到空保险库；存在但无法读取时记录错误并返回False
+        """
+        try:
+            if self._raw_records:
+                # 条目直接由原始记录元组创建；旧格式数据（没有密钥环）完整读取，迁移要用到每个条目的盐值
+                secrets = False
+                data = self.store.load_records(secrets)
+                if not data.get("keyring"):
+                    secrets = True
+                    data = self.store.load_records(secrets)
+                entries = [TOTPEntry.from_record(record, secrets) for record in data.get("records", [])]
+                missing_ids = False
+            else:
+                data = self.store.load_index()
+                entries_data = data.get("entries", [])
+                if not data.get("keyring") or any(not entry_data.get("id") for entry_data in entries_data):
+                    # 旧格式数据完整读取：迁移要用到每个条目的盐值，没有ID的条目也无法按需读取
+                    data = self.store.load_all()
+                    entries_data = data.get("entries", [])
+                entries = [TOTPEntry.from_dict(entry_data) for entry_data in entries_data]
+                missing_ids = any(not entry_data.get("id") for entry_data in entries_data)
+            self._set_entries(entries)
+            self._keyring = data.get("keyring")
+            self._needs_snapshot = not self.store.can_append() or missing_ids
+        except (ValueError, IOError) as e:
+            self._set_entries([])
+            self._keyring = None
+            self._needs_snapshot = False
+            self._load_error = str(e) or type(e).__name__
+            return False
+        self._load_error = None
+        return True
+    
+    def _set_entries(self, entries: List[TOTPEntry]):
+        """替换全部条目并重建索引"""
+        self._entries = {}
+        self._name_index = {}
+        for entry in entries:
+            self._index_entry(entry)
+    
+    def _index_entry(self, entry: TOTPEntry):
+        """把条目加入索引"""
+        self._entries[entry.id] = entry
+        self._name_index.setdefault(entry.name, []).append(entry.id)
+    
+    def _unindex_name(self, entry: TOTPEntry):
+        """从名称索引中移除条目"""
+        entry_ids = self._name_index.get(entry.name)
+        if entry_ids and entry.id in entry_ids:
+            entry_ids.remove(entry.id)
+            if not entry_ids:
+                del self._name_index[entry.name]
+    
+    def _load_secrets(self, entries: List[TOTPEntry]):
+        """从存储批量读取尚未加载的条目密文"""
+        if all(entry.secret_loaded for entry in entries):
+            return
+        with self._save_lock:
+            pending = [entry for entry in entries if not entry.secret_loaded]
+            entry_ids = [entry.id for entry in pending]
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self._entries = [TOTPEntry.from_dict(entry_data) for entry_data in data.get("entries", [])]
-            except (json.JSONDecodeError, IOError):
-                self._entries = []
+                if self._raw_records:
+                    records = self.store.get_many_records(entry_ids)
+                else:
+                    records = self.store.get_many(entry_ids)
+            except (ValueError, IOError) as e:
+                # 缺少密文的条目不能写回存储，在重新成功加载之前禁止写入
+                self._load_error = str(e) or type(e).__name__
+                return
+            for entry in pending:
+                if self._raw_records:
+                    entry.load_secret_record(records.get(entry.id))
+                else:
+                    entry.load_secret(records.get(entry.id, {}))
+    
+    def _snapshot_data(self) -> Dict:
+        """当前状态的完整数据"""
+        entries = list(self._entries.values())
+        self._load_secrets(entries)
+        data = {
+            "version": "2.0.0" if self._keyring else "1.0.0",
+            "last_updated": time.time()
+        }
+        if self._raw_records:
+            data["records"] = [entry.to_record() for entry in entries]
         else:
-            self._entries = []
+            data["entries"] = [entry.to_dict() for entry in entries]
+        if self._keyring:
+            data["keyring"] = self._keyring
+        return data
     
     def _save_data(self) -> bool:
-        """保存TOTP数据"""
-        try:
-            data = {
-                "entries": [entry.to_dict() for entry in self._entries],
-                "version": "1.0.0",
-                "last_updated": time.time()
-            }
-            
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+        """完整写入快照（原子替换），用于密钥环变化等需要整体提交的修改"""
+        with self._save_lock:
+            if self._load_error is not None:
+                return False
+            data = self._snapshot_data()
+            if self._load_error is not None or not self.store.write_snapshot(data):
+                return False
+            self._needs_snapshot = False
+            # 快照已包含内存中的全部修改，延迟写入的记录不再需要
+            self._pending_records = []
+            self._pending_snapshot = False
             return True
+    
+    def _append_records(self, records: List[Dict]) -> bool:
+        """记录条目修改：批量修改中只暂存，延迟写入模式下交给后台线程，否则立即写入"""
+        with self._save_lock:
+            if self._batch is not None:
+                self._batch["records"].extend(records)
+                return True
+            if self._write_behind:
+                self._pending_records.extend(records)
+                self._schedule_flush()
+                return True
+        return self._write_records(records)
+    
+    def _write_records(self, records: List[Dict]) -> bool:
+        """向日志追加修改记录，日志过长时启动后台压缩"""
+        with self._save_lock:
+            if self._load_error is not None:
+                return False
+            if self._needs_snapshot:
+                return self._save_data()
+            if not self.store.batch(records):
+                return False
+        
+        if self.store.needs_compaction():
+            self._start_compaction()
+        return True
+    
+    def _schedule_flush(self):
+        """推迟写入截止时间（去抖），需要时启动后台写入线程"""
+        with self._flush_condition:
+            self._flush_deadline = time.monotonic() + self._flush_delay
+            if self._flush_thread is None or not self._flush_thread.is_alive():
+                self._flush_thread = threading.Thread(target=self._flush_loop, name="write-behind", daemon=True)
+                self._flush_thread.start()
+            self._flush_condition.notify()
+    
+    def _flush_loop(self):
+        """后台写入线程：等到最后一次修改后的延迟结束再写入，没有待写入的修改时退出"""
+        while True:
+            with self._flush_condition:
+                while self._flush_deadline is not None:
+                    remaining = self._flush_deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._flush_condition.wait(remaining)
+                if self._flush_deadline is None:
+                    self._flush_thread = None
+                    return
+                self._flush_deadline = None
+            self.flush()
+    
+    def _on_write_behind_changed(self, key: str, value):
+        """延迟写入配置变化：关闭时先写入已延迟的修改"""
+        if key == "storage.write_behind":
+            self._write_behind = bool(value)
+            if not self._write_behind:
+                self.flush()
+        elif key == "storage.write_behind_delay_ms":
+            self._flush_delay = (value if value is not None else 500) / 1000
+    
+    def has_pending_changes(self) -> bool:
+        """是否有尚未写入存储的修改（延迟写入模式）
+        
+        正在写入时等待写入结束：flush在写入前就取走了待写入的修改，不能据此认为已经落盘
+        """
+        with self._save_lock:
+            return bool(self._pending_records) or self._pending_snapshot
+    
+    def flush(self) -> bool:
+        """立即写入延迟保存的修改，需要持久化保证的调用方（锁定、退出等）使用
+        
+        写入失败时保留这些修改以便之后重试，并通过flush_error_callback报告
+        """
+        with self._flush_condition:
+            self._flush_deadline = None
+            self._flush_condition.notify()
+        
+        with self._save_lock:
+            if not self.has_pending_changes():
+                return True
+            records, self._pending_records = self._pending_records, []
+            snapshot, self._pending_snapshot = self._pending_snapshot, False
+            saved = self._save_data() if snapshot else self._write_records(records)
+            if not saved:
+                self._pending_records = records + self._pending_records
+                self._pending_snapshot = self._pending_snapshot or snapshot
+        
+        if not saved and self.flush_error_callback is not None:
+            self.flush_error_callback("保存条目修改失败，修改仍保留在内存中，将在下次保存时重试")
+        return saved
+    
+    def _start_compaction(self):
+        """在后台线程中压缩日志"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self.compact, name="journal-compaction", daemon=True)
+        self._compact_thread.start()
+    
+    def compact(self) -> bool:
+        """把日志合并进新的快照"""
+        # 只在锁内取得一致的状态，序列化和写文件在锁外进行，不阻塞界面操作
+        with self._save_lock:
+            if self._needs_snapshot:
+                return self._save_data()
+            data = self._snapshot_data()
+            if self._load_error is not None:
+                return False
+            seq = self.store.last_seq
+        return self.store.compact(data, seq)
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """批量修改：with块内的增删改只在内存中生效，退出时一次写入存储
+        
+        块内抛出异常时回滚内存中的修改并重新抛出；写入失败时同样回滚并抛出IOError。
+        可以嵌套，由最外层统一写入。块执行期间持有保存锁，后台压缩和参数升级会等待
+        """
+        with self._save_lock:
+            if self._batch is not None:
+                yield
+                return
+            
+            batch = {"records": [], "snapshot": False, "entries": dict(self._entries), "fields": {}}
+            self._batch = batch
+            try:
+                yield
+            except BaseException:
+                self._batch = None
+                self._rollback_batch(batch)
+                raise
+            
+            self._batch = None
+            saved = self._save_data() if batch["snapshot"] else self._append_records(batch["records"])
+            if not saved:
+                self._rollback_batch(batch)
+                raise IOError("批量修改写入失败")
+    
+    def _rollback_batch(self, batch: Dict):
+        """撤销批量修改在内存中的改动"""
+        for entry_id, (name, issuer, icon) in batch["fields"].items():
+            entry = batch["entries"].get(entry_id)
+            if entry is not None:
+                entry.name, entry.issuer, entry.icon = name, issuer, icon
+        self._set_entries(list(batch["entries"].values()))
+        self._clear_code_cache()
+    
+    def add_entries(self, items: Iterable[Tuple]) -> bool:
+        """批量添加条目，每项为 (名称, 密钥[, 发行者[, 图标]])；只写入一次，任何一项失败则全部不添加"""
+        try:
+            with self.batch():
+                for item in items:
+                    if not self.add_entry(*item):
+                        raise ValueError(f"无法添加条目: {item[0]}")
+        except (ValueError, IOError):
+            return False
+        return True
+    
+    def remove_entries(self, entry_ids: Iterable[str]) -> bool:
+        """按ID批量移除条目（不存在的ID忽略），只写入一次"""
+        try:
+            with self.batch():
+                for entry_id in entry_ids:
+                    self.remove_entry_by_id(entry_id)
         except IOError:
             return False
+        return True
     
     def add_entry(self, name: str, secret_key: str, issuer: str = "", icon: str = "") -> bool:
         """添加TOTP条目"""
         if not self.encryption.is_initialized():
             return False
         
-        # 加密密钥
-        encrypted_result = self.encryption.encrypt_totp_key(secret_key)
-        if not encrypted_result:
-            return False
-        
-        encrypted_key, salt = encrypted_result
+        # 加密密钥：已解包保险库数据密钥时直接使用数据密钥，否则使用旧的按盐值加密方式
+        if self.encryption.has_vault_key():
+            encrypted_key = self.encryption.encrypt_data(secret_key)
+            if not encrypted_key:
+                return False
+            salt = None
+        else:
+            encrypted_result = self.encryption.encrypt_totp_key(secret_key)
+            if not encrypted_result:
+                return False
+            encrypted_key, salt = encrypted_result
         
         # 创建条目
         entry = TOTPEntry(
@@ -159,41 +781,121 @@ class TOTPManager:
             icon=icon
         )
         
-        self._entries.append(entry)
-        return self._save_data()
+        self._index_entry(entry)
+        return self._append_records([{"op": "put", "entry": entry.to_dict()}])
     
     def remove_entry(self, name: str) -> bool:
-        """移除TOTP条目"""
-        self._entries = [entry for entry in self._entries if entry.name != name]
-        return self._save_data()
+        """移除指定名称的所有TOTP条目"""
+        entries = [self._entries[entry_id] for entry_id in self._name_index.get(name, [])]
+        for entry in entries:
+            self._discard_entry(entry)
+        return self._append_records([{"op": "delete", "id": entry.id} for entry in entries])
+    
+    def remove_entry_by_id(self, entry_id: str) -> bool:
+        """按ID移除TOTP条目"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return False
+        self._discard_entry(entry)
+        return self._append_records([{"op": "delete", "id": entry_id}])
+    
+    def _discard_entry(self, entry: TOTPEntry):
+        """从索引和缓存中移除条目"""
+        del self._entries[entry.id]
+        self._unindex_name(entry)
+        self._engine.discard(entry.encrypted_key)
+        self._code_cache.pop(entry.encrypted_key, None)
     
     def get_entry(self, name: str) -> Optional[TOTPEntry]:
-        """获取TOTP条目"""
-        for entry in self._entries:
-            if entry.name == name:
-                return entry
-        return None
+        """按名称获取TOTP条目（名称重复时返回最早使用该名称的条目）"""
+        entry_ids = self._name_index.get(name)
+        return self._entries[entry_ids[0]] if entry_ids else None
+    
+    def get_entry_by_id(self, entry_id: str) -> Optional[TOTPEntry]:
+        """按ID获取TOTP条目"""
+        return self._entries.get(entry_id)
     
     def get_all_entries(self) -> List[TOTPEntry]:
         """获取所有TOTP条目"""
-        return self._entries.copy()
+        return list(self._entries.values())
+    
+    def decrypt_secret(self, entry: TOTPEntry) -> Optional[str]:
+        """解密条目的TOTP密钥（计算引擎在条目首次使用时调用）"""
+        self._load_secrets([entry])
+        if not entry.encrypted_key or not self._unlocked:
+            return None
+        if entry.salt:
+            # 尚未迁移的旧条目（需要主密码）
+            if self._current_password is None:
+                return None
+            return self.encryption.decrypt_totp_key(entry.encrypted_key, entry.salt, self._current_password)
+        return self.encryption.decrypt_data(entry.encrypted_key)
+    
+    def _clear_code_cache(self):
+        """清空代码缓存"""
+        self._code_cache.clear()
+        self._code_cache_step = None
+        self._code_cache_expires_at = 0.0
+    
+    def _roll_code_cache(self, now: float):
+        """到达时间窗口边界时使代码缓存失效"""
+        if now < self._code_cache_expires_at and self._code_cache_step is not None:
+            return
+        step = self._engine.timecode(now)
+        if step != self._code_cache_step:
+            self._code_cache.clear()
+            self._code_cache_step = step
+        self._code_cache_expires_at = (step + 1) * self._engine.period
+    
+    def get_code_expiry(self) -> float:
+        """获取当前缓存代码的过期时间戳"""
+        return self._code_cache_expires_at
     
     def generate_totp(self, entry: TOTPEntry) -> Optional[str]:
         """生成TOTP代码"""
-        if not entry.encrypted_key or not entry.salt or not self._current_password:
+        if not self._unlocked:
             return None
-        
-        # 解密密钥
-        secret_key = self.encryption.decrypt_totp_key(entry.encrypted_key, entry.salt, self._current_password)
-        if not secret_key:
+        self._load_secrets([entry])
+        if not entry.encrypted_key:
             return None
         
-        try:
-            # 创建TOTP对象
-            totp = pyotp.TOTP(secret_key)
-            return totp.now()
-        except Exception:
-            return None
+        return self.generate_many([entry])[0]
+    
+    def generate_many(self, entries: Optional[List[TOTPEntry]] = None,
+                      for_time: Optional[float] = None) -> List[Optional[str]]:
+        """批量生成TOTP代码，默认生成全部条目，返回与条目顺序一致的列表"""
+        if entries is None:
+            entries = list(self._entries.values())
+        if not self._unlocked:
+            return [None] * len(entries)
+        # 只读取本次需要的条目密文
+        self._load_secrets(entries)
+        
+        if for_time is None:
+            now = time.time()
+            self._roll_code_cache(now)
+        else:
+            now = for_time
+            # 指定的时间不在当前缓存窗口内时直接计算，不污染缓存
+            if self._engine.timecode(now) != self._code_cache_step:
+                return self._engine.generate_many(entries, now)
+        
+        # 同一时间窗口内直接命中缓存，只计算未缓存的条目
+        codes: List[Optional[str]] = []
+        misses: List[int] = []
+        for entry in entries:
+            code = self._code_cache.get(entry.encrypted_key) if entry.encrypted_key else None
+            if code is None:
+                misses.append(len(codes))
+            codes.append(code)
+        
+        if misses:
+            fresh = self._engine.generate_many([entries[i] for i in misses], now)
+            for i, code in zip(misses, fresh):
+                codes[i] = code
+                if code is not None:
+                    self._code_cache[entries[i].encrypted_key] = code
+        return codes
     
     def get_remaining_time(self) -> int:
         """获取当前TOTP周期的剩余时间（秒）"""
@@ -225,15 +927,41 @@ class TOTPManager:
     
     def clear_all_entries(self) -> bool:
         """清除所有条目"""
-        self._entries.clear()
+        self._set_entries([])
+        self._engine.clear()
+        self._clear_code_cache()
+        if self._batch is not None:
+            # 批量修改结束时整体写入快照
+            self._batch["snapshot"] = True
+            return True
+        if self._write_behind:
+            with self._save_lock:
+                self._pending_records = []
+                self._pending_snapshot = True
+                self._schedule_flush()
+            return True
         return self._save_data()
     
     def update_entry(self, old_name: str, new_name: str, new_issuer: str = "", new_icon: str = "") -> bool:
-        """更新TOTP条目信息"""
-        for entry in self._entries:
-            if entry.name == old_name:
-                entry.name = new_name
-                entry.issuer = new_issuer
-                entry.icon = new_icon
-                return self._save_data()
-        return False
+        """按名称更新TOTP条目信息（名称重复时更新最早使用该名称的条目）"""
+        entry = self.get_entry(old_name)
+        if entry is None:
+            return False
+        return self.update_entry_by_id(entry.id, new_name, new_issuer, new_icon)
+    
+    def update_entry_by_id(self, entry_id: str, new_name: str, new_issuer: str = "", new_icon: str = "") -> bool:
+        """按ID更新TOTP条目信息"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return False
+        self._load_secrets([entry])
+        self._code_cache.pop(entry.encrypted_key, None)
+        if self._batch is not None:
+            self._batch["fields"].setdefault(entry_id, (entry.name, entry.issuer, entry.icon))
+        if entry.name != new_name:
+            self._unindex_name(entry)
+            entry.name = new_name
+            self._name_index.setdefault(new_name, []).append(entry.id)
+        entry.issuer = new_issuer
+        entry.icon = new_icon
+        return self._append_records([{"op": "put", "entry": entry.to_dict()}])
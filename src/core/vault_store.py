@@ -0,0 +1,172 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+保险库存储接口模块
+定义TOTPManager使用的存储接口，并按配置创建存储后端
+"""
+
+import copy
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Protocol
+
+from src.core.binary_store import BinaryVaultStore
+from src.core.journal_store import JournalStore, strip_secrets
+from src.core.sqlite_store import SqliteStore
+from src.utils.config import ConfigManager
+
+
+class VaultStore(Protocol):
+    """保险库存储接口
+    
+    条目以字典形式交换（格式同TOTPEntry.to_dict，必须带id）；load_all返回的数据字典
+    还包含version和keyring。load_index与load_all相同但条目不含encrypted_key和salt，
+    密文之后用get_many按ID批量读取。batch的每条记录为 {"op": "put", "entry": 条目字典}
+    或 {"op": "delete", "id": 条目ID}，整批原子生效。
+    RAW_RECORDS为True的存储另外提供load_records和get_many_records，条目为原始记录元组
+    （格式同TOTPEntry.to_record），write_snapshot和compact也接受放在records中的原始记录元组
+    """
+    
+    def exists(self) -> bool: ...
+    
+    def has_data(self) -> bool: ...
+    
+    def load_all(self) -> Dict: ...
+    
+    def load_index(self) -> Dict: ...
+    
+    def get(self, entry_id: str) -> Optional[Dict]: ...
+    
+    def get_many(self, entry_ids: List[str]) -> Dict[str, Dict]: ...
+    
+    def iterate(self) -> Iterator[Dict]: ...
+    
+    def put(self, entry_data: Dict) -> bool: ...
+    
+    def delete(self, entry_id: str) -> bool: ...
+    
+    def batch(self, records: List[Dict]) -> bool: ...
+    
+    def write_snapshot(self, data: Dict) -> bool: ...
+    
+    def can_append(self) -> bool: ...
+    
+    def needs_compaction(self) -> bool: ...
+    
+    @property
+    def last_seq(self) -> int: ...
+    
+    def compact(self, data: Dict, seq: int) -> bool: ...
+
+
+class MemoryVaultStore:
+    """内存存储类（用于测试和基准测试，不落盘）"""
+    
+    def __init__(self):
+        self._meta: Dict = {}
+        self._entries: Dict[str, Dict] = {}
+    
+    def exists(self) -> bool:
+        """检查是否写入过数据"""
+        return bool(self._meta)
+    
+    def has_data(self) -> bool:
+        """检查是否已有初始化过的保险库数据"""
+        return "version" in self._meta
+    
+    @property
+    def last_seq(self) -> int:
+        """内存存储没有日志序号"""
+        return 0
+    
+    def can_append(self) -> bool:
+        """是否可以只写入修改的条目"""
+        return True
+    
+    def needs_compaction(self) -> bool:
+        """内存存储不需要压缩"""
+        return False
+    
+    def compact(self, data: Dict, seq: int) -> bool:
+        """内存存储不需要压缩"""
+        return True
+    
+    def load_all(self) -> Dict:
+        """读取全部数据（返回副本）"""
+        data = copy.deepcopy(self._meta)
+        data["entries"] = [dict(entry_data) for entry_data in self._entries.values()]
+        return data
+    
+    def load_index(self) -> Dict:
+        """读取全部数据，条目不含密文和盐值"""
+        data = copy.deepcopy(self._meta)
+        data["entries"] = [strip_secrets(entry_data) for entry_data in self._entries.values()]
+        return data
+    
+    def get(self, entry_id: str) -> Optional[Dict]:
+        """按ID读取条目"""
+        entry_data = self._entries.get(entry_id)
+        return dict(entry_data) if entry_data else None
+    
+    def get_many(self, entry_ids: List[str]) -> Dict[str, Dict]:
+        """按ID批量读取条目"""
+        return {entry_id: dict(self._entries[entry_id]) for entry_id in entry_ids if entry_id in self._entries}
+    
+    def iterate(self) -> Iterator[Dict]:
+        """按顺序遍历条目"""
+        return (dict(entry_data) for entry_data in list(self._entries.values()))
+    
+    def put(self, entry_data: Dict) -> bool:
+        """写入单个条目"""
+        return self.batch([{"op": "put", "entry": entry_data}])
+    
+    def delete(self, entry_id: str) -> bool:
+        """删除单个条目"""
+        return self.batch([{"op": "delete", "id": entry_id}])
+    
+    def batch(self, records: List[Dict]) -> bool:
+        """应用一批修改记录"""
+        for record in records:
+            if record["op"] == "put":
+                self._entries[record["entry"]["id"]] = dict(record["entry"])
+            elif record["op"] == "delete":
+                self._entries.pop(record["id"], None)
+        return True
+    
+    def write_snapshot(self, data: Dict) -> bool:
+        """替换全部数据"""
+        data = copy.deepcopy(data)
+        self._entries = {entry_data["id"]: entry_data for entry_data in data.pop("entries", [])}
+        self._meta = data
+        return True
+
+
+def create_store(config: ConfigManager, data_dir: Path = Path("data")) -> VaultStore:
+    """按配置storage.backend创建存储后端：journal（JSON快照 + 日志，默认）、binary、sqlite 或 memory"""
+    backend = config.get("storage.backend", "journal")
+    if backend == "memory":
+        return MemoryVaultStore()
+    
+    data_dir.mkdir(exist_ok=True)
+    json_file = data_dir / "totp_data.json"
+    if backend == "sqlite":
+        # 首次打开时迁移totp_data.json
+        return SqliteStore(data_dir / "totp_data.db", legacy_path=json_file)
+    compact_threshold = config.get("storage.journal_compact_threshold", 1000)
+    if backend == "binary":
+        # 首次打开时迁移totp_data.json
+        return BinaryVaultStore(data_dir / "totp_data.vault", compact_threshold, legacy_path=json_file)
+    return JournalStore(json_file, compact_threshold)
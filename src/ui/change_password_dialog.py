@@ -0,0 +1,178 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+修改主密码对话框模块
+验证旧密码后在后台重新加密保险库，并显示进度
+"""
+
+from typing import Callable, Optional
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import (
+    QDialog,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QVBoxLayout,
+)
+
+from src.ui.workers import TaskWorker
+
+
+class ChangePasswordDialog(QDialog):
+    """修改主密码对话框类"""
+    
+    def __init__(self, parent=None, task: Optional[Callable] = None):
+        super().__init__(parent)
+        # task(旧密码, 新密码, progress_callback=...) -> bool，在后台线程中运行
+        self.task = task
+        self._worker: Optional[TaskWorker] = None
+        
+        self.setup_ui()
+        self.setWindowTitle("修改主密码")
+        self.setModal(True)
+        self.resize(420, 260)
+    
+    def setup_ui(self):
+        """设置UI"""
+        layout = QVBoxLayout(self)
+        layout.setSpacing(15)
+        layout.setContentsMargins(30, 30, 30, 30)
+        
+        # 标题
+        title_label = QLabel("修改主密码")
+        title_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        title_label.setStyleSheet("color: #2c3e50;")
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title_label)
+        
+        form_layout = QFormLayout()
+        
+        self.old_password_edit = QLineEdit()
+        self.old_password_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        form_layout.addRow("当前密码:", self.old_password_edit)
+        
+        self.new_password_edit = QLineEdit()
+        self.new_password_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        self.new_password_edit.setPlaceholderText("至少8个字符")
+        form_layout.addRow("新密码:", self.new_password_edit)
+        
+        self.confirm_edit = QLineEdit()
+        self.confirm_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        self.confirm_edit.returnPressed.connect(self.accept)
+        form_layout.addRow("确认新密码:", self.confirm_edit)
+        
+        layout.addLayout(form_layout)
+        
+        # 重新加密进度
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        
+        # 按钮
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.cancel_button)
+        
+        self.ok_button = QPushButton("确定")
+        self.ok_button.setDefault(True)
+        self.ok_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.ok_button)
+        
+        layout.addLayout(button_layout)
+    
+    def accept(self):
+        """接受对话框"""
+        # 后台任务运行中忽略重复提交
+        if self._worker is not None:
+            return
+        
+        old_password = self.old_password_edit.text()
+        new_password = self.new_password_edit.text()
+        
+        if not old_password or not new_password:
+            QMessageBox.warning(self, "警告", "请输入密码")
+            return
+        
+        if new_password != self.confirm_edit.text():
+            QMessageBox.warning(self, "警告", "密码不匹配")
+            return
+        
+        if len(new_password) < 8:
+            QMessageBox.warning(self, "警告", "密码至少需要8个字符")
+            return
+        
+        if self.task is None:
+            super().accept()
+            return
+        
+        worker = TaskWorker(self.task, old_password, new_password)
+        worker.kwargs["progress_callback"] = worker.report_progress
+        worker.signals.progress.connect(self.on_progress)
+        worker.signals.finished.connect(lambda result: self.on_task_finished(bool(result)))
+        worker.signals.failed.connect(lambda message: self.on_task_finished(False))
+        self._worker = worker
+        self.set_busy(True)
+        worker.start()
+    
+    def reject(self):
+        """拒绝对话框（重新加密进行中不能中途取消）"""
+        if self._worker is not None:
+            return
+        super().reject()
+    
+    def closeEvent(self, event):
+        """关闭事件"""
+        if self._worker is not None:
+            event.ignore()
+            return
+        super().closeEvent(event)
+    
+    def set_busy(self, busy: bool):
+        """切换后台任务运行状态"""
+        for widget in (self.old_password_edit, self.new_password_edit, self.confirm_edit,
+                       self.ok_button, self.cancel_button):
+            widget.setEnabled(not busy)
+        self.progress_bar.setVisible(busy)
+        if busy:
+            self.progress_bar.setRange(0, 0)
+    
+    def on_progress(self, done: int, total: int):
+        """更新重新加密进度"""
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"正在重新加密 {done}/{total}")
+    
+    def on_task_finished(self, success: bool):
+        """后台任务完成"""
+        self._worker = None
+        self.set_busy(False)
+        if success:
+            super().accept()
+            return
+        QMessageBox.critical(self, "错误", "修改密码失败，请确认当前密码是否正确")
+        self.old_password_edit.selectAll()
+        self.old_password_edit.setFocus()
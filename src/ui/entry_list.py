@@ -0,0 +1,331 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+"""
+条目列表模块
+条目列表的模型、过滤代理和绘制委托：列表只保存条目引用和已生成的代码，
+每一行由委托直接绘制，不为每个条目创建控件，只有可见的行才会被绘制
+"""
+
+from typing import Dict, List, Optional
+
+from PySide6.QtCore import QAbstractListModel, QEvent, QModelIndex, QRect, QSize, QSortFilterProxyModel, Qt, QTimer, Signal
+from PySide6.QtGui import QBrush, QColor, QCursor, QFont, QFontMetrics, QLinearGradient, QPainter, QPen
+from PySide6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QToolTip
+
+from src.core.totp_manager import TOTPEntry
+
+# 自定义数据角色
+ENTRY_ROLE = Qt.ItemDataRole.UserRole + 1  # 条目对象
+CODE_ROLE = Qt.ItemDataRole.UserRole + 2  # 已生成的代码（尚未生成时为None）
+PROGRESS_ROLE = Qt.ItemDataRole.UserRole + 3  # 当前周期的进度百分比
+
+PLACEHOLDER_CODE = "••••••"
+
+
+class EntryListModel(QAbstractListModel):
+    """条目列表模型类"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries: List[TOTPEntry] = []
+        # 条目ID -> 行号，以及条目ID -> 已生成的代码
+        self._rows: Dict[str, int] = {}
+        self._codes: Dict[str, str] = {}
+        self._progress = 0.0
+    
+    def set_entries(self, entries: List[TOTPEntry]):
+        """替换全部条目（已生成的代码一并清空）"""
+        self.beginResetModel()
+        self._entries = list(entries)
+        self._rows = {entry.id: row for row, entry in enumerate(self._entries)}
+        self._codes = {}
+        self.endResetModel()
+    
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._entries)
+    
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._entries):
+            return None
+        entry = self._entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{entry.name} - {entry.issuer}" if entry.issuer else entry.name
+        if role == ENTRY_ROLE:
+            return entry
+        if role == CODE_ROLE:
+            return self._codes.get(entry.id)
+        if role == PROGRESS_ROLE:
+            return self._progress
+        return None
+    
+    def entry(self, row: int) -> Optional[TOTPEntry]:
+        """获取指定行的条目"""
+        return self._entries[row] if 0 <= row < len(self._entries) else None
+    
+    def entries(self) -> List[TOTPEntry]:
+        """获取全部条目（与行顺序一致）"""
+        return list(self._entries)
+    
+    def row_of(self, entry_id: str) -> int:
+        """获取条目所在的行，不存在时返回-1"""
+        return self._rows.get(entry_id, -1)
+    
+    def set_codes(self, codes: Dict[str, Optional[str]], progress: float):
+        """替换全部代码并更新进度（每秒调用，只传入可见行的代码，其余行的旧代码一并丢弃）
+        
+        只通知传入的行重绘，值为None的行显示为占位符
+        """
+        self._codes = {entry_id: code for entry_id, code in codes.items() if code}
+        self._progress = progress
+        self._emit_rows_changed(codes, [CODE_ROLE, PROGRESS_ROLE])
+    
+    def add_codes(self, codes: Dict[str, Optional[str]]):
+        """补充代码（滚动后新出现的行），不影响其他行"""
+        self._codes.update((entry_id, code) for entry_id, code in codes.items() if code)
+        self._emit_rows_changed(codes, [CODE_ROLE])
+    
+    def clear_codes(self):
+        """清空已生成的代码（锁定时调用）"""
+        self._codes = {}
+        if self._entries:
+            self.dataChanged.emit(self.index(0), self.index(len(self._entries) - 1), [CODE_ROLE])
+    
+    def _emit_rows_changed(self, entry_ids, roles: List[int]):
+        """通知包含这些条目的行范围发生变化"""
+        rows = [self._rows[entry_id] for entry_id in entry_ids if entry_id in self._rows]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), roles)
+
+
+class EntryFilterModel(QSortFilterProxyModel):
+    """条目过滤代理类：按名称或发行者过滤（不区分大小写）"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ""
+        # 过滤只依赖名称和发行者，它们变化时模型会整体重置；
+        # 关闭动态过滤，代码每秒更新时不必逐行重新判断是否匹配
+        self.setDynamicSortFilter(False)
+    
+    def set_filter_text(self, text: str):
+        """设置过滤文本"""
+        self._text = text.lower()
+        self.invalidateFilter()
+    
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if not self._text:
+            return True
+        entry = self.sourceModel().entry(source_row)
+        return entry is not None and (self._text in entry.name.lower() or self._text in entry.issuer.lower())
+
+
+class EntryDelegate(QStyledItemDelegate):
+    """条目绘制委托类：绘制图标、名称、发行者、代码、进度条和按钮，并处理按钮和代码的点击"""
+    
+    info_requested = Signal(str)  # 查看密钥请求信号，携带条目ID
+    delete_requested = Signal(str)  # 删除请求信号，携带条目ID
+    code_copied = Signal(str)  # 代码复制信号，携带提示信息
+    
+    ROW_HEIGHT = 80
+    ICON_SIZE = 32
+    BUTTON_SIZE = 30
+    COPY_HIGHLIGHT_MS = 300
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name_font = QFont("Arial", 10, QFont.Weight.Bold)
+        self.issuer_font = QFont("Arial", 8)
+        self.code_font = QFont("Courier New", 14, QFont.Weight.Bold)
+        self.code_font.setLetterSpacing(QFont.SpacingType.AbsoluteSpacing, 2)
+        self.icon_font = QFont("Arial", 10, QFont.Weight.Bold)
+        self.button_font = QFont("Arial", 11, QFont.Weight.Bold)
+        self._name_height = QFontMetrics(self.name_font).height()
+        self._issuer_height = QFontMetrics(self.issuer_font).height()
+        self._code_metrics = QFontMetrics(self.code_font)
+        # 刚复制过代码的条目ID，短暂显示为绿色
+        self._copied_id: Optional[str] = None
+    
+    def sizeHint(self, option, index: QModelIndex) -> QSize:
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+    
+    def _layout(self, rect: QRect, has_issuer: bool) -> Dict[str, QRect]:
+        """计算一行中各部分的位置（绘制和点击检测共用）"""
+        frame = rect.adjusted(1, 1, -1, -1)
+        content = frame.adjusted(10, 5, -10, -5)
+        middle = content.center().y()
+        
+        delete = QRect(content.right() - self.BUTTON_SIZE + 1, middle - self.BUTTON_SIZE // 2,
+                       self.BUTTON_SIZE, self.BUTTON_SIZE)
+        info = delete.translated(-self.BUTTON_SIZE - 6, 0)
+        icon = QRect(content.left(), middle - self.ICON_SIZE // 2, self.ICON_SIZE, self.ICON_SIZE)
+        
+        left = icon.right() + 7
+        width = max(0, info.left() - 6 - left)
+        code_height = self._code_metrics.height()
+        text_height = self._name_height + code_height + 6 + (self._issuer_height + 2 if has_issuer else 0)
+        top = middle - text_height // 2
+        layout = {"frame": frame, "icon": icon, "info": info, "delete": delete}
+        if has_issuer:
+            layout["issuer"] = QRect(left, top, width, self._issuer_height)
+            top += self._issuer_height + 2
+        layout["name"] = QRect(left, top, width, self._name_height)
+        top += self._name_height
+        code_width = min(width, self._code_metrics.horizontalAdvance("0" * 8))
+        layout["code"] = QRect(left, top, code_width, code_height)
+        layout["progress"] = QRect(left, top + code_height + 2, width, 4)
+        return layout
+    
+    def paint(self, painter: QPainter, option, index: QModelIndex):
+        entry = index.data(ENTRY_ROLE)
+        if entry is None:
+            return
+        code = index.data(CODE_ROLE)
+        progress = index.data(PROGRESS_ROLE) or 0
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        layout = self._layout(option.rect, bool(entry.issuer))
+        
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        
+        # 背景：选中时蓝框、较深的底色；悬停时蓝框、浅灰底色
+        if selected:
+            painter.setPen(QPen(QColor("#3498db"), 1))
+            painter.setBrush(QColor("#e8f4fc"))
+        elif hovered:
+            painter.setPen(QPen(QColor("#3498db"), 1))
+            painter.setBrush(QColor("#f8f9fa"))
+        else:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("white"))
+        painter.drawRoundedRect(layout["frame"], 8, 8)
+        
+        # 图标：名称首字母
+        icon = layout["icon"]
+        gradient = QLinearGradient(icon.topLeft(), icon.bottomRight())
+        gradient.setColorAt(0, QColor("#4CAF50"))
+        gradient.setColorAt(1, QColor("#45a049"))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QBrush(gradient))
+        painter.drawEllipse(icon)
+        painter.setPen(QColor("white"))
+        painter.setFont(self.icon_font)
+        painter.drawText(icon, Qt.AlignmentFlag.AlignCenter, entry.name[0].upper() if entry.name else "?")
+        
+        # 发行者、名称和代码
+        if "issuer" in layout:
+            painter.setPen(QColor("#7f8c8d"))
+            painter.setFont(self.issuer_font)
+            painter.drawText(layout["issuer"], Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                             QFontMetrics(self.issuer_font).elidedText(entry.issuer, Qt.TextElideMode.ElideRight,
+                                                                      layout["issuer"].width()))
+        painter.setPen(QColor("#2c3e50"))
+        painter.setFont(self.name_font)
+        painter.drawText(layout["name"], Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         QFontMetrics(self.name_font).elidedText(entry.name, Qt.TextElideMode.ElideRight,
+                                                                layout["name"].width()))
+        painter.setPen(QColor(46, 204, 46) if entry.id == self._copied_id else QColor("#e74c3c"))
+        painter.setFont(self.code_font)
+        painter.drawText(layout["code"], Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         code or PLACEHOLDER_CODE)
+        
+        # 进度条
+        bar = layout["progress"]
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor("#d4e6f1" if selected else "#ecf0f1"))
+        painter.drawRoundedRect(bar, 2, 2)
+        if code and progress > 0:
+            chunk = QRect(bar.left(), bar.top(), int(bar.width() * min(progress, 100) / 100), bar.height())
+            gradient = QLinearGradient(chunk.topLeft(), chunk.topRight())
+            gradient.setColorAt(0, QColor("#3498db"))
+            gradient.setColorAt(1, QColor("#2980b9"))
+            painter.setBrush(QBrush(gradient))
+            painter.drawRoundedRect(chunk, 2, 2)
+        
+        # 按钮：只有鼠标所在的行才需要检测按钮悬停
+        mouse = None
+        if hovered and option.widget is not None:
+            mouse = option.widget.viewport().mapFromGlobal(QCursor.pos())
+        self._paint_button(painter, layout["info"], "i", "#3498db", "#d6eaf8",
+                           mouse is not None and layout["info"].contains(mouse))
+        self._paint_button(painter, layout["delete"], "🗑️", "#e74c3c", "#ffcdd2",
+                           mouse is not None and layout["delete"].contains(mouse))
+        
+        painter.restore()
+    
+    def _paint_button(self, painter: QPainter, rect: QRect, text: str, color: str, hover_color: str, hovered: bool):
+        """绘制圆形按钮"""
+        painter.setPen(QPen(QColor(color), 2))
+        painter.setBrush(QColor(hover_color if hovered else "white"))
+        painter.drawEllipse(rect.adjusted(1, 1, -1, -1))
+        painter.setPen(QColor(color))
+        painter.setFont(self.button_font)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+    
+    def editorEvent(self, event: QEvent, model, option, index: QModelIndex) -> bool:
+        """处理按钮和代码的点击（按钮上的按下事件不改变选中状态）"""
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease):
+            return super().editorEvent(event, model, option, index)
+        if event.button() != Qt.MouseButton.LeftButton:
+            return super().editorEvent(event, model, option, index)
+        entry = index.data(ENTRY_ROLE)
+        if entry is None:
+            return False
+        
+        pos = event.position().toPoint()
+        layout = self._layout(option.rect, bool(entry.issuer))
+        for name, signal in (("info", self.info_requested), ("delete", self.delete_requested)):
+            if layout[name].contains(pos):
+                if event.type() == QEvent.Type.MouseButtonRelease:
+                    signal.emit(entry.id)
+                return True
+        
+        code = index.data(CODE_ROLE)
+        if event.type() == QEvent.Type.MouseButtonRelease and code and layout["code"].contains(pos):
+            self.copy_code(entry.id, code)
+        return super().editorEvent(event, model, option, index)
+    
+    def copy_code(self, entry_id: str, code: str):
+        """复制代码到剪贴板，代码短暂变绿"""
+        QApplication.clipboard().setText(code)
+        self._copied_id = entry_id
+        self._update_view()
+        self.code_copied.emit(f"已复制: {code}")
+        QTimer.singleShot(self.COPY_HIGHLIGHT_MS, self._clear_copied)
+    
+    def _clear_copied(self):
+        self._copied_id = None
+        self._update_view()
+    
+    def _update_view(self):
+        view = self.parent()
+        if view is not None:
+            view.viewport().update()
+    
+    def helpEvent(self, event, view, option, index: QModelIndex) -> bool:
+        """按钮的提示文字"""
+        entry = index.data(ENTRY_ROLE)
+        if entry is not None and event.type() == QEvent.Type.ToolTip:
+            layout = self._layout(option.rect, bool(entry.issuer))
+            for name, tip in (("info", "查看明文密钥"), ("delete", "删除此条目")):
+                if layout[name].contains(event.pos()):
+                    QToolTip.showText(event.globalPos(), tip, view)
+                    return True
+        return super().helpEvent(event, view, option, index)
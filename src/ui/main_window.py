@@ -24,11 +24,11 @@ import sys
 import time
 from typing import Optional
 
-from PySide6.QtCore import QEvent, QSize, Qt, QTimer, Signal
-from PySide6.QtGui import QAction, QColor, QFont, QIcon, QMouseEvent, QPalette
+from PySide6.QtCore import QEvent, QPoint, QSize, Qt, QTimer, Signal
+from PySide6.QtGui import QAction, QColor, QFont, QIcon, QKeySequence, QMouseEvent, QPalette
 from PySide6.QtWidgets import (
-    QApplication, QCheckBox, QDialog, QDialogButtonBox, QFormLayout, QFrame, QGroupBox,
-    QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem, QMainWindow,
+    QAbstractItemView, QApplication, QCheckBox, QDialog, QDialogButtonBox, QFormLayout, QFrame, QGroupBox,
+    QHBoxLayout, QInputDialog, QLabel, QLineEdit, QListView, QMainWindow,
     QMessageBox, QProgressBar, QPushButton, QSplitter, QStatusBar, QTabWidget,
     QTextEdit, QToolBar, QVBoxLayout, QWidget
 )
@@ -36,7 +36,10 @@ from PySide6.QtWidgets import (
 from src.core.encryption import EncryptionManager
 from src.core.totp_manager import TOTPEntry, TOTPManager
 from src.ui.add_entry_dialog import AddEntryDialog
+from src.ui.change_password_dialog import ChangePasswordDialog
+from src.ui.entry_list import CODE_ROLE, ENTRY_ROLE, EntryDelegate, EntryFilterModel, EntryListModel
 from src.ui.password_dialog import PasswordDialog
+from src.ui.workers import TaskWorker
 
 
 
@@ -77,289 +80,569 @@ class CodeDisplayLabel(QLabel):
     }
 """))
 
-class TOTPItemWidget(QWidget):
-    """TOTP条目小部件"""
+class MainWindow(QMainWindow):
+    """主窗口类"""
     
-    delete_requested = Signal(str)  # 删除请求信号
-    code_copied = Signal(str)  # 新增：代码复制信号
+    flush_failed = Signal(str)  # 延迟写入失败信号（由后台写入线程发出），携带错误信息
     
-    def __init__(self, entry: TOTPEntry, parent=None, main_window=None):
-        super().__init__(parent)
-        self.entry = entry
-        self.main_window = main_window  # 保存主窗口引用
-        self._is_hovered = False
-        self._is_selected = False  # 新增：选中状态
+    def __init__(self, totp_manager: TOTPManager):
+        super().__init__()
+        self.totp_manager = totp_manager
+        self.flush_failed.connect(self.on_flush_failed)
+        self.totp_manager.flush_error_callback = self.flush_failed.emit
+        self._upgrade_worker: Optional[TaskWorker] = None
+        # 最近一次用户操作的时间，用于空闲自动锁定
+        self._last_activity = time.monotonic()
+        
         self.setup_ui()
-        # 启用悬停事件跟踪
-        self.setAttribute(Qt.WidgetAttribute.WA_Hover, True)
-        self.setMouseTracking(True)
-        
-    def event(self, event: QEvent) -> bool:
-        # 处理悬停事件
-        if event.type() == QEvent.Type.HoverEnter:
-            self._is_hovered = True
-            self.update_hover_style()
-        elif event.type() == QEvent.Type.HoverLeave:
-            self._is_hovered = False
-            self.update_hover_style()
-        return super().event(event)
-    
-    def update_style(self):
-        """根据悬停和选中状态更新样式"""
-        if self._is_selected:
-            # 选中状态：蓝框，比hover状态更深一些的底色
-            self.frame.setStyleSheet("""
-                QFrame {
-                    background: #e8f4fc;
-                    border: 1px solid #3498db;
-                    border-radius: 8px;
-                    margin: 0px;
-                }
-                QFrame QLabel {
-                    border: none;
-                    background: transparent;
-                }
-                QFrame QProgressBar {
-                    border: none;
-                    background: #d4e6f1;
-                }
-            """)
-        elif self._is_hovered:
-            # 悬停状态：蓝框，浅灰底色
-            self.frame.setStyleSheet("""
-                QFrame {
-                    background: #f8f9fa;
-                    border: 1px solid #3498db;
-                    border-radius: 8px;
-                    margin: 0px;
-                }
-                QFrame QLabel {
-                    border: none;
-                    background: transparent;
-                }
-                QFrame QProgressBar {
-                    border: none;
-                    background: #ecf0f1;
-                }
-            """)
-        else:
-            # 普通状态
-            self.frame.setStyleSheet("""
-                QFrame {
-                    background: white;
-                    border: 1px solid transparent;
-                    border-radius: 8px;
-                    margin: 0px;
-                }
-                QFrame QLabel {
-                    border: none;
-                    background: transparent;
-                }
-                QFrame QProgressBar {
-                    border: none;
-                    background: #ecf0f1;
-                }
-            """)
-    
-    def update_hover_style(self):
-        """兼容旧方法，调用新的update_style"""
-        self.update_style()
-    
-    def set_selected(self, selected: bool):
-        """设置选中状态"""
-        if self._is_selected != selected:
-            self._is_selected = selected
-            self.update_style()
+        self.setup_timers()
+        # 先隐藏窗口，等密码验证成功后再显示
+        self.hide()
+        self.check_initialization()
     
     def setup_ui(self):
-        # 主布局：只放一个 Frame
-        main_layout = QHBoxLayout(self)
+        """设置UI"""
+        self.setWindowTitle("TOTP密码管理器")
+        self.setGeometry(100, 100, 900, 600)
+        
+        # 设置现代化样式
+        self.setStyleSheet("""
+            QMainWindow {
+                background: #f8f9fa;
+            }
+            QWidget {
+                font-family: "Segoe UI", Arial, sans-serif;
+            }
+        """)
+        
+        # 创建中央部件
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        
+        # 主布局
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setSpacing(0)
         main_layout.setContentsMargins(0, 0, 0, 0)
-
-        # 创建真实 QFrame 框架
-        self.frame = QFrame()
-        self.frame.setFrameShape(QFrame.Shape.NoFrame)  # 我们用样式控制外观
-        self.frame.setStyleSheet("""
-            QFrame {
+        
+        # 创建工具栏
+        self.create_toolbar()
+        
+        # 创建分割器
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        
+        # 左侧列表
+        self.create_entry_list(splitter)
+        
+        # 右侧详情
+        self.create_detail_view(splitter)
+        
+        # 设置分割器比例
+        splitter.setSizes([300, 600])
+        
+        main_layout.addWidget(splitter)
+        
+        # 创建状态栏
+        self.create_statusbar()
+    
+    def create_toolbar(self):
+        """创建工具栏"""
+        toolbar = QToolBar("主工具栏")
+        toolbar.setIconSize(QSize(24, 24))
+        self.addToolBar(toolbar)
+        
+        # 添加条目动作
+        add_action = QAction("➕ 添加", self)
+        add_action.triggered.connect(self.show_add_entry_dialog)
+        toolbar.addAction(add_action)
+        
+        toolbar.addSeparator()
+        
+        # 刷新动作
+        refresh_action = QAction("🔄 刷新", self)
+        refresh_action.triggered.connect(self.refresh_all_codes)
+        toolbar.addAction(refresh_action)
+        
+        # 锁定动作
+        lock_action = QAction("🔒 锁定", self)
+        lock_action.triggered.connect(self.lock_vault)
+        toolbar.addAction(lock_action)
+        
+        # 快速解锁PIN动作
+        pin_action = QAction("📌 快速解锁", self)
+        pin_action.triggered.connect(self.show_quick_unlock_setup)
+        toolbar.addAction(pin_action)
+        
+        # 修改密码动作
+        change_password_action = QAction("🔑 修改密码", self)
+        change_password_action.triggered.connect(self.show_change_password_dialog)
+        toolbar.addAction(change_password_action)
+        
+        # 设置动作
+        settings_action = QAction("⚙️ 设置", self)
+        settings_action.triggered.connect(self.show_settings)
+        toolbar.addAction(settings_action)
+    
+    def create_entry_list(self, parent):
+        """创建条目列表"""
+        list_widget = QWidget()
+        list_layout = QVBoxLayout(list_widget)
+        list_layout.setContentsMargins(10, 10, 10, 10)
+        
+        # 标题
+        title_label = QLabel("TOTP条目")
+        title_label.setFont(QFont("Arial", 14, QFont.Weight.Bold))
+        title_label.setStyleSheet("color: #2c3e50; margin-bottom: 10px;")
+        list_layout.addWidget(title_label)
+        
+        # 搜索框
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索条目...")
+        self.search_edit.textChanged.connect(self.filter_entries)
+        self.search_edit.setStyleSheet("""
+            QLineEdit {
+                padding: 8px;
+                border: 2px solid #bdc3c7;
+                border-radius: 6px;
+                font-size: 12px;
+            }
+            QLineEdit:focus {
+                border-color: #3498db;
+            }
+        """)
+        list_layout.addWidget(self.search_edit)
+        
+        # 条目列表：模型只保存条目引用，每一行由委托绘制，只有可见的行才有开销
+        self.entry_model = EntryListModel(self)
+        self.entry_filter = EntryFilterModel(self)
+        self.entry_filter.setSourceModel(self.entry_model)
+        self.entry_list = QListView()
+        self.entry_list.setModel(self.entry_filter)
+        self.entry_delegate = EntryDelegate(self.entry_list)
+        self.entry_delegate.delete_requested.connect(self.on_delete_entry_requested)
+        self.entry_delegate.info_requested.connect(self.on_info_requested)
+        self.entry_delegate.code_copied.connect(self.on_code_copied)
+        self.entry_list.setItemDelegate(self.entry_delegate)
+        # 所有行高度相同，视图不必逐行计算尺寸
+        self.entry_list.setUniformItemSizes(True)
+        self.entry_list.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.entry_list.setMouseTracking(True)
+        self.entry_list.viewport().setAttribute(Qt.WidgetAttribute.WA_Hover, True)
+        # 直接设置item间距，避免hover时互相遮盖
+        self.entry_list.setSpacing(4)
+        self.entry_list.setStyleSheet("""
+            QListView {
                 background: white;
-                border: 1px solid transparent;
+                border: 1px solid #bdc3c7;
+                border-radius: 6px;
+                outline: none;
+            }
+        """)
+        # 按住Ctrl/Shift多选，Delete键或右键菜单删除所选条目
+        self.entry_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        delete_action = QAction("🗑️ 删除所选条目", self.entry_list)
+        delete_action.setShortcut(QKeySequence(QKeySequence.StandardKey.Delete))
+        delete_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+        delete_action.triggered.connect(self.delete_selected_entries)
+        self.entry_list.addAction(delete_action)
+        self.entry_list.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
+        self.entry_list.selectionModel().currentChanged.connect(self.on_entry_selected)
+        # 滚动后立即为新出现的行补上代码，不必等到下一次定时刷新
+        self.entry_list.verticalScrollBar().valueChanged.connect(self.fill_visible_codes)
+        list_layout.addWidget(self.entry_list)
+        
+        parent.addWidget(list_widget)
+    
+    def create_detail_view(self, parent):
+        """创建详情视图"""
+        detail_widget = QWidget()
+        detail_layout = QVBoxLayout(detail_widget)
+        detail_layout.setContentsMargins(20, 20, 20, 20)
+        detail_layout.setSpacing(15)  # 增加控件之间的垂直间距
+        
+        # 详情标题
+        self.detail_title = QLabel("选择条目查看详情")
+        self.detail_title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        self.detail_title.setStyleSheet("color: #2c3e50; margin-bottom: 10px;")
+        detail_layout.addWidget(self.detail_title)
+        
+        # 代码显示区域
+        code_group = QGroupBox("TOTP代码")
+        code_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                border: 2px solid #3498db;
                 border-radius: 8px;
-                margin: 0px;
+                margin-top: 10px;
+                padding-top: 10px;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 5px 0 5px;
+                color: #3498db;
             }
         """)
-        # 让frame也启用鼠标跟踪
-        self.frame.setMouseTracking(True)
-        frame_layout = QHBoxLayout(self.frame)
-        frame_layout.setContentsMargins(10, 5, 10, 5)
-        frame_layout.setSpacing(6)
-
-        # ===== 原来的控件全部加到 frame_layout 中 =====
+        code_layout = QVBoxLayout(code_group)
         
-        # 图标标签
-        self.icon_label = QLabel()
-        self.icon_label.setFixedSize(32, 32)
-        self.icon_label.setStyleSheet("""
+        self.code_display = CodeDisplayLabel("••••••")
+        self.code_display.setFont(QFont("Courier New", 32, QFont.Weight.Bold))
+        self.code_display.setStyleSheet("""
             QLabel {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #4CAF50, stop:1 #45a049);
-                border-radius: 16px;
-                color: white;
-                font-weight: bold;
+                color: #e74c3c;
+                letter-spacing: 4px;
+                padding: 20px;
+                background: #f8f9fa;
+                border-radius: 8px;
                 qproperty-alignment: AlignCenter;
             }
         """)
-        icon_text = self.entry.name[0].upper() if self.entry.name else "?"
-        self.icon_label.setText(icon_text)
 
-        # 信息布局
-        info_layout = QVBoxLayout()
-        info_layout.setSpacing(2)
 
-        self.name_label = QLabel(self.entry.name)
-        self.name_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
-        self.name_label.setStyleSheet("color: #2c3e50;")
-
-        if self.entry.issuer:
-            self.issuer_label = QLabel(self.entry.issuer)
-            self.issuer_label.setFont(QFont("Arial", 8))
-            self.issuer_label.setStyleSheet("color: #7f8c8d;")
-            info_layout.addWidget(self.issuer_label)
-
-        info_layout.addWidget(self.name_label)
-
-        self.code_label = QLabel("••••••")
-        self.code_label.setFont(QFont("Courier New", 14, QFont.Weight.Bold))
-        self.code_label.setStyleSheet("color: #e74c3c; letter-spacing: 2px;")
-        # 启用鼠标点击事件
-        self.code_label.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.code_label.mousePressEvent = self.on_code_label_clicked
-        info_layout.addWidget(self.code_label)
-
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setFixedHeight(4)
-        self.progress_bar.setTextVisible(False)
-        self.progress_bar.setStyleSheet("""
+        code_layout.addWidget(self.code_display)
+        
+        # 进度条
+        self.detail_progress = QProgressBar()
+        self.detail_progress.setFixedHeight(8)
+        self.detail_progress.setTextVisible(False)
+        self.detail_progress.setStyleSheet("""
             QProgressBar {
                 border: none;
                 background: #ecf0f1;
-                border-radius: 2px;
+                border-radius: 4px;
             }
             QProgressBar::chunk {
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #3498db, stop:1 #2980b9);
-                border-radius: 2px;
+                    stop:0 #2ecc71, stop:1 #27ae60);
+                border-radius: 4px;
             }
         """)
-
-        info_layout.addWidget(self.progress_bar)
-
-        # 删除按钮
-        self.delete_button = QPushButton("🗑️")
-        self.delete_button.setFixedSize(30, 30)
-        self.delete_button.setStyleSheet("""
-QPushButton {
-    background: white;
-    border: 2px solid #e74c3c;
-    border-radius: 15px;
-    color: #e74c3c;
-    font-size: 13px;
-    qproperty-alignment: AlignCenter;
-}
-QPushButton:hover {
-    background: #ffcdd2;  /* 浅粉红（Material风格） */
-}
-QPushButton:pressed {
-    background: #e74c3c;  /* 与边框同色 */
-    color: white;
-}
-        """)
-        self.delete_button.setToolTip("删除此条目")
-        self.delete_button.clicked.connect(self.on_delete_clicked)
-        # 让按钮不干扰悬停检测
-        self.delete_button.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, False)
-
-        # info按钮（查看密钥）
-        self.info_button = QPushButton("i")
-        self.info_button.setFixedSize(30, 30)
-        self.info_button.setStyleSheet("""
-QPushButton {
-    background: white;
-    border: 2px solid #3498db;
-    border-radius: 15px;
-    color: #3498db;
-    font-size: 14px;
-    font-weight: bold;
-    qproperty-alignment: AlignCenter;
-}
-QPushButton:hover {
-    background: #d6eaf8;  /* 浅蓝色 */
-}
-QPushButton:pressed {
-    background: #3498db;  /* 与边框同色 */
-    color: white;
-}
-        """)
-        self.info_button.setToolTip("查看明文密钥")
-        self.info_button.clicked.connect(self.on_info_clicked)
-        # 让按钮不干扰悬停检测
-        self.info_button.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, False)
-
-        # 组装 frame 内部
-        frame_layout.addWidget(self.icon_label)
-        frame_layout.addLayout(info_layout)
-        frame_layout.addStretch()
-        frame_layout.addWidget(self.info_button)
-        frame_layout.addWidget(self.delete_button)
-
-        # 把 frame 加入主布局
-        main_layout.addWidget(self.frame)
-
-        # 设置最小高度
-        self.setMinimumHeight(80)
-    def on_code_label_clicked(self, ev: QMouseEvent):
-        """代码标签点击事件"""
-        code_text = self.code_label.text()
-        if code_text and code_text != "••••••":
-            # 变绿效果
-            original_style = self.code_label.styleSheet()
-            self.code_label.setStyleSheet("""
-                QLabel {
-                    color: rgb(46, 204, 46);
-                    letter-spacing: 2px;
-                }
-            """)
-            
-            # 复制到剪贴板
-            QApplication.clipboard().setText(code_text)
-            
-            # 发射代码复制信号
-            self.code_copied.emit(f"已复制: {code_text}")
-            
-            # 恢复原样
-            QTimer.singleShot(300, lambda: self.code_label.setStyleSheet("""
-                QLabel {
-                    color: #e74c3c;
-                    letter-spacing: 2px;
-                }
-            """))
-        
-        super().mousePressEvent(ev) if hasattr(super(), 'mousePressEvent') else None
+        code_layout.addWidget(self.detail_progress)
+        
+        # 剩余时间标签
+        self.time_label = QLabel("剩余时间: 30秒")
+        self.time_label.setStyleSheet("color: #7f8c8d; font-size: 12px;")
+        self.time_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        code_layout.addWidget(self.time_label)
+        
+        detail_layout.addWidget(code_group)
+        detail_layout.addStretch()
+        
+        parent.addWidget(detail_widget)
+    
+    def create_statusbar(self):
+        """创建状态栏"""
+        status_bar = QStatusBar()
+        self.setStatusBar(status_bar)
+        
+        # 状态标签
+        self.status_label = QLabel("就绪")
+        status_bar.addWidget(self.status_label)
+        
+        # 条目计数标签
+        self.count_label = QLabel("条目: 0")
+        status_bar.addPermanentWidget(self.count_label)
+    
+    def setup_timers(self):
+        """设置定时器"""
+        # TOTP更新定时器（每秒更新）
+        self.update_timer = QTimer()
+        self.update_timer.timeout.connect(self.update_all_codes)
+        self.update_timer.start(1000)
+        
+        # 空闲自动锁定：记录应用内的键盘鼠标操作，定时检查空闲时长
+        QApplication.instance().installEventFilter(self)
+        self.idle_timer = QTimer()
+        self.idle_timer.timeout.connect(self.check_auto_lock)
+        self.idle_timer.start(5000)
+        
+        # 定时检查配置文件是否被外部修改，变化的设置通过配置观察者生效
+        interval = self.totp_manager.config.get("app.config_watch_interval", 2)
+        self.config_watch_timer = QTimer()
+        self.config_watch_timer.timeout.connect(self.check_config_changes)
+        if interval:
+            self.config_watch_timer.start(int(interval * 1000))
+    
+    def eventFilter(self, watched, event) -> bool:
+        """记录用户操作时间"""
+        if event.type() in (QEvent.Type.KeyPress, QEvent.Type.MouseButtonPress,
+                            QEvent.Type.MouseMove, QEvent.Type.Wheel):
+            self._last_activity = time.monotonic()
+        return super().eventFilter(watched, event)
+    
+    def on_flush_failed(self, message: str):
+        """后台写入失败时提示用户"""
+        self.status_label.setText("保存失败")
+        QMessageBox.warning(self, "保存失败", message)
+    
+    def closeEvent(self, event):
+        """关闭窗口前写入延迟保存的修改"""
+        self.totp_manager.flush()
+        super().closeEvent(event)
+    
+    def check_config_changes(self):
+        """配置文件被外部修改时重新加载"""
+        if self.totp_manager.config.check_for_changes():
+            self.status_label.setText("配置已重新加载")
+    
+    def check_auto_lock(self):
+        """空闲超过配置的时长后自动锁定"""
+        config = self.totp_manager.config
+        if not config.get("app.auto_lock", True) or self.totp_manager.is_locked():
+            return
+        if time.monotonic() - self._last_activity >= config.get("app.lock_timeout", 300):
+            self.lock_vault()
+    
+    def check_initialization(self):
+        """检查初始化状态"""
+        # 检查是否已经设置过密码（通过检查是否存在加密数据）
+        if self.totp_manager.has_existing_password():
+            # 已经有密码，显示输入密码对话框
+            self.show_password_dialog(initial_setup=False)
+        else:
+            # 首次使用，显示设置密码对话框
+            self.show_password_dialog(initial_setup=True)
+    
+    def show_password_dialog(self, initial_setup=False):
+        """显示密码对话框"""
+        # 密钥派生在对话框的后台线程中执行，界面保持响应
+        if initial_setup:
+            task = self.totp_manager.initialize_with_password
+        else:
+            task = self.verify_and_unlock
+        # 初始设置不能取消，只有解锁需要回滚
+        rollback = None if initial_setup else self.totp_manager.lock
+        dialog = PasswordDialog(None, initial_setup, task=task, rollback=rollback)
+        result = dialog.exec()
+        
+        # 如果对话框被拒绝（用户点击取消或关闭窗口），直接退出应用
+        if result == QDialog.DialogCode.Rejected:
+            QApplication.quit()
+            exit()
+            return 0
+        
+        # 对话框只有在后台任务成功后才会被接受
+        if result == QDialog.DialogCode.Accepted:
+            self.status_label.setText("加密系统已初始化" if initial_setup else "已解锁")
+            self.load_entries()
+            # 密码设置或验证成功，显示主窗口
+            self.show()
+            if not initial_setup:
+                self.start_kdf_upgrade()
+    
+    def lock_vault(self):
+        """锁定保险库并隐藏主窗口，随后要求重新解锁"""
+        if self.totp_manager.is_locked():
+            return
+        # 打开的对话框（如显示明文密钥的对话框）不会随主窗口隐藏，锁定前全部关闭；
+        # 有对话框正在执行后台任务无法关闭时推迟锁定，重新开始计时
+        if not self.close_dialogs():
+            self._last_activity = time.monotonic()
+            return
+        self.totp_manager.lock()
+        self.entry_model.clear_codes()
+        self.code_display.setText("••••••")
+        self.hide()
+        self.show_unlock_dialog()
+    
+    def close_dialogs(self) -> bool:
+        """关闭所有打开的子对话框，有对话框拒绝关闭时返回False"""
+        dialogs = [dialog for dialog in self.findChildren(QDialog) if dialog.isVisible()]
+        for dialog in reversed(dialogs):
+            dialog.reject()
+        return not any(dialog.isVisible() for dialog in dialogs)
+    
+    def show_unlock_dialog(self):
+        """锁定后解锁：优先使用PIN快速解锁，尝试次数用完或放弃时改用主密码"""
+        while self.totp_manager.has_quick_unlock():
+            attempts = self.totp_manager.get_quick_unlock_attempts()
+            pin, ok = QInputDialog.getText(
+                None, "快速解锁", f"请输入PIN（剩余 {attempts} 次）：", QLineEdit.EchoMode.Password)
+            if not ok:
+                break
+            if self.totp_manager.quick_unlock(pin):
+                self._last_activity = time.monotonic()
+                self.status_label.setText("已解锁")
+                self.load_entries()
+                self.show()
+                return
+            if not self.totp_manager.has_quick_unlock():
+                QMessageBox.warning(None, "警告", "PIN错误次数过多，请输入主密码")
+        
+        self._last_activity = time.monotonic()
+        self.show_password_dialog(initial_setup=False)
+    
+    def show_quick_unlock_setup(self):
+        """设置或停用快速解锁PIN"""
+        if self.totp_manager.has_quick_unlock():
+            reply = QMessageBox.question(self, "快速解锁", "已设置快速解锁PIN，是否停用？")
+            if reply == QMessageBox.StandardButton.Yes:
+                self.totp_manager.disable_quick_unlock()
+                self.status_label.setText("已停用快速解锁")
+            return
+        
+        pin, ok = QInputDialog.getText(self, "快速解锁", "设置PIN（至少4位，仅在本次运行中有效）：",
+                                       QLineEdit.EchoMode.Password)
+        if not ok:
+            return
+        if len(pin) < 4:
+            QMessageBox.warning(self, "警告", "PIN至少需要4位")
+            return
+        confirm, ok = QInputDialog.getText(self, "快速解锁", "再次输入PIN：", QLineEdit.EchoMode.Password)
+        if not ok:
+            return
+        if pin != confirm:
+            QMessageBox.warning(self, "警告", "PIN不匹配")
+            return
+        
+        if self.totp_manager.enable_quick_unlock(pin):
+            self.status_label.setText("已设置快速解锁PIN")
+        else:
+            QMessageBox.warning(self, "警告", "设置快速解锁失败")
+    
+    def start_kdf_upgrade(self):
+        """在后台升级密钥派生参数，不占用解锁时间"""
+        # 策略参数可能需要校准并写入共享配置，在主线程取得后再交给后台任务
+        policy = self.totp_manager.get_kdf_policy()
+        if not self.totp_manager.needs_kdf_upgrade(policy):
+            return
+        worker = TaskWorker(self.totp_manager.upgrade_kdf, policy)
+        worker.signals.finished.connect(self.on_kdf_upgrade_finished)
+        self._upgrade_worker = worker
+        worker.start()
+    
+    def on_kdf_upgrade_finished(self, upgraded):
+        """后台参数升级完成"""
+        self._upgrade_worker = None
+        if upgraded:
+            self.status_label.setText("已按当前安全策略升级主密码参数")
+    
+    def load_entries(self):
+        """加载条目"""
+        entries = self.totp_manager.get_all_entries()
+        self.entry_model.set_entries(entries)
+        
+        self.count_label.setText(f"条目: {len(entries)}")
+        # 列表先显示出来，代码（需要按需读取并解密密文）在下一轮事件循环中填充
+        QTimer.singleShot(0, self.update_all_codes)
+    
+    def update_all_codes(self):
+        """更新可见行和当前条目的TOTP代码（开销只与窗口高度有关，与条目总数无关）"""
+        remaining_time = self.totp_manager.get_remaining_time()
+        progress = self.totp_manager.get_progress_percentage()
+        
+        # 可见的行和当前条目一起生成，当前条目只计算一次
+        entries = [index.data(ENTRY_ROLE) for index in self.visible_indexes()]
+        current = getattr(self, 'current_entry', None)
+        targets = entries + [current] if current is not None and current not in entries else entries
+        codes = dict(zip((entry.id for entry in targets), self.totp_manager.generate_many(targets))) if targets else {}
+        
+        # 更新列表中的条目（不可见行的旧代码被丢弃，滚动到时再补上）
+        self.entry_model.set_codes({entry.id: codes[entry.id] for entry in entries}, progress)
+        
+        # 更新详情视图
+        if current is not None:
+            code = codes.get(current.id)
+            if code:
+                self.code_display.setText(code)
+                self.detail_progress.setValue(int(progress))
+                self.time_label.setText(f"剩余时间: {remaining_time}秒")
+    
+    def visible_indexes(self) -> list:
+        """列表视口中可见的行（过滤后的索引）"""
+        view = self.entry_list
+        viewport = view.viewport().rect()
+        x = viewport.center().x()
+        # 行之间有间距，从视口边缘向内找到第一个落在行上的点
+        step = max(1, view.spacing())
+        first = last = None
+        for y in range(viewport.top(), viewport.bottom() + 1, step):
+            first = view.indexAt(QPoint(x, y))
+            if first.isValid():
+                break
+        if first is None or not first.isValid():
+            return []
+        for y in range(viewport.bottom(), viewport.top() - 1, -step):
+            last = view.indexAt(QPoint(x, y))
+            if last.isValid():
+                break
+        return [self.entry_filter.index(row, 0) for row in range(first.row(), last.row() + 1)]
+    
+    def fill_visible_codes(self):
+        """为可见但还没有代码的行生成代码（滚动、过滤后调用）"""
+        entries = [index.data(ENTRY_ROLE) for index in self.visible_indexes() if index.data(CODE_ROLE) is None]
+        if entries:
+            codes = self.totp_manager.generate_many(entries)
+            self.entry_model.add_codes({entry.id: code for entry, code in zip(entries, codes)})
+    
+    def refresh_all_codes(self):
+        """刷新所有代码"""
+        self.update_all_codes()
+        self.status_label.setText("代码已刷新")
+    
+    def on_entry_selected(self, current, previous):
+        """条目选择事件"""
+        entry = current.data(ENTRY_ROLE) if current.isValid() else None
+        if entry is not None:
+            self.current_entry = entry
+            self.show_entry_details(entry)
+    
+    def show_entry_details(self, entry: TOTPEntry):
+        """显示条目详情"""
+        self.detail_title.setText(entry.name)
+        if entry.issuer:
+            self.detail_title.setText(f"{entry.name} - {entry.issuer}")
+        
+        code = self.totp_manager.generate_totp(entry)
+        if code:
+            self.code_display.setText(code)
+    
+    def filter_entries(self, text):
+        """过滤条目"""
+        self.entry_filter.set_filter_text(text)
+        self.fill_visible_codes()
+    
+    def show_add_entry_dialog(self):
+        """显示添加条目对话框"""
+        dialog = AddEntryDialog(self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            name, secret, issuer = dialog.get_entry_data()
+            if name and secret:
+                if self.totp_manager.add_entry(name, secret, issuer):
+                    self.status_label.setText(f"已添加: {name}")
+                    self.load_entries()
+                else:
+                    QMessageBox.warning(self, "警告", "添加条目失败")
     
-    def on_info_clicked(self):
-        """info按钮点击事件 - 查看明文密钥"""
-        if not self.main_window:
-            QMessageBox.warning(self, "错误", "无法访问主窗口")
+    def show_change_password_dialog(self):
+        """显示修改主密码对话框"""
+        dialog = ChangePasswordDialog(self, task=self.totp_manager.rekey)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            self.status_label.setText("主密码已修改")
+    
+    def verify_and_unlock(self, password: str) -> bool:
+        """验证密码并解锁系统（数据文件无法读取时抛出IOError，由密码对话框显示原因）"""
+        try:
+            # 由TOTP管理器解包保险库数据密钥（旧格式数据在此时自动迁移）
+            unlocked = self.totp_manager.unlock(password)
+        except Exception:
+            return False
+        load_error = self.totp_manager.get_load_error()
+        if not unlocked and load_error:
+            raise IOError(f"数据文件无法读取，为避免覆盖原有数据已停止解锁。\n请从备份恢复数据文件后重试。\n\n{load_error}")
+        return unlocked
+    
+    def on_info_requested(self, entry_id: str):
+        """条目的info按钮点击事件 - 查看明文密钥"""
+        entry = self.totp_manager.get_entry_by_id(entry_id)
+        if entry is None:
             return
         
         # 检查是否已解锁
-        if not self.main_window.current_password:
+        if self.totp_manager.is_locked():
             QMessageBox.warning(self, "错误", "应用未解锁")
             return
         
         # 创建自定义密码输入对话框，保持样式一致
-        from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QHBoxLayout
-        from PySide6.QtCore import Qt
-        
         dialog = QDialog(self)
         dialog.setWindowTitle("验证密码")
         dialog.setModal(True)
@@ -379,11 +662,11 @@ QPushButton:pressed {
         layout.addWidget(title_label)
         
         # 密码输入框
-        self.verify_password_edit = QLineEdit()
-        self.verify_password_edit.setEchoMode(QLineEdit.EchoMode.Password)
-        self.verify_password_edit.setPlaceholderText("请输入主密码")
-        self.verify_password_edit.returnPressed.connect(dialog.accept)
-        self.verify_password_edit.setStyleSheet("""
+        verify_password_edit = QLineEdit()
+        verify_password_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        verify_password_edit.setPlaceholderText("请输入主密码")
+        verify_password_edit.returnPressed.connect(dialog.accept)
+        verify_password_edit.setStyleSheet("""
             QLineEdit {
                 padding: 10px;
                 border: 2px solid #bdc3c7;
@@ -394,12 +677,12 @@ QPushButton:pressed {
                 border-color: #3498db;
             }
         """)
-        layout.addWidget(self.verify_password_edit)
+        layout.addWidget(verify_password_edit)
         
         # 显示密码复选框
         verify_show_password = QCheckBox("显示密码")
         verify_show_password.toggled.connect(lambda checked: 
-            self.verify_password_edit.setEchoMode(QLineEdit.EchoMode.Normal if checked else QLineEdit.EchoMode.Password))
+            verify_password_edit.setEchoMode(QLineEdit.EchoMode.Normal if checked else QLineEdit.EchoMode.Password))
         layout.addWidget(verify_show_password)
         
         # 按钮布局
@@ -445,58 +728,50 @@ QPushButton:pressed {
         result = dialog.exec()
         
         if result == QDialog.DialogCode.Accepted:
-            password = self.verify_password_edit.text()
+            password = verify_password_edit.text()
             
             if not password:
                 QMessageBox.warning(self, "警告", "请输入密码")
                 return
             
-            # 验证密码（使用主窗口的当前密码进行比对）
-            if password != self.main_window.current_password:
+            # 验证密码（与当前会话的主密码比对，PIN快速解锁后由密钥环验证）
+            if not self.totp_manager.verify_password(password):
                 QMessageBox.warning(self, "密码错误", "密码不正确")
                 return
             
             # 密码验证成功，解密并显示密钥
-            self.show_secret_key()
+            self.show_secret_key(entry)
     
-    def show_secret_key(self):
+    def show_secret_key(self, entry: TOTPEntry):
         """显示明文密钥"""
-        if not self.entry.encrypted_key or not self.entry.salt:
+        # 未加载密文的条目在解密时才从存储读取
+        if entry.secret_loaded and not entry.encrypted_key:
             QMessageBox.warning(self, "错误", "该条目没有加密的密钥")
             return
         
-        if not self.main_window or not self.main_window.current_password:
-            QMessageBox.warning(self, "错误", "无法获取解密密码")
+        if self.totp_manager.is_locked():
+            QMessageBox.warning(self, "错误", "应用未解锁")
             return
         
         # 使用加密管理器解密密钥
         try:
-            # 获取主窗口的totp_manager
-            totp_manager = self.main_window.totp_manager
-            encryption = totp_manager.encryption
-            
-            # 解密密钥
-            secret_key = encryption.decrypt_totp_key(
-                self.entry.encrypted_key, 
-                self.entry.salt, 
-                self.main_window.current_password
-            )
+            secret_key = self.totp_manager.decrypt_secret(entry)
             
             if not secret_key:
                 QMessageBox.warning(self, "解密失败", "无法解密密钥")
                 return
             
             # 显示密钥对话框
-            self.show_key_dialog(secret_key)
+            self.show_key_dialog(entry, secret_key)
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"解密过程出错: {str(e)}")
     
-    def show_key_dialog(self, secret_key: str):
+    def show_key_dialog(self, entry: TOTPEntry, secret_key: str):
         """显示密钥对话框"""
         # 创建一个现代化对话框显示密钥
         dialog = QDialog(self)
-        dialog.setWindowTitle(f"明文密钥 - {self.entry.name}")
+        dialog.setWindowTitle(f"明文密钥 - {entry.name}")
         dialog.setMinimumWidth(450)
         dialog.setStyleSheet("""
             QDialog {
@@ -519,280 +794,25 @@ QPushButton:pressed {
         """)
         title_layout = QVBoxLayout(title_frame)
         
-        title_label = QLabel(f"<font color='white' size='5'><b>{self.entry.name}</b></font>")
-        if self.entry.issuer:
-            title_label.setText(f"<font color='white' size='5'><b>{self.entry.name}</b></font><br>"
-                              f"<font color='#d6eaf8' size='3'>{self.entry.issuer}</font>")
-        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        title_layout.addWidget(title_label)
-        
-        layout.addWidget(title_frame)
-        
-        # 说明标签
-        info_label = QLabel("🔐 以下为解密的TOTP密钥")
-        info_label.setFont(QFont("Arial", 10))
-        info_label.setStyleSheet("color: #2c3e50; margin-top: 5px;")
-        info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(info_label)
-        
-        # 密钥显示区域
-        key_group = QGroupBox("TOTP密钥")
-        key_group.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #3498db;
-                border-radius: 8px;
-                margin-top: 10px;
-                padding-top: 10px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-                color: #3498db;
-            }
-        """)
-        key_layout = QVBoxLayout(key_group)
-        
-        key_label = QLabel(secret_key)
-        key_label.setFont(QFont("Courier New", 14, QFont.Weight.Bold))
-        key_label.setStyleSheet("""
-            QLabel {
-                color: #2c3e50;
-                letter-spacing: 1px;
-                background: #f1f8ff;
-                border: 1px solid #d6eaf8;
-                border-radius: 6px;
-                padding: 15px;
-                margin: 5px;
-            }
-        """)
-        key_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        key_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        key_label.setWordWrap(True)
-        
-        key_layout.addWidget(key_label)
-        layout.addWidget(key_group)
-        
-        # 警告说明
-        warning_frame = QFrame()
-        warning_frame.setStyleSheet("""
-            QFrame {
-                background: #fff3cd;
-                border: 1px solid #ffeaa7;
-                border-radius: 6px;
-                padding: 10px;
-            }
-        """)
-        warning_layout = QVBoxLayout(warning_frame)
-        
-        warning_label = QLabel("⚠️ 安全警告：请妥善保管此密钥，不要与他人分享！")
-        warning_label.setFont(QFont("Arial", 9))
-        warning_label.setStyleSheet("color: #856404;")
-        warning_label.setWordWrap(True)
-        warning_layout.addWidget(warning_label)
-        
-        layout.addWidget(warning_frame)
-        
-        # 按钮区域
-        button_layout = QHBoxLayout()
-        button_layout.addStretch()
-        
-        copy_button = QPushButton("📋 复制密钥")
-        copy_button.setStyleSheet("""
-            QPushButton {
-                background: #3498db;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background: #2980b9;
-            }
-        """)
-        copy_button.clicked.connect(lambda: QApplication.clipboard().setText(secret_key))
-        button_layout.addWidget(copy_button)
-        
-        ok_button = QPushButton("确定")
-        ok_button.setStyleSheet("""
-            QPushButton {
-                background: #2ecc71;
-                color: white;
-                border: none;
-                padding: 8px 24px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background: #27ae60;
-            }
-        """)
-        ok_button.clicked.connect(dialog.accept)
-        button_layout.addWidget(ok_button)
-        
-        layout.addLayout(button_layout)
-        
-        dialog.exec()
-    
-    def on_delete_clicked(self):
-        """删除按钮点击事件"""
-        self.delete_requested.emit(self.entry.name)
-
-
-
-class MainWindow(QMainWindow):
-    """主窗口类"""
-    
-    def __init__(self, totp_manager: TOTPManager):
-        super().__init__()
-        self.totp_manager = totp_manager
-        self.current_password: Optional[str] = None
-        
-        self.setup_ui()
-        self.setup_timers()
-        # 先隐藏窗口，等密码验证成功后再显示
-        self.hide()
-        self.check_initialization()
-    
-    def setup_ui(self):
-        """设置UI"""
-        self.setWindowTitle("TOTP密码管理器")
-        self.setGeometry(100, 100, 900, 600)
-        
-        # 设置现代化样式
-        self.setStyleSheet("""
-            QMainWindow {
-                background: #f8f9fa;
-            }
-            QWidget {
-                font-family: "Segoe UI", Arial, sans-serif;
-            }
-        """)
-        
-        # 创建中央部件
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        
-        # 主布局
-        main_layout = QVBoxLayout(central_widget)
-        main_layout.setSpacing(0)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        
-        # 创建工具栏
-        self.create_toolbar()
-        
-        # 创建分割器
-        splitter = QSplitter(Qt.Orientation.Horizontal)
-        
-        # 左侧列表
-        self.create_entry_list(splitter)
-        
-        # 右侧详情
-        self.create_detail_view(splitter)
-        
-        # 设置分割器比例
-        splitter.setSizes([300, 600])
-        
-        main_layout.addWidget(splitter)
-        
-        # 创建状态栏
-        self.create_statusbar()
-    
-    def create_toolbar(self):
-        """创建工具栏"""
-        toolbar = QToolBar("主工具栏")
-        toolbar.setIconSize(QSize(24, 24))
-        self.addToolBar(toolbar)
-        
-        # 添加条目动作
-        add_action = QAction("➕ 添加", self)
-        add_action.triggered.connect(self.show_add_entry_dialog)
-        toolbar.addAction(add_action)
-        
-        toolbar.addSeparator()
-        
-        # 刷新动作
-        refresh_action = QAction("🔄 刷新", self)
-        refresh_action.triggered.connect(self.refresh_all_codes)
-        toolbar.addAction(refresh_action)
-        
-        # 设置动作
-        settings_action = QAction("⚙️ 设置", self)
-        settings_action.triggered.connect(self.show_settings)
-        toolbar.addAction(settings_action)
-    
-    def create_entry_list(self, parent):
-        """创建条目列表"""
-        list_widget = QWidget()
-        list_layout = QVBoxLayout(list_widget)
-        list_layout.setContentsMargins(10, 10, 10, 10)
-        
-        # 标题
-        title_label = QLabel("TOTP条目")
-        title_label.setFont(QFont("Arial", 14, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #2c3e50; margin-bottom: 10px;")
-        list_layout.addWidget(title_label)
-        
-        # 搜索框
-        self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("搜索条目...")
-        self.search_edit.textChanged.connect(self.filter_entries)
-        self.search_edit.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                border: 2px solid #bdc3c7;
-                border-radius: 6px;
-                font-size: 12px;
-            }
-            QLineEdit:focus {
-                border-color: #3498db;
-            }
-        """)
-        list_layout.addWidget(self.search_edit)
-        
-        # 条目列表
-        self.entry_list = QListWidget()
-        # 直接设置item间距，避免hover时互相遮盖
-        self.entry_list.setSpacing(4)
-        self.entry_list.setStyleSheet("""
-            QListWidget {
-                background: white;
-                border: 1px solid #bdc3c7;
-                border-radius: 6px;
-                outline: none;
-            }
-            QListWidget::item {
-                border: none;
-                padding: 0px;
-                margin: 0px;
-            }
-            QListWidget::item:selected {
-                background: transparent;
-            }
-        """)
-        self.entry_list.currentItemChanged.connect(self.on_entry_selected)
-        list_layout.addWidget(self.entry_list)
+        title_label = QLabel(f"<font color='white' size='5'><b>{entry.name}</b></font>")
+        if entry.issuer:
+            title_label.setText(f"<font color='white' size='5'><b>{entry.name}</b></font><br>"
+                              f"<font color='#d6eaf8' size='3'>{entry.issuer}</font>")
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title_layout.addWidget(title_label)
         
-        parent.addWidget(list_widget)
-    
-    def create_detail_view(self, parent):
-        """创建详情视图"""
-        detail_widget = QWidget()
-        detail_layout = QVBoxLayout(detail_widget)
-        detail_layout.setContentsMargins(20, 20, 20, 20)
-        detail_layout.setSpacing(15)  # 增加控件之间的垂直间距
+        layout.addWidget(title_frame)
         
-        # 详情标题
-        self.detail_title = QLabel("选择条目查看详情")
-        self.detail_title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-        self.detail_title.setStyleSheet("color: #2c3e50; margin-bottom: 10px;")
-        detail_layout.addWidget(self.detail_title)
+        # 说明标签
+        info_label = QLabel("🔐 以下为解密的TOTP密钥")
+        info_label.setFont(QFont("Arial", 10))
+        info_label.setStyleSheet("color: #2c3e50; margin-top: 5px;")
+        info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(info_label)
         
-        # 代码显示区域
-        code_group = QGroupBox("TOTP代码")
-        code_group.setStyleSheet("""
+        # 密钥显示区域
+        key_group = QGroupBox("TOTP密钥")
+        key_group.setStyleSheet("""
             QGroupBox {
                 font-weight: bold;
                 border: 2px solid #3498db;
@@ -807,267 +827,89 @@ class MainWindow(QMainWindow):
                 color: #3498db;
             }
         """)
-        code_layout = QVBoxLayout(code_group)
+        key_layout = QVBoxLayout(key_group)
         
-        self.code_display = CodeDisplayLabel("••••••")
-        self.code_display.setFont(QFont("Courier New", 32, QFont.Weight.Bold))
-        self.code_display.setStyleSheet("""
+        key_label = QLabel(secret_key)
+        key_label.setFont(QFont("Courier New", 14, QFont.Weight.Bold))
+        key_label.setStyleSheet("""
             QLabel {
-                color: #e74c3c;
-                letter-spacing: 4px;
-                padding: 20px;
-                background: #f8f9fa;
-                border-radius: 8px;
-                qproperty-alignment: AlignCenter;
+                color: #2c3e50;
+                letter-spacing: 1px;
+                background: #f1f8ff;
+                border: 1px solid #d6eaf8;
+                border-radius: 6px;
+                padding: 15px;
+                margin: 5px;
             }
         """)
-
-
-        code_layout.addWidget(self.code_display)
+        key_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        key_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        key_label.setWordWrap(True)
         
-        # 进度条
-        self.detail_progress = QProgressBar()
-        self.detail_progress.setFixedHeight(8)
-        self.detail_progress.setTextVisible(False)
-        self.detail_progress.setStyleSheet("""
-            QProgressBar {
-                border: none;
-                background: #ecf0f1;
-                border-radius: 4px;
-            }
-            QProgressBar::chunk {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #2ecc71, stop:1 #27ae60);
-                border-radius: 4px;
+        key_layout.addWidget(key_label)
+        layout.addWidget(key_group)
+        
+        # 警告说明
+        warning_frame = QFrame()
+        warning_frame.setStyleSheet("""
+            QFrame {
+                background: #fff3cd;
+                border: 1px solid #ffeaa7;
+                border-radius: 6px;
+                padding: 10px;
             }
         """)
-        code_layout.addWidget(self.detail_progress)
-        
-        # 剩余时间标签
-        self.time_label = QLabel("剩余时间: 30秒")
-        self.time_label.setStyleSheet("color: #7f8c8d; font-size: 12px;")
-        self.time_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        code_layout.addWidget(self.time_label)
-        
-        detail_layout.addWidget(code_group)
-        detail_layout.addStretch()
-        
-        parent.addWidget(detail_widget)
-    
-    def create_statusbar(self):
-        """创建状态栏"""
-        status_bar = QStatusBar()
-        self.setStatusBar(status_bar)
-        
-        # 状态标签
-        self.status_label = QLabel("就绪")
-        status_bar.addWidget(self.status_label)
-        
-        # 条目计数标签
-        self.count_label = QLabel("条目: 0")
-        status_bar.addPermanentWidget(self.count_label)
-    
-    def setup_timers(self):
-        """设置定时器"""
-        # TOTP更新定时器（每秒更新）
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_all_codes)
-        self.update_timer.start(1000)
-    
-    def check_initialization(self):
-        """检查初始化状态"""
-        # 检查是否已经设置过密码（通过检查是否存在加密数据）
-        if self.totp_manager.has_existing_password():
-            # 已经有密码，显示输入密码对话框
-            self.show_password_dialog(initial_setup=False)
-        else:
-            # 首次使用，显示设置密码对话框
-            self.show_password_dialog(initial_setup=True)
-    
-    def show_password_dialog(self, initial_setup=False):
-        """显示密码对话框"""
-        dialog = PasswordDialog(None,initial_setup)
-        result = dialog.exec()
+        warning_layout = QVBoxLayout(warning_frame)
         
-        # 如果对话框被拒绝（用户点击取消或关闭窗口），直接退出应用
-        if result == QDialog.DialogCode.Rejected:
-            QApplication.quit()
-            exit()
-            return 0
+        warning_label = QLabel("⚠️ 安全警告：请妥善保管此密钥，不要与他人分享！")
+        warning_label.setFont(QFont("Arial", 9))
+        warning_label.setStyleSheet("color: #856404;")
+        warning_label.setWordWrap(True)
+        warning_layout.addWidget(warning_label)
         
-        # 如果对话框被接受，处理密码
-        if result == QDialog.DialogCode.Accepted:
-            password = dialog.get_password()
-            if initial_setup:
-                if self.totp_manager.initialize_with_password(password):
-                    self.current_password = password
-                    self.status_label.setText("加密系统已初始化")
-                    self.load_entries()
-                    # 密码设置成功，显示主窗口
-                    self.show()
-                else:
-                    QMessageBox.critical(self, "错误", "加密系统初始化失败")
-            else:
-                # 验证密码并解锁
-                if self.verify_and_unlock(password):
-                    # 解锁成功后加载数据
-                    self.totp_manager._load_data()
-                    self.current_password = password
-                    self.status_label.setText("已解锁")
-                    self.load_entries()
-                    # 密码验证成功，显示主窗口
-                    self.show()
-                else:
-                    QMessageBox.warning(self, "密码错误", "密码不正确，请重试")
-                    # 重新显示密码对话框
-                    self.show_password_dialog(initial_setup=False)
-    
-    def load_entries(self):
-        """加载条目"""
-        self.entry_list.clear()
-        entries = self.totp_manager.get_all_entries()
+        layout.addWidget(warning_frame)
         
-        for entry in entries:
-            item_widget = TOTPItemWidget(entry, main_window=self)  # 传递主窗口引用
-            # 连接删除信号
-            item_widget.delete_requested.connect(self.on_delete_entry_requested)
-            # 连接代码复制信号
-            item_widget.code_copied.connect(self.on_code_copied)
-            list_item = QListWidgetItem(self.entry_list)
-            list_item.setSizeHint(item_widget.sizeHint())
-            self.entry_list.addItem(list_item)
-            self.entry_list.setItemWidget(list_item, item_widget)
+        # 按钮区域
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
         
-        self.count_label.setText(f"条目: {len(entries)}")
-        self.update_all_codes()
-    
-    def update_all_codes(self):
-        """更新所有TOTP代码"""
-        remaining_time = self.totp_manager.get_remaining_time()
-        progress = self.totp_manager.get_progress_percentage()
+        copy_button = QPushButton("📋 复制密钥")
+        copy_button.setStyleSheet("""
+            QPushButton {
+                background: #3498db;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background: #2980b9;
+            }
+        """)
+        copy_button.clicked.connect(lambda: QApplication.clipboard().setText(secret_key))
+        button_layout.addWidget(copy_button)
         
-        # 更新列表中的条目
-        for i in range(self.entry_list.count()):
-            item = self.entry_list.item(i)
-            widget = self.entry_list.itemWidget(item)
-            if widget and isinstance(widget, TOTPItemWidget):
-                code = self.totp_manager.generate_totp(widget.entry)
-                if code:
-                    widget.code_label.setText(code)
-                    widget.progress_bar.setValue(int(progress))
+        ok_button = QPushButton("确定")
+        ok_button.setStyleSheet("""
+            QPushButton {
+                background: #2ecc71;
+                color: white;
+                border: none;
+                padding: 8px 24px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background: #27ae60;
+            }
+        """)
+        ok_button.clicked.connect(dialog.accept)
+        button_layout.addWidget(ok_button)
         
-        # 更新详情视图
-        if hasattr(self, 'current_entry'):
-            code = self.totp_manager.generate_totp(self.current_entry)
-            if code:
-                self.code_display.setText(code)
-                self.detail_progress.setValue(int(progress))
-                self.time_label.setText(f"剩余时间: {remaining_time}秒")
-    
-    def refresh_all_codes(self):
-        """刷新所有代码"""
-        self.update_all_codes()
-        self.status_label.setText("代码已刷新")
-    
-    def on_entry_selected(self, current, previous):
-        """条目选择事件"""
-        # 取消之前选中条目的选中状态
-        if previous:
-            previous_widget = self.entry_list.itemWidget(previous)
-            if previous_widget and isinstance(previous_widget, TOTPItemWidget):
-                previous_widget.set_selected(False)
-        
-        # 设置当前选中条目的选中状态
-        if current:
-            widget = self.entry_list.itemWidget(current)
-            if widget and isinstance(widget, TOTPItemWidget):
-                widget.set_selected(True)
-                self.current_entry = widget.entry
-                self.show_entry_details(widget.entry)
-    
-    def show_entry_details(self, entry: TOTPEntry):
-        """显示条目详情"""
-        self.detail_title.setText(entry.name)
-        if entry.issuer:
-            self.detail_title.setText(f"{entry.name} - {entry.issuer}")
+        layout.addLayout(button_layout)
         
-        code = self.totp_manager.generate_totp(entry)
-        if code:
-            self.code_display.setText(code)
-    
-    def filter_entries(self, text):
-        """过滤条目"""
-        for i in range(self.entry_list.count()):
-            item = self.entry_list.item(i)
-            widget = self.entry_list.itemWidget(item)
-            if widget and isinstance(widget, TOTPItemWidget):
-                entry = widget.entry
-                match = (text.lower() in entry.name.lower() or 
-                        text.lower() in entry.issuer.lower())
-                item.setHidden(not match)
-    
-    def show_add_entry_dialog(self):
-        """显示添加条目对话框"""
-        dialog = AddEntryDialog(self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            name, secret, issuer = dialog.get_entry_data()
-            if name and secret:
-                if self.totp_manager.add_entry(name, secret, issuer):
-                    self.status_label.setText(f"已添加: {name}")
-                    self.load_entries()
-                else:
-                    QMessageBox.warning(self, "警告", "添加条目失败")
-    
-    def verify_and_unlock(self, password: str) -> bool:
-        """验证密码并解锁系统"""
-        try:
-            # 首先尝试使用独立密码验证
-            if self.totp_manager.encryption.verify_password(password):
-                # 如果独立密码验证成功，设置当前密码
-                self.totp_manager._current_password = password
-                
-                # 加载数据
-                self.totp_manager._load_data()
-                
-                # 如果存在TOTP条目，使用第一个条目的盐值解锁加密系统
-                entries = self.totp_manager.get_all_entries()
-                if entries:
-                    first_entry = entries[0]
-                    if first_entry.salt:
-                        self.totp_manager.encryption.unlock(password, first_entry.salt)
-                else:
-                    # 如果没有TOTP条目，使用独立密码验证的盐值
-                    password_salt = self.totp_manager.encryption.get_password_salt()
-                    if password_salt:
-                        self.totp_manager.encryption.unlock(password, password_salt)
-                
-                return True
-            
-            # 如果独立密码验证失败，尝试传统的验证方式（向后兼容）
-            self.totp_manager._load_data()
-            entries = self.totp_manager.get_all_entries()
-            
-            if entries:
-                # 使用第一个条目的盐值和加密密钥来验证密码
-                first_entry = entries[0]
-                if first_entry.salt and first_entry.encrypted_key:
-                    # 使用加密管理器的验证方法（使用实际的加密数据）
-                    is_valid = self.totp_manager.encryption.validate_password_with_encrypted_data(
-                        password, 
-                        first_entry.salt,
-                        first_entry.encrypted_key
-                    )
-                    
-                    # 如果验证成功，设置TOTP管理器的当前密码并解锁加密系统
-                    if is_valid:
-                        self.totp_manager._current_password = password
-                        self.totp_manager.encryption.unlock(password, first_entry.salt)
-                        return True
-            
-            return False
-            
-        except Exception:
-            return False
+        dialog.exec()
     
     def on_code_copied(self, message: str):
         """处理代码复制信号"""
@@ -1075,8 +917,13 @@ class MainWindow(QMainWindow):
         # 3秒后恢复为"就绪"
         QTimer.singleShot(3000, lambda: self.status_label.setText("就绪"))
     
-    def on_delete_entry_requested(self, entry_name: str):
+    def on_delete_entry_requested(self, entry_id: str):
         """处理删除条目请求"""
+        entry = self.totp_manager.get_entry_by_id(entry_id)
+        if entry is None:
+            return
+        entry_name = entry.name
+        
         # 显示确认对话框
         reply = QMessageBox.question(
             self,
@@ -1088,19 +935,48 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             # 执行删除操作
-            if self.totp_manager.remove_entry(entry_name):
+            if self.totp_manager.remove_entry_by_id(entry_id):
                 self.status_label.setText(f"已删除: {entry_name}")
                 self.load_entries()
-                
-                # 如果删除的是当前选中的条目，清空详情视图
-                if hasattr(self, 'current_entry') and self.current_entry.name == entry_name:
-                    self.detail_title.setText("选择条目查看详情")
-                    self.code_display.setText("••••••")
-                    self.detail_progress.setValue(0)
-                    self.time_label.setText("剩余时间: 30秒")
+                self.clear_entry_details([entry_id])
             else:
                 QMessageBox.warning(self, "删除失败", f"无法删除条目 '{entry_name}'")
     
+    def delete_selected_entries(self):
+        """删除所有选中的条目（一次写入）"""
+        entry_ids = [index.data(ENTRY_ROLE).id for index in self.entry_list.selectionModel().selectedIndexes()]
+        if not entry_ids:
+            return
+        if len(entry_ids) == 1:
+            self.on_delete_entry_requested(entry_ids[0])
+            return
+        
+        reply = QMessageBox.question(
+            self,
+            "确认删除",
+            f"确定要删除选中的 {len(entry_ids)} 个条目吗？\n此操作无法撤销。",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        if self.totp_manager.remove_entries(entry_ids):
+            self.status_label.setText(f"已删除 {len(entry_ids)} 个条目")
+            self.load_entries()
+            self.clear_entry_details(entry_ids)
+        else:
+            QMessageBox.warning(self, "删除失败", "无法删除选中的条目，已恢复原状")
+    
+    def clear_entry_details(self, removed_ids):
+        """当前选中的条目被删除时清空详情视图"""
+        if hasattr(self, 'current_entry') and self.current_entry.id in removed_ids:
+            del self.current_entry
+            self.detail_title.setText("选择条目查看详情")
+            self.code_display.setText("••••••")
+            self.detail_progress.setValue(0)
+            self.time_label.setText("剩余时间: 30秒")
+    
     def show_settings(self):
         """显示设置对话框"""
         # 创建设置对话框
@@ -21,8 +21,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import base64
+from typing import Callable, Optional
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QCloseEvent, QFont, QIcon, QPixmap
 from PySide6.QtWidgets import (
     QCheckBox,
@@ -33,20 +34,33 @@ from PySide6.QtWidgets import (
     QLabel,
     QLineEdit,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QVBoxLayout,
 )
 
 from load_icon_data import ICON_BASE64
+from src.ui.workers import TaskWorker
 
 
 class PasswordDialog(QDialog):
     """密码对话框类"""
     
-    def __init__(self, parent=None, initial_setup=False):
+    task_finished = Signal(bool)  # 后台解锁/初始化完成信号
+    
+    def __init__(self, parent=None, initial_setup=False,
+                 task: Optional[Callable[[str], bool]] = None,
+                 rollback: Optional[Callable[[], None]] = None):
         super().__init__(parent)
         self.initial_setup = initial_setup
         self.password = None
+        # task(password) 在后台线程中执行解锁或初始化；rollback() 用于撤销已取消但仍然成功的任务
+        self.task = task
+        self.rollback = rollback
+        # 正在运行的任务（取消后仍然保留，直到任务真正结束才接受新的提交）
+        self._worker: Optional[TaskWorker] = None
+        # 是否已有任务成功（之后结束的已取消任务不能再回滚）
+        self._succeeded = False
         
         self.setup_ui()
         self.setWindowTitle("设置主密码" if initial_setup else "输入主密码")
@@ -138,27 +152,54 @@ class PasswordDialog(QDialog):
         
         layout.addWidget(password_group)
         
+        # 忙碌指示器（后台派生密钥时显示）
+        self.busy_label = QLabel("正在初始化加密系统..." if self.initial_setup else "正在验证密码...")
+        self.busy_label.setStyleSheet("color: #7f8c8d; font-size: 11px;")
+        self.busy_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.busy_label.hide()
+        layout.addWidget(self.busy_label)
+        
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setFixedHeight(6)
+        self.busy_bar.setTextVisible(False)
+        self.busy_bar.setStyleSheet("""
+            QProgressBar {
+                border: none;
+                background: #ecf0f1;
+                border-radius: 3px;
+            }
+            QProgressBar::chunk {
+                background: #3498db;
+                border-radius: 3px;
+            }
+        """)
+        self.busy_bar.hide()
+        layout.addWidget(self.busy_bar)
+        
         # 按钮布局
         button_layout = QHBoxLayout()
         button_layout.addStretch()
         
-        if not self.initial_setup:
-            cancel_button = QPushButton("取消")
-            cancel_button.clicked.connect(self.reject)
-            cancel_button.setStyleSheet("""
-                QPushButton {
-                    background: #95a5a6;
-                    color: white;
-                    border: none;
-                    padding: 8px 16px;
-                    border-radius: 4px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background: #7f8c8d;
-                }
-            """)
-            button_layout.addWidget(cancel_button)
+        # 取消按钮：空闲时关闭对话框，后台任务运行时取消任务
+        # （初始设置不显示：密码记录写入后无法撤销，设置过程不允许取消）
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.on_cancel_clicked)
+        self.cancel_button.setVisible(not self.initial_setup)
+        self.cancel_button.setStyleSheet("""
+            QPushButton {
+                background: #95a5a6;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background: #7f8c8d;
+            }
+        """)
+        button_layout.addWidget(self.cancel_button)
         
         self.ok_button = QPushButton("确定" if self.initial_setup else "解锁")
         self.ok_button.clicked.connect(self.accept)
@@ -288,6 +329,13 @@ class PasswordDialog(QDialog):
     
     def closeEvent(self, arg__1: QCloseEvent):
         """处理窗口关闭事件"""
+        # 后台任务运行中关闭窗口视为取消任务（初始设置不能取消）
+        if self._worker is not None:
+            if not self.initial_setup:
+                self.cancel_task()
+            arg__1.ignore()
+            return
+        
         # 在未输入密码时点击叉叉直接退出，不弹出警告
         if not self.password_edit.text():
             self.reject()
@@ -297,6 +345,10 @@ class PasswordDialog(QDialog):
     
     def accept(self):
         """接受对话框"""
+        # 后台任务运行中（包括已取消但尚未结束）忽略重复提交
+        if self._worker is not None:
+            return
+        
         password = self.password_edit.text()
         
         if not password:
@@ -314,4 +366,76 @@ class PasswordDialog(QDialog):
                 return
         
         self.password = password
-        super().accept()
+        
+        if self.task is None:
+            super().accept()
+            return
+        
+        # 在后台线程中派生密钥，避免界面卡住
+        worker = TaskWorker(self.task, password)
+        worker.signals.finished.connect(lambda result, w=worker: self.on_task_finished(w, bool(result)))
+        worker.signals.failed.connect(lambda message, w=worker: self.on_task_finished(w, False, message))
+        self._worker = worker
+        self.set_busy(True)
+        worker.start()
+    
+    def set_busy(self, busy: bool):
+        """切换忙碌状态"""
+        self.busy_label.setVisible(busy)
+        self.busy_label.setText("正在初始化加密系统..." if self.initial_setup else "正在验证密码...")
+        self.busy_bar.setVisible(busy)
+        self.password_edit.setEnabled(not busy)
+        if self.initial_setup:
+            self.confirm_edit.setEnabled(not busy)
+        self.cancel_button.setEnabled(True)
+        self.show_password.setEnabled(not busy)
+        self.ok_button.setEnabled(not busy)
+        if not busy and self.initial_setup:
+            self.validate_passwords()
+    
+    def on_cancel_clicked(self):
+        """取消按钮点击事件"""
+        if self._worker is not None:
+            self.cancel_task()
+        else:
+            self.reject()
+    
+    def cancel_task(self):
+        """取消正在运行的后台任务
+        
+        正在运行的密钥派生无法中断：任务结束后丢弃结果再回到输入状态，
+        在此之前不接受新的提交，避免两个解锁任务同时修改管理器的状态
+        """
+        if self._worker is None or self._worker.cancelled or self.initial_setup:
+            return
+        self._worker.cancel()
+        self.busy_label.setText("正在取消...")
+        self.cancel_button.setEnabled(False)
+    
+    def on_task_finished(self, worker: TaskWorker, success: bool, error: Optional[str] = None):
+        """后台任务完成（任务抛出异常时error为错误信息，例如数据文件损坏）"""
+        if worker is not self._worker:
+            return
+        self._worker = None
+        self.set_busy(False)
+        
+        if worker.cancelled:
+            # 任务已被取消但仍然成功时撤销其效果（重新锁定），已有任务成功时不能撤销
+            if success and self.rollback and not self._succeeded:
+                self.rollback()
+            self.password_edit.setFocus()
+            return
+        
+        self.task_finished.emit(success)
+        
+        if success:
+            self._succeeded = True
+            super().accept()
+        elif error:
+            QMessageBox.critical(self, "错误", error)
+        elif self.initial_setup:
+            QMessageBox.critical(self, "错误", "加密系统初始化失败")
+        else:
+            QMessageBox.warning(self, "密码错误", "密码不正确，请重试")
+            self.password_edit.selectAll()
+            self.password_edit.setFocus()
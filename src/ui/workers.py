@@ -0,0 +1,66 @@
+"""Copyright (C) 2025 ANTmmmmm <ANTmmmmm@outlook.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+后台任务模块
+在线程池中运行耗时操作（密钥派生等），通过信号把结果送回界面线程
+"""
+
+from typing import Any, Callable
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class WorkerSignals(QObject):
+    """后台任务信号类"""
+    
+    finished = Signal(object)  # 任务完成，携带返回值
+    failed = Signal(str)  # 任务抛出异常，携带错误信息
+    progress = Signal(int, int)  # 任务进度：已完成数、总数
+
+
+class TaskWorker(QRunnable):
+    """后台任务类"""
+    
+    def __init__(self, func: Callable[..., Any], *args, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancelled = False
+    
+    def run(self):
+        """在线程池中执行任务"""
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            # 即使已取消也发出结果，由接收方决定是否回滚
+            self.signals.finished.emit(result)
+    
+    def report_progress(self, done: int, total: int):
+        """报告进度（可作为任务的进度回调，在工作线程中调用）"""
+        self.signals.progress.emit(done, total)
+    
+    def cancel(self):
+        """标记任务已取消（正在运行的密钥派生无法中断，结果将被丢弃）"""
+        self.cancelled = True
+    
+    def start(self):
+        """提交到全局线程池"""
+        QThreadPool.globalInstance().start(self)
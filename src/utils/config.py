@@ -17,17 +17,54 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """
 配置管理器模块
-处理应用的配置存储和读取
+处理应用的配置存储和读取，配置变化时通知按键路径注册的观察者，并可检测其他程序对配置文件的修改
 """
 
+import copy
+import fnmatch
+import inspect
 import json
 import os
+import threading
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+
+def _changed_paths(prefix: str, old: Any, new: Any) -> Dict[str, Any]:
+    """比较两个配置值，返回发生变化的叶子键路径及新值（删除的键新值为None）"""
+    if isinstance(old, dict) or isinstance(new, dict):
+        old = old if isinstance(old, dict) else {}
+        new = new if isinstance(new, dict) else {}
+        changes = {}
+        for key in list(old) + [key for key in new if key not in old]:
+            path = f"{prefix}.{key}" if prefix else key
+            changes.update(_changed_paths(path, old.get(key), new.get(key)))
+        return changes
+    return {} if old == new else {prefix: new}
 
 
 class ConfigManager:
-    """配置管理器类"""
+    """配置管理器类
+    
+    应用内的组件应通过shared()共用同一个实例，配置文件只解析一次，各组件看到的配置始终一致；
+    直接构造会得到独立的副本（只在需要单独读取文件时使用）
+    """
+    
+    # 进程内共享的实例：配置文件的绝对路径 -> 实例
+    _shared: Dict[str, "ConfigManager"] = {}
+    _shared_lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls, config_file: str = "config.json") -> "ConfigManager":
+        """获取进程内共享的配置实例（首次调用时加载配置文件）"""
+        key = str((Path("data") / config_file).resolve())
+        with cls._shared_lock:
+            instance = cls._shared.get(key)
+            if instance is None:
+                instance = cls._shared[key] = cls(config_file)
+            return instance
     
     def __init__(self, config_file: str = "config.json"):
         # 使用当前工作目录下的data文件夹，确保便携性
@@ -39,6 +76,16 @@ class ConfigManager:
         
         # 加载配置
         self._config = self._load_config()
+        # 有未写入文件的修改；事务中的修改只标记，最外层事务结束时统一写入
+        self._dirty = False
+        self._transaction_depth = 0
+        # 后台线程（参数升级、密码记录同步）也会修改配置：修改、写入和事务都持有此锁，
+        # 其他线程的修改等当前事务结束后再进行，不会混入事务或被一起回滚
+        self._lock = threading.RLock()
+        # 配置文件的修改时间和大小，用于发现其他程序写入的修改
+        self._file_stamp = self._stat_file()
+        # 观察者：(键路径或通配符, 回调的引用)
+        self._observers: List[Tuple[str, Callable[[], Optional[Callable[[str, Any], None]]]]] = []
     
     def _load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
@@ -58,7 +105,9 @@ class ConfigManager:
                 "version": "1.0.0",
                 "theme": "dark",
                 "auto_lock": True,
-                "lock_timeout": 300  # 5分钟
+                "lock_timeout": 300,  # 5分钟
+                "quick_unlock_attempts": 3,  # PIN快速解锁允许的失败次数，用完后需要输入主密码
+                "config_watch_interval": 2  # 检查配置文件是否被外部修改的间隔（秒），0为不检查
             },
             "window": {
                 "width": 800,
@@ -68,24 +117,161 @@ class ConfigManager:
             },
             "encryption": {
                 "algorithm": "AES",
-                "key_derivation_iterations": 100000
+                "key_derivation_iterations": 100000,
+                "key_cache_size": 16,  # 会话内缓存的派生密钥数量
+                "kdf_algorithm": "pbkdf2-sha256",  # 主密码KDF算法：pbkdf2-sha256 或 scrypt
+                "kdf_auto_calibrate": True,  # 设置密码时按目标耗时在本机校准参数
+                "kdf_target_ms": 250,  # 目标解锁耗时（毫秒）
+                "kdf_params": None  # 最近一次校准的结果
+            },
+            "storage": {
+                "backend": "journal",  # 存储后端：journal（JSON快照 + 日志）、binary（二进制快照 + 日志）或 sqlite
+                "journal_compact_threshold": 1000,  # 日志记录达到该数量时在后台压缩为新快照
+                "write_behind": False,  # 延迟写入：修改先保留在内存中，由后台线程合并写入
+                "write_behind_delay_ms": 500  # 最后一次修改后等待多久再写入（毫秒）
             },
             "password": {
                 "is_set": False,      # 标记密码是否已设置
                 "salt": None,         # 密码验证盐值（Base64编码）
                 "iterations": 100000, # 密码验证迭代次数
+                "kdf": None,          # 密码验证KDF算法和参数
                 "test_data": None     # 密码验证测试数据（Base64编码）
             }
         }
     
     def save_config(self) -> bool:
-        """保存配置到文件"""
+        """保存配置到文件（先写临时文件再替换，写入中途失败不会损坏原配置）"""
+        with self._lock:
+            try:
+                temp_file = self.config_file.with_suffix(".tmp")
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self._config, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_file, self.config_file)
+                self._dirty = False
+                self._file_stamp = self._stat_file()
+                return True
+            except (IOError, OSError):
+                return False
+    
+    def flush(self) -> bool:
+        """写入尚未保存的修改，没有修改时不写文件"""
+        with self._lock:
+            if not self._dirty:
+                return True
+            return self.save_config()
+    
+    @contextmanager
+    def transaction(self) -> Iterator["ConfigManager"]:
+        """配置事务：块内的多次set只修改内存，结束时一次写入文件
+        
+        块内抛出异常时恢复到事务开始前的配置并重新抛出；写入文件失败时同样恢复，然后抛出IOError。
+        事务可以嵌套，只有最外层结束时写入；事务进行中其他线程的修改会等待事务结束
+        """
+        with self._lock:
+            if self._transaction_depth == 0:
+                backup = (copy.deepcopy(self._config), self._dirty)
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self._config, self._dirty = backup
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                if not self.flush():
+                    self._config, self._dirty = backup
+                    raise IOError(f"无法写入配置文件: {self.config_file}")
+                # 写入成功后才通知观察者，回滚的修改不会被观察到
+                self._notify(_changed_paths("", backup[0], self._config))
+    
+    def add_observer(self, pattern: str, callback: Callable[[str, Any], None]):
+        """注册配置变化回调
+        
+        pattern为键路径（如"app.lock_timeout"，也匹配其下的子键）或通配符（如"encryption.*"）；
+        回调参数为发生变化的叶子键路径和新值。绑定方法只保存弱引用，对象被回收后自动注销
+        """
+        if inspect.ismethod(callback):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback
+        self._observers.append((pattern, ref))
+    
+    def remove_observer(self, pattern: str, callback: Callable[[str, Any], None]):
+        """注销配置变化回调"""
+        self._observers = [(observed, ref) for observed, ref in self._observers
+                           if not (observed == pattern and ref() == callback)]
+    
+    def _notify(self, changes: Dict[str, Any]):
+        """按键路径通知观察者，顺便清理已被回收的回调
+        
+        某个回调出错时仍通知其余观察者，之后把第一个异常抛给修改配置的调用方（修改本身已经生效）
+        """
+        if not changes:
+            return
+        alive = []
+        error = None
+        for pattern, ref in self._observers:
+            callback = ref()
+            if callback is None:
+                continue
+            alive.append((pattern, ref))
+            for key, value in changes.items():
+                if key == pattern or key.startswith(pattern + ".") or fnmatch.fnmatchcase(key, pattern):
+                    try:
+                        callback(key, value)
+                    except Exception as e:
+                        error = error or e
+        self._observers = alive
+        if error is not None:
+            raise error
+    
+    def _stat_file(self) -> Optional[Tuple[int, int]]:
+        """读取配置文件的修改时间和大小，文件不存在时返回None"""
+        try:
+            stat = self.config_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def check_for_changes(self) -> Dict[str, Any]:
+        """检查配置文件是否被其他程序修改（只比较修改时间和大小），有修改时重新加载
+        
+        返回发生变化的键路径及新值；事务进行中或其他线程正在修改配置时不检查，不阻塞调用线程
+        """
+        if not self._lock.acquire(blocking=False):
+            return {}
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self._config, f, indent=2, ensure_ascii=False)
-            return True
-        except IOError:
-            return False
+            if self._transaction_depth or self._stat_file() == self._file_stamp:
+                return {}
+            return self.reload()
+        finally:
+            self._lock.release()
+    
+    def reload(self) -> Dict[str, Any]:
+        """重新读取配置文件，只把变化的键通知给观察者，返回发生变化的键路径及新值
+        
+        文件正在被写入或格式错误时保留当前配置，下次检查时重试
+        """
+        with self._lock:
+            stamp = self._stat_file()
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                return {}
+            if not isinstance(config, dict):
+                return {}
+            
+            changes = _changed_paths("", self._config, config)
+            self._config = config
+            self._dirty = False
+            self._file_stamp = stamp
+            self._notify(changes)
+            return changes
     
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置值"""
@@ -103,17 +289,24 @@ class ConfigManager:
     def set(self, key: str, value: Any) -> bool:
         """设置配置值"""
         keys = key.split('.')
-        config = self._config
-        
-        # 遍历到最后一个键的父级
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
-        
-        # 设置值
-        config[keys[-1]] = value
-        return self.save_config()
+        with self._lock:
+            config = self._config
+            
+            # 遍历到最后一个键的父级
+            for k in keys[:-1]:
+                if k not in config:
+                    config[k] = {}
+                config = config[k]
+            
+            # 设置值（修改字典类型的值前请先复制，否则无法比较出变化）
+            old_value = config.get(keys[-1])
+            config[keys[-1]] = value
+            self._dirty = True
+            if self._transaction_depth:
+                return True
+            saved = self.save_config()
+            self._notify(_changed_paths(key, old_value, value))
+            return saved
     
     def get_app_config(self) -> Dict[str, Any]:
         """获取应用配置"""
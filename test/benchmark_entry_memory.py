@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+条目内存基准测试
+测量10万个条目时每个TOTPEntry的内存占用（对比不使用__slots__的普通类），
+以及经过字典/base64与直接使用原始记录元组加载的耗时
+"""
+
+import sys
+import os
+import gc
+import time
+import tracemalloc
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.binary_store import VaultView, encode_records
+from src.core.totp_manager import TOTPEntry
+
+ENTRY_COUNT = 100000
+TOKEN_SIZE = 120  # 加密一个32位base32密钥的Fernet令牌约为120字节
+
+
+class DictEntry:
+    """与TOTPEntry字段相同、但带有__dict__的普通类（用于对比）"""
+    
+    def __init__(self, entry_id, name, issuer, icon, encrypted_key, salt, created_time):
+        self.id = entry_id
+        self.name = name
+        self.issuer = issuer
+        self.icon = icon
+        self.encrypted_key = encrypted_key
+        self.salt = salt
+        self.created_time = created_time
+        self.secret_loaded = True
+
+
+def make_records(count: int) -> list:
+    """生成测试用的原始记录元组"""
+    return [(uuid.uuid4().hex, f"service-{i}", "issuer", "", os.urandom(TOKEN_SIZE), None, time.time())
+            for i in range(count)]
+
+
+def measure_memory(label: str, build) -> list:
+    """测量构建全部条目的内存增量"""
+    gc.collect()
+    tracemalloc.start()
+    entries = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<24} 每条目 {current / len(entries):6.1f} 字节, 共 {current / 2 ** 20:5.1f} MB")
+    return entries
+
+
+def measure_time(label: str, build):
+    """测量构建全部条目的耗时（取三次中的最短值）"""
+    best = float("inf")
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<24} 耗时 {best * 1000:7.1f} ms")
+
+
+def benchmark_entry_memory():
+    """运行基准测试"""
+    print(f"=== 条目内存基准测试（{ENTRY_COUNT} 个条目） ===")
+    records = make_records(ENTRY_COUNT)
+    
+    # 记录中的字符串和密文在两种实现间共享，差值即对象本身的开销
+    print("--- 对象本身的内存开销（字段值共享） ---")
+    measure_memory("普通类（__dict__）", lambda: [DictEntry(*record) for record in records])
+    slotted = measure_memory("TOTPEntry（__slots__）", lambda: [TOTPEntry.from_record(record) for record in records])
+    
+    print("\n--- 从快照加载 ---")
+    dicts = [entry.to_dict() for entry in slotted]
+    measure_time("from_dict（base64字典）", lambda: [TOTPEntry.from_dict(entry_data) for entry_data in dicts])
+    data = encode_records({"version": "2.0.0"}, (entry.to_record() for entry in slotted))
+    view = VaultView(data)
+    measure_time("from_record（二进制记录）",
+                 lambda: [TOTPEntry.from_record(record) for record in view.raw_records()])
+    
+    print("\n--- 序列化 ---")
+    measure_time("to_dict（base64字典）", lambda: [entry.to_dict() for entry in slotted])
+    measure_time("to_record（原始记录）", lambda: [entry.to_record() for entry in slotted])
+    print(f"\n二进制快照大小: {len(data) / 2 ** 20:.1f} MB")
+
+
+if __name__ == "__main__":
+    benchmark_entry_memory()
@@ -125,7 +125,7 @@ def test_config_manager():
     """测试配置管理器功能"""
     print("\n测试配置管理器功能...")
     
-    config = ConfigManager()
+    config = ConfigManager.shared()
     
     # 测试设置和获取配置
     config.set("test_setting", "test_value")
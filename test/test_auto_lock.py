@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+测试自动锁定
+验证空闲超时锁定时关闭打开的对话框（如显示明文密钥的对话框），无法关闭的对话框会推迟锁定
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication, QDialog
+
+from src.core.totp_manager import TOTPManager
+from src.core.vault_store import MemoryVaultStore
+from src.ui.main_window import MainWindow
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class BusyDialog(QDialog):
+    """模拟正在执行后台任务、拒绝关闭的对话框"""
+    
+    def reject(self):
+        pass
+
+
+def _create_window():
+    """创建已解锁的主窗口（跳过密码对话框），记录锁定后弹出解锁对话框的次数"""
+    totp_manager = TOTPManager(store=MemoryVaultStore())
+    assert totp_manager.initialize_with_password("AutoLock12345"), "初始化应该成功"
+    totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    
+    original = MainWindow.check_initialization
+    MainWindow.check_initialization = lambda self: None
+    try:
+        window = MainWindow(totp_manager)
+    finally:
+        MainWindow.check_initialization = original
+    window.show()
+    window.load_entries()
+    app.processEvents()
+    
+    unlock_requests = []
+    window.show_unlock_dialog = lambda: unlock_requests.append(True)
+    return window, unlock_requests
+
+
+def test_auto_lock_closes_dialogs():
+    """测试自动锁定关闭打开的对话框"""
+    print("=== 测试1: 自动锁定关闭对话框 ===")
+    
+    window, unlock_requests = _create_window()
+    key_dialog = QDialog(window)
+    key_dialog.open()
+    app.processEvents()
+    assert key_dialog.isVisible(), "对话框应已显示"
+    
+    window._last_activity = time.monotonic() - 10 ** 6
+    window.check_auto_lock()
+    print(f"1. 锁定后: 已锁定={window.totp_manager.is_locked()}, 对话框可见={key_dialog.isVisible()}")
+    assert window.totp_manager.is_locked(), "空闲超时后应锁定"
+    assert not key_dialog.isVisible(), "锁定时应关闭打开的对话框"
+    assert not window.isVisible(), "锁定后应隐藏主窗口"
+    assert unlock_requests == [True], "锁定后应要求重新解锁"
+    print("✅ 自动锁定关闭对话框测试通过\n")
+
+
+def test_auto_lock_waits_for_busy_dialog():
+    """测试无法关闭的对话框推迟锁定"""
+    print("=== 测试2: 推迟锁定 ===")
+    
+    window, unlock_requests = _create_window()
+    busy_dialog = BusyDialog(window)
+    busy_dialog.open()
+    app.processEvents()
+    
+    window._last_activity = time.monotonic() - 10 ** 6
+    window.check_auto_lock()
+    print(f"1. 对话框无法关闭时: 已锁定={window.totp_manager.is_locked()}")
+    assert not window.totp_manager.is_locked(), "对话框无法关闭时不应锁定"
+    assert busy_dialog.isVisible(), "对话框应保持打开"
+    assert unlock_requests == [], "未锁定时不应要求解锁"
+    assert time.monotonic() - window._last_activity < 60, "推迟锁定后应重新开始计时"
+    
+    QDialog.reject(busy_dialog)
+    window._last_activity = time.monotonic() - 10 ** 6
+    window.check_auto_lock()
+    assert window.totp_manager.is_locked(), "对话框关闭后应可以锁定"
+    print("✅ 推迟锁定测试通过\n")
+
+
+if __name__ == "__main__":
+    test_auto_lock_closes_dialogs()
+    test_auto_lock_waits_for_busy_dialog()
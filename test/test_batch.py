@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+测试批量修改
+验证批量添加/删除只写入一次、整批原子生效，以及块内出错或写入失败时回滚
+"""
+
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.journal_store import JournalStore
+from src.core.totp_manager import TOTPManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+JOURNAL_FILE = Path("data") / "totp_data.journal"
+
+
+def _count_batches(totp_manager: TOTPManager) -> list:
+    """包装存储的batch，记录每次写入的记录数"""
+    calls = []
+    original = totp_manager.store.batch
+    
+    def counting_batch(records):
+        calls.append(len(records))
+        return original(records)
+    
+    totp_manager.store.batch = counting_batch
+    return calls
+
+
+def test_batch_writes_once():
+    """测试批量修改只写入一次"""
+    print("=== 测试1: 批量修改只写入一次 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("BatchPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    calls = _count_batches(totp_manager)
+    
+    assert totp_manager.add_entries([(f"服务{i}", "JBSWY3DPEHPK3PXP", "发行者") for i in range(500)])
+    print(f"1.1 添加500个条目的写入次数: {len(calls)} (应为: 1)")
+    assert calls == [500], "批量添加应只写入一次"
+    with open(JOURNAL_FILE, 'rb') as f:
+        assert len(f.readlines()) == 2, "整批修改应写成一行日志（另有一行日志头）"
+    
+    ids = [entry.id for entry in totp_manager.get_all_entries()[:100]]
+    assert totp_manager.remove_entries(ids)
+    with totp_manager.batch():
+        assert totp_manager.update_entry("服务100", "服务100改")
+        assert totp_manager.add_entry("新服务", "JBSWY3DPEHPK3PXP")
+    print(f"1.2 写入次数: {calls}")
+    assert calls == [500, 100, 2], "每个批量修改应只写入一次"
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("BatchPass123"), "应该可以解锁"
+    assert reloaded.get_entry_count() == 401, "重新加载后条目数量应一致"
+    assert reloaded.get_entry("服务100改") and reloaded.get_entry("服务0") is None
+    print("✅ 批量写入测试通过\n")
+
+
+def test_batch_rollback():
+    """测试批量修改回滚"""
+    print("=== 测试2: 批量修改回滚 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("BatchPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entries([("服务A", "JBSWY3DPEHPK3PXP"), ("服务B", "JBSWY3DPEHPK3PXP")])
+    calls = _count_batches(totp_manager)
+    
+    print("2.1 块内抛出异常...")
+    try:
+        with totp_manager.batch():
+            totp_manager.add_entry("服务C", "JBSWY3DPEHPK3PXP")
+            totp_manager.update_entry("服务A", "服务A改", "新发行者")
+            totp_manager.remove_entry("服务B")
+            raise RuntimeError("模拟错误")
+    except RuntimeError:
+        pass
+    names = [entry.name for entry in totp_manager.get_all_entries()]
+    assert names == ["服务A", "服务B"], f"应回滚到修改前的状态: {names}"
+    assert totp_manager.get_entry("服务A").issuer == "", "被修改的字段应恢复"
+    assert calls == [], "回滚的修改不应写入存储"
+    
+    print("2.2 写入失败...")
+    totp_manager.store.batch = lambda records: False
+    assert not totp_manager.remove_entries([entry.id for entry in totp_manager.get_all_entries()])
+    assert [entry.name for entry in totp_manager.get_all_entries()] == ["服务A", "服务B"], "写入失败应回滚"
+    code = totp_manager.generate_totp(totp_manager.get_entry("服务B"))
+    assert code == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "回滚后条目应可正常使用"
+    print("✅ 批量修改回滚测试通过\n")
+
+
+def test_torn_batch_not_replayed():
+    """测试写了一半的批量记录不会被部分重放"""
+    print("=== 测试3: 不完整的批量记录 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("BatchPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.add_entries([(f"批量{i}", "JBSWY3DPEHPK3PXP") for i in range(10)])
+    
+    # 模拟写入批量记录时崩溃：最后一行只写了一半
+    data = JOURNAL_FILE.read_bytes()
+    JOURNAL_FILE.write_bytes(data[:-len(data.splitlines()[-1]) // 2])
+    names = [entry["name"] for entry in JournalStore(DATA_FILE).load_all()["entries"]]
+    print(f"3.1 重放后的条目: {names}")
+    assert names == ["服务A"], "不完整的批量记录应整批丢弃"
+    print("✅ 不完整的批量记录测试通过\n")
+    
+    for path in (DATA_FILE, JOURNAL_FILE):
+        if path.exists():
+            path.unlink()
+
+
+if __name__ == "__main__":
+    test_batch_writes_once()
+    test_batch_rollback()
+    test_torn_batch_not_replayed()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+测试二进制保险库格式
+验证binary后端读写、从totp_data.json迁移、与JSON互相转换、不读取密文列出元数据、原始记录的读写，以及用校验和发现损坏的快照
+"""
+
+import sys
+import os
+import json
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.binary_store import BinaryVaultStore, convert_file, open_vault
+from src.core.journal_store import JournalStore
+from src.core.totp_manager import TOTPEntry, TOTPManager
+from src.utils.config import ConfigManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+VAULT_FILE = Path("data") / "totp_data.vault"
+
+
+def _cleanup():
+    """删除测试产生的数据文件"""
+    for path in Path("data").glob("totp_data.*"):
+        path.unlink()
+
+
+def test_binary_backend():
+    """测试binary存储后端"""
+    print("=== 测试1: binary存储后端 ===")
+    
+    _cleanup()
+    ConfigManager.shared().set("storage.backend", "binary")
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("BinaryPass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        for i in range(3):
+            assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP", issuer="发行者")
+        assert totp_manager.update_entry("服务1", "服务1改", "新发行者")
+        assert totp_manager.remove_entry("服务0")
+        assert not DATA_FILE.exists(), "binary后端不应写入JSON数据文件"
+        
+        reloaded = TOTPManager()
+        assert reloaded.unlock("BinaryPass123"), "应该可以解锁"
+        names = [entry.name for entry in reloaded.get_all_entries()]
+        print(f"1.1 重新打开后的条目: {names}")
+        assert names == ["服务1改", "服务2"], "条目及顺序应保持一致"
+        code = reloaded.generate_totp(reloaded.get_entry("服务2"))
+        assert code == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "代码应与pyotp一致"
+        
+        # 压缩后快照中包含全部条目，元数据可以不读取密文直接列出
+        reloaded.compact()
+        metadata = BinaryVaultStore(VAULT_FILE).list_metadata()
+        print(f"1.2 元数据: {[entry['name'] for entry in metadata]}")
+        assert [entry["name"] for entry in metadata] == ["服务1改", "服务2"]
+        assert all("encrypted_key" not in entry for entry in metadata), "列出元数据不应读取密文"
+        with open_vault(VAULT_FILE) as view:
+            assert view.count == 2 and "keyring" in view.meta, "文件头和元数据应可直接读取"
+        print("✅ binary存储后端测试通过\n")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+def test_migrate_and_convert():
+    """测试从JSON迁移及两种格式互相转换"""
+    print("=== 测试2: 迁移与格式转换 ===")
+    
+    _cleanup()
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("BinaryPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    for i in range(200):
+        assert totp_manager.add_entry(f"服务{i}", "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ", issuer="发行者")
+    totp_manager.compact()
+    json_size = DATA_FILE.stat().st_size
+    
+    ConfigManager.shared().set("storage.backend", "binary")
+    try:
+        migrated = TOTPManager()
+        assert migrated.unlock("BinaryPass123"), "迁移后应该可以解锁"
+        assert len(migrated.get_all_entries()) == 200, "迁移后条目数量应一致"
+        assert not DATA_FILE.exists(), "迁移后旧数据文件应被改名"
+        assert DATA_FILE.with_name("totp_data.json.migrated").exists(), "旧数据文件应保留"
+        vault_size = VAULT_FILE.stat().st_size
+        print(f"2.1 JSON大小: {json_size} 字节, 二进制大小: {vault_size} 字节")
+        assert vault_size < json_size * 0.8, "二进制文件应明显更小"
+        
+        # 转换回JSON后内容一致
+        exported = Path("data") / "totp_data.export.json"
+        assert convert_file(VAULT_FILE, exported), "转换为JSON应该成功"
+        with open(exported, 'r', encoding='utf-8') as f:
+            exported_data = json.load(f)
+        original = JournalStore(exported).load_all()
+        assert original["keyring"] == BinaryVaultStore(VAULT_FILE).load_all()["keyring"], "密钥环应一致"
+        assert len(exported_data["entries"]) == 200
+        
+        roundtrip = Path("data") / "totp_data.roundtrip.vault"
+        assert convert_file(exported, roundtrip), "转换为二进制应该成功"
+        assert BinaryVaultStore(roundtrip).load_all()["entries"] == original["entries"], "往返转换后条目应一致"
+        print("2.2 JSON与二进制往返转换一致")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+    print("✅ 迁移与格式转换测试通过\n")
+
+
+def test_corrupt_file():
+    """测试损坏的文件"""
+    print("=== 测试3: 损坏的文件 ===")
+    
+    _cleanup()
+    store = BinaryVaultStore(VAULT_FILE)
+    assert store.write_snapshot({"entries": [], "version": "2.0.0"})
+    VAULT_FILE.write_bytes(VAULT_FILE.read_bytes()[:10])
+    try:
+        BinaryVaultStore(VAULT_FILE).load_all()
+        assert False, "截断的文件应抛出ValueError"
+    except ValueError as e:
+        print(f"3.1 截断的文件: {e}")
+    assert BinaryVaultStore(VAULT_FILE).has_data(), "损坏的文件仍应视为已有数据，不能重新初始化"
+    
+    # 待迁移的JSON数据文件损坏时不能当作空保险库
+    _cleanup()
+    DATA_FILE.write_text('{"entries": [', encoding='utf-8')
+    store = BinaryVaultStore(VAULT_FILE, legacy_path=DATA_FILE)
+    try:
+        store.load_all()
+        assert False, "无法读取的旧数据文件应抛出IOError"
+    except IOError as e:
+        print(f"3.2 损坏的旧数据文件: {e}")
+    assert not VAULT_FILE.exists() and DATA_FILE.exists(), "不应写入空快照或改名旧数据文件"
+    _cleanup()
+    print("✅ 损坏的文件测试通过\n")
+
+
+def test_raw_records():
+    """测试原始记录元组的往返转换，以及binary后端读写快照不经过条目字典"""
+    print("=== 测试4: 原始记录 ===")
+    
+    entry = TOTPEntry("服务A", "发行者", encrypted_key=b"token", salt=b"salt", icon="icon", entry_id="id-a")
+    record = entry.to_record()
+    assert record == ("id-a", "服务A", "发行者", "icon", b"token", b"salt", entry.created_time)
+    restored = TOTPEntry.from_record(record)
+    assert restored.to_dict() == entry.to_dict() and restored.secret_loaded, "往返转换后条目应一致"
+    
+    # 不含密文的记录之后按需补上密文
+    metadata = TOTPEntry.from_record(record[:4] + (None, None, record[6]), secrets=False)
+    assert not metadata.secret_loaded and metadata.encrypted_key is None
+    metadata.load_secret_record(record)
+    assert metadata.secret_loaded and metadata.to_dict() == entry.to_dict(), "补上密文后条目应一致"
+    
+    _cleanup()
+    ConfigManager.shared().set("storage.backend", "binary")
+    to_dict = TOTPEntry.to_dict
+    from_dict = TOTPEntry.__dict__["from_dict"]
+    dict_calls = []
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("BinaryPass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        for i in range(5):
+            assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+        
+        # 日志记录仍是字典，只统计写入快照和解锁时的转换
+        TOTPEntry.to_dict = lambda self: dict_calls.append("to_dict") or to_dict(self)
+        TOTPEntry.from_dict = classmethod(lambda cls, data: dict_calls.append("from_dict") or from_dict.__func__(cls, data))
+        assert totp_manager.compact(), "压缩应该成功"
+        reloaded = TOTPManager()
+        assert reloaded.unlock("BinaryPass123"), "应该可以解锁"
+        codes = reloaded.generate_many()
+        print(f"4.1 写入快照和解锁时的字典转换: {len(dict_calls)} (应为: 0)")
+        assert dict_calls == [], "binary后端读写快照不应经过条目字典"
+        assert codes == [pyotp.TOTP("JBSWY3DPEHPK3PXP").now()] * 5, "代码应与pyotp一致"
+        print("✅ 原始记录测试通过\n")
+    finally:
+        TOTPEntry.to_dict = to_dict
+        TOTPEntry.from_dict = from_dict
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+def test_checksum_detects_corruption():
+    """测试清单校验和发现损坏的二进制快照"""
+    print("=== 测试5: 校验和 ===")
+    
+    _cleanup()
+    ConfigManager.shared().set("storage.backend", "binary")
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("BinaryPass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        for i in range(3):
+            assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+        assert totp_manager.compact(), "条目应合并进快照"
+        
+        raw = VAULT_FILE.read_bytes()
+        # 改动一个字符但保持文件大小和格式不变，只有校验和能发现
+        corrupted = raw.replace("服务1".encode('utf-8'), "服务9".encode('utf-8'), 1)
+        assert corrupted != raw and len(corrupted) == len(raw)
+        VAULT_FILE.write_bytes(corrupted)
+        assert BinaryVaultStore(VAULT_FILE).has_data(), "损坏的快照仍应视为已有数据"
+        try:
+            BinaryVaultStore(VAULT_FILE).load_all()
+            assert False, "校验和不符时应抛出ValueError"
+        except ValueError as e:
+            print(f"5.1 读取损坏的快照: {e}")
+        
+        reloaded = TOTPManager()
+        assert not reloaded.unlock("BinaryPass123"), "快照损坏时不应解锁"
+        print(f"5.2 解锁失败原因: {reloaded.get_load_error()}")
+        assert "校验和" in reloaded.get_load_error(), "应报告校验和错误"
+        assert not reloaded.clear_all_entries(), "快照损坏时不应写入"
+        assert VAULT_FILE.read_bytes() == corrupted, "损坏的快照不应被覆盖"
+        
+        VAULT_FILE.write_bytes(raw)
+        assert reloaded.unlock("BinaryPass123") and reloaded.get_entry_count() == 3, "恢复后应可以解锁"
+        print("✅ 校验和测试通过\n")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+if __name__ == "__main__":
+    test_binary_backend()
+    test_migrate_and_convert()
+    test_corrupt_file()
+    test_raw_records()
+    test_checksum_detects_corruption()
+    print("🎉 所有测试通过！")
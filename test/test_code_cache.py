@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+测试时间窗口代码缓存
+验证同一30秒窗口内重复刷新只计算一次，编辑、锁定后缓存失效
+"""
+
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.totp_manager import TOTPManager
+
+
+def _count_engine_calls(totp_manager: TOTPManager) -> list:
+    """包装计算引擎，记录实际计算的条目数量"""
+    calls = []
+    original = totp_manager._engine.generate_many
+    
+    def counting_generate(entries, for_time=None):
+        entries = list(entries)
+        calls.append(len(entries))
+        return original(entries, for_time)
+    
+    totp_manager._engine.generate_many = counting_generate
+    return calls
+
+
+def test_code_cache():
+    """测试代码缓存"""
+    print("=== 测试时间窗口代码缓存 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("CodeCache123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.add_entry("服务B", "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ")
+    
+    calls = _count_engine_calls(totp_manager)
+    
+    print("1. 同一窗口内重复刷新...")
+    first = totp_manager.generate_many()
+    for _ in range(10):
+        assert totp_manager.generate_many() == first, "同一窗口内代码应保持不变"
+    print(f"   计算次数: {calls} (应为: [2])")
+    assert calls == [2], "同一窗口内应只计算一次"
+    assert totp_manager.get_code_expiry() > 0, "应记录缓存过期时间"
+    
+    print("2. 窗口结束后重新计算...")
+    totp_manager._code_cache_expires_at = 0.0
+    totp_manager._code_cache_step -= 1
+    totp_manager.generate_many()
+    print(f"   计算次数: {calls} (应为: [2, 2])")
+    assert calls == [2, 2], "窗口结束后应重新计算"
+    
+    print("3. 编辑条目后只重新计算该条目...")
+    assert totp_manager.update_entry("服务A", "服务A2")
+    totp_manager.generate_many()
+    print(f"   计算次数: {calls} (应为: [2, 2, 1])")
+    assert calls == [2, 2, 1], "编辑后应只重新计算被编辑的条目"
+    
+    print("4. 锁定后清空缓存...")
+    totp_manager.lock()
+    assert not totp_manager._code_cache, "锁定后缓存应为空"
+    assert totp_manager.generate_many() == [None, None], "锁定后不应生成代码"
+    
+    print("✅ 时间窗口代码缓存测试通过\n")
+    
+    # 清理
+    data_file = Path("data") / "totp_data.json"
+    if data_file.exists():
+        data_file.unlink()
+
+
+if __name__ == "__main__":
+    test_code_cache()
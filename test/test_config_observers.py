@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+测试配置观察者与外部修改检测
+验证按键路径和通配符通知变化、事务结束后才通知，以及发现其他程序写入的修改后只通知变化的键
+"""
+
+import sys
+import os
+import gc
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.totp_manager import TOTPManager
+from src.core.vault_store import MemoryVaultStore
+from src.utils.config import ConfigManager
+
+CONFIG_NAME = "test_observers.json"
+
+
+def _cleanup():
+    for path in (Path("data") / CONFIG_NAME, Path("data") / "test_observers.tmp"):
+        if path.exists():
+            path.unlink()
+
+
+def test_observers():
+    """测试按键路径通知"""
+    print("=== 测试1: 观察者 ===")
+    
+    _cleanup()
+    config = ConfigManager(CONFIG_NAME)
+    exact, wildcard, section = [], [], []
+    config.add_observer("app.lock_timeout", lambda key, value: exact.append((key, value)))
+    config.add_observer("encryption.*", lambda key, value: wildcard.append(key))
+    config.add_observer("password", lambda key, value: section.append(key))
+    
+    config.set("app.lock_timeout", 60)
+    config.set("app.lock_timeout", 60)
+    config.set("app.auto_lock", False)
+    print(f"1.1 app.lock_timeout的通知: {exact}")
+    assert exact == [("app.lock_timeout", 60)], "只有值真正变化时才通知，其他键不通知"
+    
+    config.set("encryption.kdf_target_ms", 100)
+    config.set("password", dict(config.get("password"), salt="c2FsdA==", iterations=200000))
+    print(f"1.2 通配符通知: {wildcard}，整节替换的通知: {sorted(section)}")
+    assert wildcard == ["encryption.kdf_target_ms"], "通配符应匹配子键"
+    assert sorted(section) == ["password.iterations", "password.salt"], "整节替换时应只通知变化的叶子键"
+    
+    print("1.3 事务...")
+    try:
+        with config.transaction():
+            config.set("app.lock_timeout", 10)
+            raise RuntimeError("模拟错误")
+    except RuntimeError:
+        pass
+    assert exact == [("app.lock_timeout", 60)], "回滚的修改不应通知"
+    with config.transaction():
+        config.set("app.lock_timeout", 10)
+        config.set("app.lock_timeout", 30)
+        assert len(exact) == 1, "事务结束前不应通知"
+    assert exact[-1] == ("app.lock_timeout", 30) and len(exact) == 2, "事务结束后应按最终值通知一次"
+    
+    class Listener:
+        def __init__(self):
+            self.calls = 0
+        
+        def on_change(self, key, value):
+            self.calls += 1
+    
+    listener = Listener()
+    config.add_observer("app", listener.on_change)
+    config.set("app.theme", "light")
+    assert listener.calls == 1, "绑定方法应收到通知"
+    del listener
+    gc.collect()
+    count = len(config._observers)
+    config.set("app.theme", "dark")
+    assert len(config._observers) == count - 1, "对象被回收后应自动注销"
+    
+    print("1.4 回调出错...")
+    def failing(key, value):
+        raise RuntimeError("回调错误")
+    config.add_observer("app.theme", failing)
+    after = []
+    config.add_observer("app.theme", lambda key, value: after.append(value))
+    try:
+        config.set("app.theme", "light")
+        assert False, "回调出错时应把异常抛给调用方"
+    except RuntimeError as e:
+        print(f"   调用方收到: {e}")
+    assert after == ["light"], "其余观察者仍应收到通知"
+    assert config.get("app.theme") == "light" and ConfigManager(CONFIG_NAME).get("app.theme") == "light", "修改应已生效并写入"
+    print("✅ 观察者测试通过\n")
+    _cleanup()
+
+
+def test_external_changes():
+    """测试发现其他程序写入的修改"""
+    print("=== 测试2: 外部修改 ===")
+    
+    _cleanup()
+    config = ConfigManager(CONFIG_NAME)
+    config.save_config()
+    totp_manager = TOTPManager(store=MemoryVaultStore(), config=config)
+    changes = []
+    config.add_observer("*", lambda key, value: changes.append(key))
+    assert config.check_for_changes() == {}, "文件未修改时不应重新加载"
+    
+    # 模拟其他程序修改配置文件
+    other = ConfigManager(CONFIG_NAME)
+    with other.transaction():
+        other.set("app.lock_timeout", 1200)
+        other.set("storage.write_behind", True)
+    
+    reloaded = config.check_for_changes()
+    print(f"2.1 重新加载的修改: {reloaded}")
+    assert reloaded == {"app.lock_timeout": 1200, "storage.write_behind": True}, "应只返回变化的键"
+    assert sorted(changes) == ["app.lock_timeout", "storage.write_behind"], "应只通知变化的键"
+    assert config.get("app.lock_timeout") == 1200, "修改应已生效"
+    assert totp_manager._write_behind, "TOTP管理器应响应延迟写入设置的变化"
+    assert config.check_for_changes() == {}, "重新加载后不应重复通知"
+    
+    # 写入中途（格式错误）的文件不应覆盖当前配置
+    with open(Path("data") / CONFIG_NAME, 'w', encoding='utf-8') as f:
+        f.write("{\"app\": ")
+    assert config.check_for_changes() == {} and config.get("app.lock_timeout") == 1200, "格式错误时应保留当前配置"
+    print("✅ 外部修改测试通过\n")
+    _cleanup()
+
+
+if __name__ == "__main__":
+    test_observers()
+    test_external_changes()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+测试配置事务
+验证事务内的多次修改只写入一次文件、块内出错或写入失败时恢复原配置、设置密码只写入一次配置，
+以及事务进行中其他线程的修改会等待事务结束
+"""
+
+import sys
+import os
+import json
+import threading
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.encryption import EncryptionManager
+from src.utils.config import ConfigManager
+
+CONFIG_FILE = Path("data") / "config.json"
+
+
+def _count_saves(config: ConfigManager) -> list:
+    """包装save_config，记录写入文件的次数"""
+    calls = []
+    original = config.save_config
+    
+    def counting_save():
+        calls.append(1)
+        return original()
+    
+    config.save_config = counting_save
+    return calls
+
+
+def test_transaction_writes_once():
+    """测试事务只写入一次"""
+    print("=== 测试1: 事务只写入一次 ===")
+    
+    config = ConfigManager()
+    calls = _count_saves(config)
+    with config.transaction():
+        config.set("test_transaction.a", 1)
+        config.set("test_transaction.b", 2)
+        with config.transaction():
+            config.set("test_transaction.c", 3)
+        print(f"1.1 事务内的写入次数: {len(calls)} (应为: 0)")
+        assert calls == [], "事务结束前不应写入文件"
+    print(f"1.2 事务结束后的写入次数: {len(calls)} (应为: 1)")
+    assert calls == [1], "嵌套事务应只在最外层结束时写入一次"
+    
+    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+        assert json.load(f)["test_transaction"] == {"a": 1, "b": 2, "c": 3}, "文件应包含事务中的全部修改"
+    assert not CONFIG_FILE.with_suffix(".tmp").exists(), "写入后不应残留临时文件"
+    
+    with config.transaction():
+        pass
+    assert calls == [1], "没有修改的事务不应写入文件"
+    print("✅ 事务写入测试通过\n")
+
+
+def test_transaction_rollback():
+    """测试块内出错时恢复原配置"""
+    print("=== 测试2: 事务回滚 ===")
+    
+    config = ConfigManager()
+    calls = _count_saves(config)
+    try:
+        with config.transaction():
+            config.set("test_transaction.a", 100)
+            config.set("test_transaction.d", 4)
+            raise RuntimeError("模拟错误")
+    except RuntimeError:
+        pass
+    
+    print(f"2.1 回滚后的配置: {config.get('test_transaction')}")
+    assert config.get("test_transaction") == {"a": 1, "b": 2, "c": 3}, "出错时应恢复事务开始前的配置"
+    assert calls == [], "出错的事务不应写入文件"
+    assert ConfigManager().get("test_transaction.a") == 1, "文件中的配置应保持不变"
+    
+    config.set("test_transaction", None)
+    print("✅ 事务回滚测试通过\n")
+
+
+def test_set_password_writes_once():
+    """测试设置密码只写入一次配置"""
+    print("=== 测试3: 设置密码只写入一次 ===")
+    
+    em = EncryptionManager()
+    calls = _count_saves(em.config)
+    try:
+        assert em.set_password("ConfigPass123"), "设置密码应该成功"
+    finally:
+        # em.config是共享实例，恢复原来的save_config
+        del em.config.save_config
+    print(f"3.1 设置密码的配置写入次数: {len(calls)} (应为: 1)")
+    assert len(calls) == 1, "校准结果和密码记录应在一次写入中保存"
+    assert ConfigManager().get("password.is_set"), "密码记录应已写入文件"
+    assert EncryptionManager().verify_password("ConfigPass123"), "写入的密码记录应可以验证"
+    print("✅ 设置密码写入测试通过\n")
+
+
+def test_transaction_write_failure():
+    """测试写入文件失败时恢复原配置"""
+    print("=== 测试4: 写入失败 ===")
+    
+    config = ConfigManager()
+    config.set("test_transaction", {"a": 1})
+    changes = []
+    config.add_observer("test_transaction", lambda key, value: changes.append(key))
+    config.save_config = lambda: False
+    try:
+        with config.transaction():
+            config.set("test_transaction.a", 2)
+            config.set("test_transaction.b", 3)
+        assert False, "写入失败时应抛出IOError"
+    except IOError as e:
+        print(f"4.1 写入失败: {e}")
+    finally:
+        del config.save_config
+    
+    print(f"4.2 写入失败后的配置: {config.get('test_transaction')}")
+    assert config.get("test_transaction") == {"a": 1}, "写入失败时应恢复事务开始前的配置"
+    assert changes == [], "没有写入的修改不应通知观察者"
+    assert ConfigManager().get("test_transaction") == {"a": 1}, "文件中的配置应保持不变"
+    
+    config.set("test_transaction", None)
+    print("✅ 写入失败测试通过\n")
+
+
+def test_transaction_blocks_other_threads():
+    """测试事务进行中其他线程的修改等待事务结束"""
+    print("=== 测试5: 多线程 ===")
+    
+    config = ConfigManager()
+    config.set("test_transaction", {})
+    calls = _count_saves(config)
+    finished = threading.Event()
+    
+    def set_from_thread():
+        config.set("test_transaction.other", 1)
+        finished.set()
+    
+    worker = threading.Thread(target=set_from_thread)
+    with config.transaction():
+        config.set("test_transaction.a", 1)
+        worker.start()
+        assert not finished.wait(0.2), "事务进行中其他线程的修改应等待"
+        assert config.get("test_transaction.other") is None, "其他线程的修改不应混入事务"
+        assert config.check_for_changes() == {}, "事务进行中不应重新加载"
+    worker.join(5)
+    print(f"5.1 写入次数: {len(calls)} (应为: 2)")
+    assert finished.is_set(), "事务结束后其他线程的修改应完成"
+    assert len(calls) == 2, "事务和其他线程的修改应各写入一次"
+    assert ConfigManager().get("test_transaction") == {"a": 1, "other": 1}, "文件应包含两边的修改"
+    
+    config.set("test_transaction", None)
+    print("✅ 多线程测试通过\n")
+
+
+if __name__ == "__main__":
+    test_transaction_writes_once()
+    test_transaction_rollback()
+    test_set_password_writes_once()
+    test_transaction_write_failure()
+    test_transaction_blocks_other_threads()
+    print("🎉 所有测试通过！")
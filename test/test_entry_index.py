@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+测试条目ID索引
+验证重名条目可以按ID分别修改和删除、名称索引随改名更新，以及没有ID的旧数据在首次解锁时写入ID
+"""
+
+import sys
+import os
+import json
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.journal_store import JournalStore
+from src.core.totp_manager import TOTPManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+
+
+def test_duplicate_names():
+    """测试重名条目按ID操作"""
+    print("=== 测试1: 重名条目按ID操作 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("IndexPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("邮箱", "JBSWY3DPEHPK3PXP", issuer="工作")
+    assert totp_manager.add_entry("邮箱", "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ", issuer="个人")
+    first, second = totp_manager.get_all_entries()
+    assert first.id != second.id, "每个条目应有独立的ID"
+    assert totp_manager.get_entry("邮箱") is first, "按名称应返回最早使用该名称的条目"
+    
+    print("1.1 按ID修改第二个同名条目...")
+    assert totp_manager.update_entry_by_id(second.id, "个人邮箱", "个人")
+    assert totp_manager.get_entry("个人邮箱") is second, "改名后名称索引应更新"
+    assert totp_manager.get_entry("邮箱") is first, "另一个同名条目不受影响"
+    
+    print("1.2 按ID删除第一个条目...")
+    assert totp_manager.remove_entry_by_id(first.id)
+    assert not totp_manager.remove_entry_by_id(first.id), "已删除的ID应返回False"
+    assert totp_manager.get_entry("邮箱") is None, "删除后名称索引应更新"
+    assert totp_manager.get_entry_by_id(second.id) is second
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("IndexPass123"), "应该可以解锁"
+    entry = reloaded.get_entry_by_id(second.id)
+    assert entry is not None and entry.name == "个人邮箱", "ID应在重新加载后保持不变"
+    assert reloaded.generate_totp(entry) == pyotp.TOTP("GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ").now()
+    print("✅ 重名条目测试通过\n")
+
+
+def test_assign_ids_on_first_load():
+    """测试没有ID的旧数据在首次解锁时写入ID"""
+    print("=== 测试2: 旧数据首次解锁时写入ID ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("IndexPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.add_entry("服务B", "JBSWY3DPEHPK3PXP")
+    totp_manager.compact()
+    
+    # 模拟早期版本写入的数据文件：条目没有ID，也没有日志ID
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for entry_data in data["entries"]:
+        del entry_data["id"]
+    data.pop("journal_id", None)
+    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    
+    legacy = TOTPManager()
+    assert legacy.unlock("IndexPass123"), "旧数据应该可以解锁"
+    ids = [entry.id for entry in legacy.get_all_entries()]
+    stored = [entry_data["id"] for entry_data in JournalStore(DATA_FILE).load_all()["entries"]]
+    print(f"2.1 分配的ID: {ids}")
+    assert stored == ids, "分配的ID应在首次解锁时写入数据文件"
+    print("✅ 旧数据写入ID测试通过\n")
+    
+    if DATA_FILE.exists():
+        DATA_FILE.unlink()
+
+
+if __name__ == "__main__":
+    test_duplicate_names()
+    test_assign_ids_on_first_load()
+    print("🎉 所有测试通过！")
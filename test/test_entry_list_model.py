@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+测试条目列表模型
+验证模型和过滤代理的数据、委托只绘制可见的行，以及委托中按钮和代码的点击
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QEvent, QPointF, Qt
+from PySide6.QtGui import QMouseEvent
+from PySide6.QtWidgets import QApplication, QListView, QStyleOptionViewItem
+
+from src.core.totp_manager import TOTPEntry
+from src.ui.entry_list import CODE_ROLE, ENTRY_ROLE, EntryDelegate, EntryFilterModel, EntryListModel
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def _make_entries(count: int) -> list:
+    return [TOTPEntry(f"服务{i}", "GitHub" if i % 2 else "", entry_id=f"id{i}") for i in range(count)]
+
+
+def _create_view(count: int):
+    """创建带委托的列表视图"""
+    model = EntryListModel()
+    proxy = EntryFilterModel()
+    proxy.setSourceModel(model)
+    view = QListView()
+    view.setModel(proxy)
+    delegate = EntryDelegate(view)
+    view.setItemDelegate(delegate)
+    view.setUniformItemSizes(True)
+    view.resize(320, 600)
+    start = time.perf_counter()
+    model.set_entries(_make_entries(count))
+    elapsed = time.perf_counter() - start
+    return model, proxy, view, delegate, elapsed
+
+
+def test_model_and_filter():
+    """测试模型和过滤代理"""
+    print("=== 测试1: 模型和过滤 ===")
+    
+    model, proxy, view, delegate, elapsed = _create_view(10000)
+    print(f"1.1 加载10000个条目耗时: {elapsed * 1000:.1f} ms")
+    assert model.rowCount() == 10000 and proxy.rowCount() == 10000
+    assert model.index(5).data(ENTRY_ROLE).id == "id5" and model.row_of("id5") == 5
+    assert model.index(5).data(CODE_ROLE) is None, "尚未生成代码时应为None"
+    
+    changes = []
+    model.dataChanged.connect(lambda *args: changes.append(args))
+    model.set_codes({"id5": "123456"}, 50.0)
+    assert model.index(5).data(CODE_ROLE) == "123456"
+    assert len(changes) == 1, "更新代码应只发出一次dataChanged"
+    model.clear_codes()
+    assert model.index(5).data(CODE_ROLE) is None, "锁定后代码应被清空"
+    
+    proxy.set_filter_text("服务12")
+    print(f"1.2 过滤\"服务12\"后的行数: {proxy.rowCount()} (应为: 111)")
+    assert proxy.rowCount() == 111, "应按名称过滤"
+    proxy.set_filter_text("github")
+    assert proxy.rowCount() == 5000, "应按发行者过滤且不区分大小写"
+    proxy.set_filter_text("")
+    assert proxy.rowCount() == 10000
+    print("✅ 模型和过滤测试通过\n")
+
+
+def test_paints_visible_rows_only():
+    """测试只绘制可见的行"""
+    print("=== 测试2: 只绘制可见的行 ===")
+    
+    model, proxy, view, delegate, _ = _create_view(10000)
+    painted = []
+    original = delegate.paint
+    
+    def counting_paint(painter, option, index):
+        painted.append(index.row())
+        original(painter, option, index)
+    
+    delegate.paint = counting_paint
+    view.grab()
+    print(f"2.1 10000个条目绘制的行数: {len(painted)}")
+    assert 0 < len(painted) <= 600 // EntryDelegate.ROW_HEIGHT + 2, "只应绘制可见的行"
+    
+    painted.clear()
+    view.scrollTo(proxy.index(9000, 0))
+    view.grab()
+    assert painted and min(painted) >= 8990, "滚动后应只绘制新的可见行"
+    print("✅ 只绘制可见的行测试通过\n")
+
+
+def test_delegate_clicks():
+    """测试按钮和代码的点击"""
+    print("=== 测试3: 委托点击 ===")
+    
+    model, proxy, view, delegate, _ = _create_view(3)
+    model.set_codes({"id1": "654321"}, 10.0)
+    deleted, infos, copied = [], [], []
+    delegate.delete_requested.connect(deleted.append)
+    delegate.info_requested.connect(infos.append)
+    delegate.code_copied.connect(copied.append)
+    
+    index = proxy.index(1, 0)
+    option = QStyleOptionViewItem()
+    option.rect = view.visualRect(index)
+    layout = delegate._layout(option.rect, True)
+    
+    def click(point):
+        for event_type in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease):
+            event = QMouseEvent(event_type, QPointF(point), QPointF(point), Qt.MouseButton.LeftButton,
+                                Qt.MouseButton.LeftButton, Qt.KeyboardModifier.NoModifier)
+            delegate.editorEvent(event, proxy, option, index)
+    
+    click(layout["delete"].center())
+    click(layout["info"].center())
+    click(layout["code"].center())
+    print(f"3.1 删除: {deleted}，查看密钥: {infos}，复制: {copied}")
+    assert deleted == ["id1"] and infos == ["id1"], "按钮应发出携带条目ID的信号"
+    assert copied == ["已复制: 654321"] and QApplication.clipboard().text() == "654321", "点击代码应复制"
+    print("✅ 委托点击测试通过\n")
+
+
+if __name__ == "__main__":
+    test_model_and_filter()
+    test_paints_visible_rows_only()
+    test_delegate_clicks()
+    print("🎉 所有测试通过！")
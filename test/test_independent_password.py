@@ -17,11 +17,12 @@ def test_initial_state():
     print("=== 测试1: 初始状态 ===")
     
     # 重置配置
-    config = ConfigManager()
-    config.set('password.is_set', False)
-    config.set('password.salt', None)
-    config.set('password.iterations', 100000)
-    config.set('password.test_data', None)
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set('password.is_set', False)
+        config.set('password.salt', None)
+        config.set('password.iterations', 100000)
+        config.set('password.test_data', None)
     
     em = EncryptionManager()
     
@@ -53,7 +54,7 @@ def test_set_password():
     assert em.has_encrypted_data(), "设置密码后应该有加密数据"
     
     # 检查配置是否正确保存
-    config = ConfigManager()
+    config = ConfigManager.shared()
     assert config.get('password.is_set', False) == True, "配置中密码设置标记应为True"
     assert config.get('password.salt') is not None, "配置中应有盐值"
     assert config.get('password.test_data') is not None, "配置中应有测试数据"
@@ -125,11 +126,12 @@ def test_totp_manager_integration():
     print("=== 测试6: TOTP管理器集成 ===")
     
     # 重置配置
-    config = ConfigManager()
-    config.set('password.is_set', False)
-    config.set('password.salt', None)
-    config.set('password.iterations', 100000)
-    config.set('password.test_data', None)
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set('password.is_set', False)
+        config.set('password.salt', None)
+        config.set('password.iterations', 100000)
+        config.set('password.test_data', None)
     
     # 创建TOTP管理器
     totp_manager = TOTPManager()
@@ -196,11 +198,12 @@ def test_independent_password_without_totp():
         data_file.unlink()
     
     # 重置配置
-    config = ConfigManager()
-    config.set('password.is_set', False)
-    config.set('password.salt', None)
-    config.set('password.iterations', 100000)
-    config.set('password.test_data', None)
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set('password.is_set', False)
+        config.set('password.salt', None)
+        config.set('password.iterations', 100000)
+        config.set('password.test_data', None)
     
     # 测试场景：设置密码但不添加TOTP条目
     em = EncryptionManager()
@@ -260,11 +263,12 @@ def main():
             tests_passed += 1
         
         # 清理测试数据
-        config = ConfigManager()
-        config.set('password.is_set', False)
-        config.set('password.salt', None)
-        config.set('password.iterations', 100000)
-        config.set('password.test_data', None)
+        config = ConfigManager.shared()
+        with config.transaction():
+            config.set('password.is_set', False)
+            config.set('password.salt', None)
+            config.set('password.iterations', 100000)
+            config.set('password.test_data', None)
         
         print(f"\n=== 测试总结 ===")
         print(f"通过测试: {tests_passed}/{total_tests}")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+测试日志存储
+验证单个条目的修改只追加日志、重新加载时重放日志、崩溃留下的残缺记录被忽略、压缩后数据不变
+"""
+
+import sys
+import os
+import json
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.journal_store import JournalStore
+from src.core.totp_manager import TOTPManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+JOURNAL_FILE = DATA_FILE.with_suffix(".journal")
+
+
+def _create_vault(count: int) -> TOTPManager:
+    """创建包含count个条目的保险库"""
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("JournalPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    for i in range(count):
+        assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+    return totp_manager
+
+
+def _names(totp_manager: TOTPManager) -> list:
+    return [entry.name for entry in totp_manager.get_all_entries()]
+
+
+def test_append_and_replay():
+    """测试追加日志与重放"""
+    print("=== 测试1: 追加日志与重放 ===")
+    
+    totp_manager = _create_vault(3)
+    snapshot_size = DATA_FILE.stat().st_size
+    
+    assert totp_manager.update_entry("服务1", "服务1改")
+    assert totp_manager.remove_entry("服务0")
+    assert totp_manager.add_entry("服务3", "JBSWY3DPEHPK3PXP")
+    print(f"1.1 快照大小: {DATA_FILE.stat().st_size} (应保持: {snapshot_size})")
+    assert DATA_FILE.stat().st_size == snapshot_size, "单个条目的修改不应重写快照"
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("JournalPass123"), "应该可以解锁"
+    print(f"1.2 重放后的条目: {_names(reloaded)}")
+    assert _names(reloaded) == ["服务1改", "服务2", "服务3"], "重放后应与内存中的状态一致"
+    assert _names(reloaded) == _names(totp_manager)
+    print("✅ 追加日志与重放测试通过\n")
+
+
+def test_torn_record():
+    """测试崩溃留下的残缺记录"""
+    print("=== 测试2: 残缺记录 ===")
+    
+    totp_manager = _create_vault(2)
+    assert totp_manager.add_entry("服务2", "JBSWY3DPEHPK3PXP")
+    
+    # 模拟写入一半时崩溃
+    with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write('{"op":"put","entry":{"id":"x","na')
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("JournalPass123"), "应该可以解锁"
+    assert _names(reloaded) == ["服务0", "服务1", "服务2"], "残缺记录之前的修改应保留"
+    assert reloaded.add_entry("服务3", "JBSWY3DPEHPK3PXP"), "截掉残缺记录后应可以继续追加"
+    
+    reloaded2 = TOTPManager()
+    assert reloaded2.unlock("JournalPass123"), "应该可以解锁"
+    print(f"2.1 恢复后的条目: {_names(reloaded2)}")
+    assert _names(reloaded2) == ["服务0", "服务1", "服务2", "服务3"], "新记录不应被残缺行破坏"
+    print("✅ 残缺记录测试通过\n")
+
+
+def test_compaction():
+    """测试日志压缩"""
+    print("=== 测试3: 日志压缩 ===")
+    
+    totp_manager = _create_vault(5)
+    assert totp_manager.remove_entry("服务4")
+    seq = totp_manager.store.last_seq
+    assert totp_manager.compact(), "压缩应该成功"
+    
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    print(f"3.1 压缩后快照条目数: {len(snapshot['entries'])}, 序号: {snapshot['seq']}")
+    assert len(snapshot["entries"]) == 4 and snapshot["seq"] == seq, "快照应包含全部日志"
+    assert not totp_manager.store.needs_compaction(), "压缩后日志应为空"
+    
+    # 模拟压缩时快照已替换、日志还没重写就崩溃：旧日志中的记录不应重复应用
+    with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"seq": seq, "op": "delete", "id": snapshot["entries"][0]["id"]}) + "\n")
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("JournalPass123"), "应该可以解锁"
+    assert _names(reloaded) == ["服务0", "服务1", "服务2", "服务3"], "已合并的记录不应再次应用"
+    print("✅ 日志压缩测试通过\n")
+
+
+def test_foreign_journal():
+    """测试不属于当前快照的日志被丢弃"""
+    print("=== 测试4: 不匹配的日志 ===")
+    
+    totp_manager = _create_vault(0)
+    assert totp_manager.add_entry("服务0", "JBSWY3DPEHPK3PXP")
+    assert JournalStore(DATA_FILE).load_all()["entries"], "日志中的条目应可以重放"
+    
+    # 用另一个快照替换数据文件（例如从备份恢复），残留的日志不应被重放
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    snapshot["journal_id"] = "restored-from-backup"
+    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    
+    data = JournalStore(DATA_FILE).load_all()
+    print(f"4.1 条目数: {len(data['entries'])} (应为: 0)")
+    assert not data["entries"], "不匹配的日志不应被重放"
+    assert not JOURNAL_FILE.exists(), "不匹配的日志应被丢弃"
+    print("✅ 不匹配的日志测试通过\n")
+    
+    # 清理
+    if DATA_FILE.exists():
+        DATA_FILE.unlink()
+
+
+if __name__ == "__main__":
+    test_append_and_replay()
+    test_torn_record()
+    test_compaction()
+    test_foreign_journal()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+测试密钥派生参数校准
+验证校准结果不低于下限、参数记录在密钥环中、scrypt保险库可以正常解锁
+"""
+
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import kdf
+from src.core.totp_manager import TOTPManager
+from src.utils.config import ConfigManager
+
+
+def test_calibrate():
+    """测试校准结果"""
+    print("=== 测试1: 参数校准 ===")
+    
+    params = kdf.calibrate(kdf.PBKDF2_SHA256, target_ms=1)
+    print(f"1.1 极小目标耗时的PBKDF2参数: {params}")
+    assert params["iterations"] == kdf.MIN_PBKDF2_ITERATIONS, "校准结果不应低于迭代次数下限"
+    
+    params = kdf.calibrate(kdf.SCRYPT, target_ms=1)
+    print(f"1.2 极小目标耗时的scrypt参数: {params}")
+    assert params["n"] == kdf.MIN_SCRYPT_N, "校准结果不应低于n的下限"
+    
+    assert kdf.normalize_params({"iterations": 5}) == {"algorithm": kdf.PBKDF2_SHA256, "iterations": 5}, \
+        "旧参数应视为PBKDF2"
+    print("✅ 参数校准测试通过\n")
+
+
+def test_scrypt_vault():
+    """测试使用scrypt的保险库"""
+    print("=== 测试2: scrypt保险库 ===")
+    
+    # 通过共享配置修改，与管理器看到的是同一份配置
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set("encryption.kdf_algorithm", kdf.SCRYPT)
+        config.set("encryption.kdf_target_ms", 1)
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("ScryptPass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+        
+        header = totp_manager._keyring["kdf"]
+        print(f"2.1 密钥环头部: {header}")
+        assert header["algorithm"] == kdf.SCRYPT, "密钥环应记录KDF算法"
+        assert header["n"] == kdf.MIN_SCRYPT_N, "密钥环应记录KDF参数"
+        
+        # 策略改回PBKDF2后，已有保险库仍按头部记录的参数解锁
+        ConfigManager.shared().set("encryption.kdf_algorithm", kdf.PBKDF2_SHA256)
+        totp_manager2 = TOTPManager()
+        assert not totp_manager2.unlock("WrongPassword"), "错误密码不应解锁"
+        assert totp_manager2.unlock("ScryptPass123"), "正确密码应该解锁"
+        assert totp_manager2.generate_totp(totp_manager2.get_entry("服务A")), "解锁后应能生成代码"
+        print("✅ scrypt保险库测试通过\n")
+    finally:
+        config = ConfigManager.shared()
+        with config.transaction():
+            config.set("encryption.kdf_algorithm", kdf.PBKDF2_SHA256)
+            config.set("encryption.kdf_target_ms", 250)
+            config.set("encryption.kdf_params", None)
+        data_file = Path("data") / "totp_data.json"
+        if data_file.exists():
+            data_file.unlink()
+
+
+def test_kdf_upgrade():
+    """测试解锁后升级弱参数"""
+    print("=== 测试3: 参数升级 ===")
+    
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set("encryption.kdf_auto_calibrate", False)
+        config.set("password.iterations", kdf.MIN_PBKDF2_ITERATIONS)
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("UpgradePass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+        old_password_record = dict(ConfigManager.shared().get("password"))
+        
+        # 策略提高迭代次数后，下次解锁检测到参数偏弱
+        ConfigManager.shared().set("password.iterations", 120000)
+        totp_manager2 = TOTPManager()
+        assert totp_manager2.unlock("UpgradePass123"), "正确密码应该解锁"
+        policy = totp_manager2.get_kdf_policy()
+        assert totp_manager2.needs_kdf_upgrade(policy), "参数弱于策略时应需要升级"
+        # 后台升级使用主线程取得的策略参数，不再读取或校准配置中的策略
+        def fail_policy(recalibrate=False):
+            raise AssertionError("后台升级不应读取策略")
+        totp_manager2.encryption.get_kdf_policy = fail_policy
+        try:
+            assert totp_manager2.upgrade_kdf(policy), "升级应该成功"
+        finally:
+            del totp_manager2.encryption.get_kdf_policy
+        print(f"3.1 升级后的密钥环头部: {totp_manager2._keyring['kdf']}")
+        assert totp_manager2._keyring["kdf"]["iterations"] == 120000, "密钥环应使用新的迭代次数"
+        assert ConfigManager.shared().get("password.kdf")["iterations"] == 120000, "密码记录应同步更新"
+        assert not totp_manager2.needs_kdf_upgrade(), "升级后不应再需要升级"
+        
+        # 模拟密钥环写入后、密码记录同步前崩溃：仍能解锁并补齐密码记录
+        ConfigManager.shared().set("password", old_password_record)
+        totp_manager3 = TOTPManager()
+        assert not totp_manager3.unlock("WrongPassword"), "错误密码不应解锁"
+        assert totp_manager3.unlock("UpgradePass123"), "中途崩溃后仍应可以解锁"
+        assert ConfigManager.shared().get("password.kdf")["iterations"] == 120000, "解锁后应补齐密码记录"
+        assert totp_manager3.generate_totp(totp_manager3.get_entry("服务A")), "解锁后应能生成代码"
+        print("✅ 参数升级测试通过\n")
+    finally:
+        config = ConfigManager.shared()
+        with config.transaction():
+            config.set("encryption.kdf_auto_calibrate", True)
+            config.set("password.iterations", kdf.MIN_PBKDF2_ITERATIONS)
+        data_file = Path("data") / "totp_data.json"
+        if data_file.exists():
+            data_file.unlink()
+
+
+if __name__ == "__main__":
+    test_calibrate()
+    test_scrypt_vault()
+    test_kdf_upgrade()
+    print("🎉 所有测试通过！")
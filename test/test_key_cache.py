@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试派生密钥缓存
+验证会话内解密不再重复运行PBKDF2，且错误密码不会命中缓存
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.encryption import EncryptionManager
+
+
+def _count_derivations(em: EncryptionManager) -> list:
+    """包装_derive_key，记录派生次数"""
+    calls = []
+    original = em._derive_key
+    
+    def counting_derive(password, salt, params=None):
+        calls.append(salt)
+        return original(password, salt, params)
+    
+    em._derive_key = counting_derive
+    return calls
+
+
+def test_decrypt_uses_cached_key():
+    """测试解锁后解密命中缓存"""
+    print("=== 测试1: 解锁后解密命中缓存 ===")
+    
+    em = EncryptionManager()
+    password = "CachePassword123"
+    assert em.initialize_encryption(password), "初始化应该成功"
+    
+    encrypted_key, salt = em.encrypt_totp_key("JBSWY3DPEHPK3PXP")
+    
+    calls = _count_derivations(em)
+    for _ in range(20):
+        assert em.decrypt_totp_key(encrypted_key, salt, password) == "JBSWY3DPEHPK3PXP"
+    
+    print(f"1.1 20次解密的派生次数: {len(calls)} (应为: 0)")
+    assert len(calls) == 0, "会话内解密不应重复派生密钥"
+    print("✅ 缓存命中测试通过\n")
+
+
+def test_wrong_password_bypasses_cache():
+    """测试错误密码不会命中缓存"""
+    print("=== 测试2: 错误密码不命中缓存 ===")
+    
+    em = EncryptionManager()
+    assert em.initialize_encryption("RightPassword123")
+    encrypted_key, salt = em.encrypt_totp_key("JBSWY3DPEHPK3PXP")
+    
+    result = em.decrypt_totp_key(encrypted_key, salt, "WrongPassword")
+    print(f"2.1 错误密码解密结果: {result} (应为: None)")
+    assert result is None, "错误密码不应解密成功"
+    print("✅ 错误密码测试通过\n")
+
+
+def test_clear_wipes_cache():
+    """测试clear()清空缓存"""
+    print("=== 测试3: clear()清空缓存 ===")
+    
+    em = EncryptionManager()
+    password = "ClearPassword123"
+    assert em.initialize_encryption(password)
+    encrypted_key, salt = em.encrypt_totp_key("JBSWY3DPEHPK3PXP")
+    
+    em.clear()
+    print(f"3.1 clear()后缓存条目: {len(em._key_cache)} (应为: 0)")
+    assert len(em._key_cache) == 0, "clear()后缓存应为空"
+    
+    calls = _count_derivations(em)
+    assert em.decrypt_totp_key(encrypted_key, salt, password) == "JBSWY3DPEHPK3PXP"
+    print(f"3.2 clear()后解密的派生次数: {len(calls)} (应为: 1)")
+    assert len(calls) == 1, "clear()后应重新派生密钥"
+    print("✅ clear()测试通过\n")
+
+
+if __name__ == "__main__":
+    test_decrypt_uses_cached_key()
+    test_wrong_password_bypasses_cache()
+    test_clear_wipes_cache()
+    print("🎉 所有测试通过！")
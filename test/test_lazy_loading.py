@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+测试按需加载条目密文
+验证解锁时只读取条目元数据，生成代码、修改条目、压缩时才读取所需的密文，三种文件后端行为一致
+"""
+
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.totp_manager import TOTPManager
+from src.utils.config import ConfigManager
+
+SECRETS = ["JBSWY3DPEHPK3PXP", "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ"]
+
+
+def _cleanup():
+    """删除测试产生的数据文件"""
+    for path in Path("data").glob("totp_data.*"):
+        path.unlink()
+
+
+def _count_get_many(totp_manager: TOTPManager) -> list:
+    """包装存储的get_many（二进制快照为get_many_records），记录每次读取的条目数量"""
+    calls = []
+    name = "get_many_records" if getattr(totp_manager.store, "RAW_RECORDS", False) else "get_many"
+    original = getattr(totp_manager.store, name)
+    
+    def counting_get_many(entry_ids):
+        calls.append(len(entry_ids))
+        return original(entry_ids)
+    
+    setattr(totp_manager.store, name, counting_get_many)
+    return calls
+
+
+def _check_backend(backend: str):
+    """在指定后端上检查按需加载"""
+    _cleanup()
+    ConfigManager.shared().set("storage.backend", backend)
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("LazyPass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    for i in range(20):
+        assert totp_manager.add_entry(f"服务{i}", SECRETS[i % 2])
+    totp_manager.compact()
+    # 压缩之后的修改只在日志中
+    assert totp_manager.add_entry("日志中的服务", SECRETS[1])
+    
+    reloaded = TOTPManager()
+    calls = _count_get_many(reloaded)
+    assert reloaded.unlock("LazyPass123"), "应该可以解锁"
+    entries = reloaded.get_all_entries()
+    assert len(entries) == 21 and not any(entry.secret_loaded for entry in entries), "解锁时不应读取密文"
+    assert calls == [], "解锁时不应读取任何条目的密文"
+    
+    # 只读取可见（被请求）的条目
+    codes = reloaded.generate_many(entries[:3] + entries[-1:])
+    assert calls == [4], "应只读取被请求的4个条目"
+    assert codes[0] == pyotp.TOTP(SECRETS[0]).now() and codes[3] == pyotp.TOTP(SECRETS[1]).now()
+    assert sum(entry.secret_loaded for entry in reloaded.get_all_entries()) == 4
+    
+    # 修改未加载的条目不能丢失密文
+    assert reloaded.update_entry("服务5", "服务5改")
+    again = TOTPManager()
+    assert again.unlock("LazyPass123")
+    code = again.generate_totp(again.get_entry("服务5改"))
+    assert code == pyotp.TOTP(SECRETS[1]).now(), "修改后的条目密文应保持不变"
+    
+    # 完整写入快照时读取其余全部条目
+    assert again.compact()
+    final = TOTPManager()
+    assert final.unlock("LazyPass123")
+    codes = final.generate_many()
+    assert all(code == pyotp.TOTP(SECRETS[i % 2] if i < 20 else SECRETS[1]).now()
+               for i, code in enumerate(codes)), "压缩后所有条目的代码应保持不变"
+    return len(entries)
+
+
+def test_lazy_loading():
+    """测试按需加载条目密文"""
+    print("=== 测试按需加载条目密文 ===")
+    
+    try:
+        for i, backend in enumerate(("journal", "binary", "sqlite")):
+            count = _check_backend(backend)
+            print(f"{i + 1}. {backend} 后端: 解锁 {count} 个条目未读取密文，按需读取正常")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+    print("✅ 按需加载测试通过\n")
+
+
+if __name__ == "__main__":
+    test_lazy_loading()
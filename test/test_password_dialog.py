@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+测试密码对话框的后台任务
+验证取消的任务结束前不接受新的提交、已取消但成功的任务会被回滚，以及初始设置不能取消
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from src.ui.password_dialog import PasswordDialog
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class _BlockingTask:
+    """在后台线程中等待放行的任务，记录调用的密码"""
+    
+    def __init__(self, result: bool):
+        self.result = result
+        self.calls = []
+        self.release = threading.Event()
+    
+    def __call__(self, password: str) -> bool:
+        self.calls.append(password)
+        self.release.wait(5)
+        return self.result
+
+
+def _wait_idle(dialog: PasswordDialog):
+    """处理事件直到对话框的后台任务结束"""
+    deadline = time.monotonic() + 5
+    while dialog._worker is not None and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert dialog._worker is None, "后台任务应该结束"
+
+
+def test_cancelled_task_blocks_resubmit():
+    """测试取消的任务结束前不接受新的提交，结束后回滚"""
+    print("=== 测试1: 取消解锁 ===")
+    
+    task = _BlockingTask(True)
+    rollbacks = []
+    dialog = PasswordDialog(None, False, task=task, rollback=lambda: rollbacks.append(True))
+    dialog.password_edit.setText("Password123")
+    dialog.accept()
+    dialog.cancel_task()
+    
+    # 取消后任务仍在运行，重复提交被忽略
+    dialog.accept()
+    time.sleep(0.05)
+    print(f"1.1 取消后再次提交的调用次数: {len(task.calls)} (应为: 1)")
+    assert len(task.calls) == 1, "已取消的任务结束前不应开始新的任务"
+    assert not dialog.password_edit.isEnabled(), "任务结束前输入框应保持禁用"
+    
+    task.release.set()
+    _wait_idle(dialog)
+    print(f"1.2 已取消但成功的任务回滚次数: {len(rollbacks)} (应为: 1)")
+    assert rollbacks == [True], "已取消但成功的任务应被回滚"
+    assert dialog.password_edit.isEnabled() and dialog.result() == 0, "应回到输入状态"
+    
+    # 再次提交并成功
+    dialog.accept()
+    _wait_idle(dialog)
+    assert len(task.calls) == 2 and dialog.result() == 1, "再次提交应该成功"
+    assert rollbacks == [True], "成功的任务不应被回滚"
+    print("✅ 取消解锁测试通过\n")
+
+
+def test_setup_cannot_be_cancelled():
+    """测试初始设置不能取消"""
+    print("=== 测试2: 初始设置不能取消 ===")
+    
+    task = _BlockingTask(True)
+    rollbacks = []
+    dialog = PasswordDialog(None, True, task=task, rollback=lambda: rollbacks.append(True))
+    dialog.password_edit.setText("Password123")
+    dialog.confirm_edit.setText("Password123")
+    dialog.accept()
+    assert not dialog.cancel_button.isVisibleTo(dialog), "初始设置时不应显示取消按钮"
+    dialog.cancel_task()
+    assert not dialog._worker.cancelled, "初始设置不应被取消"
+    
+    task.release.set()
+    _wait_idle(dialog)
+    assert dialog.result() == 1 and rollbacks == [], "初始设置应正常完成"
+    print("✅ 初始设置不能取消测试通过\n")
+
+
+if __name__ == "__main__":
+    test_cancelled_task_blocks_resubmit()
+    test_setup_cannot_be_cancelled()
@@ -33,14 +33,13 @@ def test_password_verification():
         print("  密码设置失败")
         return
     
-    # 获取第一个条目的盐值用于验证
+    # 条目由保险库数据密钥加密，不再携带独立盐值，使用主密码的盐值进行验证
     entries = totp_manager.get_all_entries()
     if not entries:
         print("  没有找到条目")
         return
     
-    first_entry = entries[0]
-    salt = first_entry.salt
+    salt = totp_manager.encryption.get_password_salt()
     
     print(f"\n2. 使用盐值测试密码验证:")
     print(f"  盐值: {salt.hex()[:16]}...")
@@ -64,18 +63,12 @@ def test_password_verification():
             # 首先加载数据来获取条目
             totp_mgr._load_data()
             
-            # 获取第一个条目的盐值来测试密码
+            # 获取条目并使用保险库密钥环解锁来测试密码
             entries = totp_mgr.get_all_entries()
             if not entries:
                 return False
             
-            # 使用第一个条目的盐值来验证密码
-            first_entry = entries[0]
-            if not first_entry.salt:
-                return False
-            
-            # 使用加密管理器的验证方法
-            return totp_mgr.encryption.validate_password(password, first_entry.salt)
+            return totp_mgr.unlock(password)
         except Exception:
             return False
     
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+测试PIN快速解锁
+验证锁定后用PIN恢复会话不运行主密码KDF、错误次数用完后只能用主密码解锁
+"""
+
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+from cryptography.fernet import Fernet
+
+from src.core.encryption import EncryptionManager
+from src.core.totp_manager import TOTPManager
+
+
+def test_quick_unlock():
+    """测试PIN快速解锁"""
+    print("=== 测试1: PIN快速解锁 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("QuickUnlock123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    entry = totp_manager.get_entry("服务A")
+    
+    assert totp_manager.enable_quick_unlock("2468"), "设置PIN应该成功"
+    totp_manager.lock()
+    assert totp_manager.is_locked(), "锁定后应处于锁定状态"
+    assert totp_manager.generate_totp(entry) is None, "锁定后不应生成代码"
+    assert totp_manager.encryption.get_vault_key() is None, "锁定后不应保留明文数据密钥"
+    
+    print("1.1 输入错误PIN...")
+    assert not totp_manager.quick_unlock("0000"), "错误PIN不应解锁"
+    print(f"    剩余次数: {totp_manager.get_quick_unlock_attempts()} (应为: 2)")
+    assert totp_manager.get_quick_unlock_attempts() == 2
+    
+    print("1.2 输入正确PIN...")
+    derived = []
+    original = totp_manager.encryption._derive_key
+    
+    def counting_derive(password, salt, params=None):
+        derived.append(params)
+        return original(password, salt, params)
+    
+    totp_manager.encryption._derive_key = counting_derive
+    assert totp_manager.quick_unlock("2468"), "正确PIN应该解锁"
+    assert derived == [EncryptionManager.QUICK_UNLOCK_KDF_PARAMS], "快速解锁只应运行廉价的PIN派生"
+    assert totp_manager.get_quick_unlock_attempts() == 3, "成功后应重置尝试次数"
+    assert totp_manager.generate_totp(entry) == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "解锁后代码应正确"
+    
+    print("1.3 PIN只包装数据密钥...")
+    record = totp_manager.encryption._quick_unlock
+    pin_fernet = Fernet(original("2468", record["salt"], EncryptionManager.QUICK_UNLOCK_KDF_PARAMS))
+    assert pin_fernet.decrypt(record["wrapped"]) == totp_manager.encryption.get_vault_key(), "PIN应只包装数据密钥"
+    assert totp_manager.get_current_password() is None, "快速解锁后不应恢复主密码"
+    assert not totp_manager.is_locked(), "快速解锁后应处于解锁状态"
+    assert not totp_manager.verify_password("WrongPassword"), "错误的主密码不应通过验证"
+    assert totp_manager.verify_password("QuickUnlock123"), "正确的主密码应通过验证"
+    assert totp_manager.generate_totp(entry) == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "验证后代码应正确"
+    print("✅ PIN快速解锁测试通过\n")
+
+
+def test_quick_unlock_attempts_exhausted():
+    """测试错误次数用完后回退到主密码"""
+    print("=== 测试2: 错误次数用完 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("QuickUnlock123"), "初始化应该成功"
+    assert totp_manager.enable_quick_unlock("2468"), "设置PIN应该成功"
+    totp_manager.lock()
+    
+    for _ in range(3):
+        assert not totp_manager.quick_unlock("1111"), "错误PIN不应解锁"
+    print(f"2.1 是否仍可快速解锁: {totp_manager.has_quick_unlock()} (应为: False)")
+    assert not totp_manager.has_quick_unlock(), "错误次数用完后应丢弃快速解锁记录"
+    assert not totp_manager.quick_unlock("2468"), "次数用完后正确PIN也不应解锁"
+    assert totp_manager.unlock("QuickUnlock123"), "主密码仍应可以解锁"
+    print("✅ 错误次数用完测试通过\n")
+    
+    # 清理
+    data_file = Path("data") / "totp_data.json"
+    if data_file.exists():
+        data_file.unlink()
+
+
+if __name__ == "__main__":
+    test_quick_unlock()
+    test_quick_unlock_attempts_exhausted()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+测试修改主密码
+验证重新加密后代码不变、新密码可以解锁、旧密码失效，以及进程池并行路径
+"""
+
+import sys
+import os
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core import totp_manager as totp_manager_module
+from src.core.totp_manager import TOTPManager
+
+SECRETS = {
+    "服务A": "JBSWY3DPEHPK3PXP",
+    "服务B": "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ",
+    "服务C": "MFRGGZDFMZTWQ2LK",
+}
+
+
+def _create_vault(password: str) -> TOTPManager:
+    """创建包含测试条目的保险库"""
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password(password), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    for name, secret in SECRETS.items():
+        assert totp_manager.add_entry(name, secret)
+    return totp_manager
+
+
+def _check_codes(totp_manager: TOTPManager):
+    """检查所有条目的代码与pyotp一致"""
+    for name, secret in SECRETS.items():
+        code = totp_manager.generate_totp(totp_manager.get_entry(name))
+        assert code == pyotp.TOTP(secret).now(), f"{name} 的代码应保持不变"
+
+
+def test_rekey():
+    """测试修改主密码"""
+    print("=== 测试1: 修改主密码 ===")
+    
+    totp_manager = _create_vault("OldPassword123")
+    old_tokens = [entry.encrypted_key for entry in totp_manager.get_all_entries()]
+    
+    print("1.1 旧密码错误时拒绝修改...")
+    assert not totp_manager.rekey("WrongPassword", "NewPassword456"), "旧密码错误时应该失败"
+    _check_codes(totp_manager)
+    
+    print("1.2 修改密码并记录进度...")
+    progress = []
+    assert totp_manager.rekey("OldPassword123", "NewPassword456",
+                              progress_callback=lambda done, total: progress.append((done, total)))
+    print(f"    进度: {progress}")
+    assert progress[-1] == (3, 3), "最后一次进度应为全部完成"
+    new_tokens = [entry.encrypted_key for entry in totp_manager.get_all_entries()]
+    assert all(old != new for old, new in zip(old_tokens, new_tokens)), "所有条目都应重新加密"
+    _check_codes(totp_manager)
+    
+    print("1.3 重新启动后用新密码解锁...")
+    assert not TOTPManager().unlock("OldPassword123"), "旧密码不应再能解锁"
+    totp_manager2 = TOTPManager()
+    assert totp_manager2.unlock("NewPassword456"), "新密码应该可以解锁"
+    _check_codes(totp_manager2)
+    print("✅ 修改主密码测试通过\n")
+
+
+def test_rekey_parallel():
+    """测试进程池并行重新加密"""
+    print("=== 测试2: 并行重新加密 ===")
+    
+    totp_manager = _create_vault("ParallelPass123")
+    totp_manager.REKEY_CHUNK_SIZE = 1
+    totp_manager.REKEY_PARALLEL_THRESHOLD = 0
+    
+    # 单核机器上也走进程池路径
+    original_cpu_count = totp_manager_module.os.cpu_count
+    totp_manager_module.os.cpu_count = lambda: 2
+    try:
+        progress = []
+        assert totp_manager.rekey("ParallelPass123", "ParallelPass456",
+                                  progress_callback=lambda done, total: progress.append(done))
+    finally:
+        totp_manager_module.os.cpu_count = original_cpu_count
+    
+    print(f"2.1 进度: {progress}")
+    assert sorted(progress) == [0, 1, 2, 3], "每批完成后都应报告进度"
+    
+    totp_manager2 = TOTPManager()
+    assert totp_manager2.unlock("ParallelPass456"), "新密码应该可以解锁"
+    _check_codes(totp_manager2)
+    print("✅ 并行重新加密测试通过\n")
+    
+    # 清理
+    data_file = Path("data") / "totp_data.json"
+    if data_file.exists():
+        data_file.unlink()
+
+
+if __name__ == "__main__":
+    test_rekey()
+    test_rekey_parallel()
+    print("🎉 所有测试通过！")
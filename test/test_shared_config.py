@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+测试共享配置
+验证加密管理器、TOTP管理器默认共用同一个配置实例，配置文件只解析一次，也可以注入指定的配置
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.encryption import EncryptionManager
+from src.core.totp_manager import TOTPManager
+from src.core.vault_store import MemoryVaultStore
+from src.utils.config import ConfigManager
+
+
+def test_shared_instance():
+    """测试默认使用共享实例"""
+    print("=== 测试1: 共享实例 ===")
+    
+    shared = ConfigManager.shared()
+    assert ConfigManager.shared() is shared, "多次获取应返回同一个实例"
+    
+    loads = []
+    original = ConfigManager._load_config
+    
+    def counting_load(self):
+        loads.append(self)
+        return original(self)
+    
+    ConfigManager._load_config = counting_load
+    try:
+        totp_manager = TOTPManager()
+        em = EncryptionManager()
+    finally:
+        ConfigManager._load_config = original
+    
+    print(f"1.1 创建管理器时解析配置文件的次数: {len(loads)} (应为: 0)")
+    assert loads == [], "共享实例已加载时不应再次解析配置文件"
+    assert totp_manager.config is shared and totp_manager.encryption.config is shared
+    assert em.config is shared, "加密管理器应使用共享实例"
+    
+    # 通过任一组件修改的配置，其他组件立即可见
+    totp_manager.config.set("test_shared", 1)
+    assert em.config.get("test_shared") == 1, "修改应对所有组件可见"
+    shared.set("test_shared", None)
+    print("✅ 共享实例测试通过\n")
+
+
+def test_injected_config():
+    """测试注入指定的配置"""
+    print("=== 测试2: 注入配置 ===")
+    
+    config = ConfigManager()
+    totp_manager = TOTPManager(store=MemoryVaultStore(), config=config)
+    assert totp_manager.config is config, "应使用注入的配置"
+    assert totp_manager.encryption.config is config, "加密管理器应与TOTP管理器使用同一份配置"
+    assert config is not ConfigManager.shared()
+    print("✅ 注入配置测试通过\n")
+
+
+if __name__ == "__main__":
+    test_shared_instance()
+    test_injected_config()
+    print("🎉 所有测试通过！")
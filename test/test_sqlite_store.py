@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+测试SQLite存储后端
+验证条目增删改后重新打开一致、密文以BLOB存储、WAL模式和索引，以及从totp_data.json迁移
+"""
+
+import sys
+import os
+import sqlite3
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.totp_manager import TOTPManager
+from src.utils.config import ConfigManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+DB_FILE = Path("data") / "totp_data.db"
+
+
+def _cleanup():
+    """删除测试产生的数据文件"""
+    for path in Path("data").glob("totp_data.*"):
+        path.unlink()
+
+
+def test_sqlite_backend():
+    """测试SQLite存储后端"""
+    print("=== 测试1: SQLite存储后端 ===")
+    
+    _cleanup()
+    ConfigManager.shared().set("storage.backend", "sqlite")
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("SqlitePass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        for i in range(3):
+            assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP", issuer="发行者")
+        assert totp_manager.update_entry("服务1", "服务1改", "新发行者")
+        assert totp_manager.remove_entry("服务0")
+        assert not DATA_FILE.exists(), "SQLite后端不应写入JSON数据文件"
+        
+        reloaded = TOTPManager()
+        assert reloaded.unlock("SqlitePass123"), "应该可以解锁"
+        names = [entry.name for entry in reloaded.get_all_entries()]
+        print(f"1.1 重新打开后的条目: {names}")
+        assert names == ["服务1改", "服务2"], "条目及顺序应保持一致"
+        assert reloaded.get_entry("服务1改").issuer == "新发行者"
+        code = reloaded.generate_totp(reloaded.get_entry("服务2"))
+        assert code == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "代码应与pyotp一致"
+        
+        conn = sqlite3.connect(str(DB_FILE))
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        blob_type = conn.execute("SELECT typeof(encrypted_key) FROM entries").fetchone()[0]
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(entries)")}
+        conn.close()
+        print(f"1.2 日志模式: {mode}, 密文类型: {blob_type}")
+        assert mode == "wal", "应使用WAL模式"
+        assert blob_type == "blob", "密文应以BLOB存储"
+        assert {"idx_entries_name", "idx_entries_issuer", "idx_entries_created_time"} <= indexes, "应建立索引"
+        print("✅ SQLite存储后端测试通过\n")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+def test_migrate_from_json():
+    """测试从totp_data.json迁移"""
+    print("=== 测试2: 从JSON迁移 ===")
+    
+    _cleanup()
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("SqlitePass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.add_entry("服务B", "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ")
+    
+    ConfigManager.shared().set("storage.backend", "sqlite")
+    try:
+        migrated = TOTPManager()
+        assert migrated.unlock("SqlitePass123"), "迁移后应该可以解锁"
+        names = [entry.name for entry in migrated.get_all_entries()]
+        print(f"2.1 迁移后的条目: {names}")
+        assert names == ["服务A", "服务B"], "日志中的条目也应迁移"
+        assert not DATA_FILE.exists(), "迁移后旧数据文件应改名保留"
+        assert DATA_FILE.with_name("totp_data.json.migrated").exists()
+        assert not DATA_FILE.with_name("totp_data.json.manifest").exists(), "旧数据文件的清单也应改名保留"
+        code = migrated.generate_totp(migrated.get_entry("服务B"))
+        assert code == pyotp.TOTP("GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ").now(), "迁移后代码应保持不变"
+        print("✅ 从JSON迁移测试通过\n")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+def test_unreadable_legacy_file():
+    """测试旧数据文件损坏时拒绝打开，不用空数据库覆盖"""
+    print("=== 测试3: 旧数据文件损坏 ===")
+    
+    _cleanup()
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("SqlitePass123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.compact(), "条目应合并进快照"
+    raw = DATA_FILE.read_bytes()
+    DATA_FILE.write_bytes(raw[:len(raw) // 2])
+    
+    ConfigManager.shared().set("storage.backend", "sqlite")
+    try:
+        migrated = TOTPManager()
+        assert migrated.store.has_data(), "无法读取的旧数据文件仍应视为已有数据"
+        assert not migrated.unlock("SqlitePass123"), "旧数据文件无法读取时不应解锁"
+        print(f"3.1 解锁失败原因: {migrated.get_load_error()}")
+        assert "旧数据文件" in migrated.get_load_error()
+        assert DATA_FILE.read_bytes() == raw[:len(raw) // 2], "旧数据文件不应被改名或改动"
+        
+        conn = sqlite3.connect(str(DB_FILE))
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        conn.close()
+        assert version is None, "数据库中不应写入空保险库"
+        
+        # 修复旧数据文件后可以正常迁移
+        DATA_FILE.write_bytes(raw)
+        assert migrated.unlock("SqlitePass123"), "修复后应该可以解锁"
+        assert [entry.name for entry in migrated.get_all_entries()] == ["服务A"], "修复后应导入旧条目"
+        print("✅ 旧数据文件损坏测试通过\n")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+def test_read_errors():
+    """测试读取条目时的数据库错误转换为IOError，按需读取密文失败不会抛出到界面"""
+    print("=== 测试4: 数据库读取错误 ===")
+    
+    _cleanup()
+    ConfigManager.shared().set("storage.backend", "sqlite")
+    try:
+        totp_manager = TOTPManager()
+        assert totp_manager.initialize_with_password("SqlitePass123"), "初始化应该成功"
+        totp_manager.clear_all_entries()
+        assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+        
+        reloaded = TOTPManager()
+        assert reloaded.unlock("SqlitePass123"), "应该可以解锁"
+        entry = reloaded.get_entry("服务A")
+        # 连接失效后的查询会抛出sqlite3.Error
+        reloaded.store._conn.close()
+        for name, read in (("get", lambda: reloaded.store.get(entry.id)),
+                           ("get_many", lambda: reloaded.store.get_many([entry.id])),
+                           ("iterate", lambda: list(reloaded.store.iterate()))):
+            try:
+                read()
+            except IOError as e:
+                print(f"4.1 {name}: {e}")
+            else:
+                assert False, f"{name}应抛出IOError"
+        
+        assert reloaded.generate_totp(entry) is None, "密文读取失败时不应生成代码"
+        assert "数据库" in reloaded.get_load_error(), "读取失败的原因应被记录"
+        assert not reloaded.add_entry("服务B", "JBSWY3DPEHPK3PXP"), "读取失败后不应写入"
+        print("✅ 数据库读取错误测试通过\n")
+    finally:
+        ConfigManager.shared().set("storage.backend", "journal")
+        _cleanup()
+
+
+if __name__ == "__main__":
+    test_sqlite_backend()
+    test_migrate_from_json()
+    test_unreadable_legacy_file()
+    test_read_errors()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试TOTP计算引擎
+验证批量计算结果与RFC 6238测试向量及pyotp完全一致
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.totp_engine import TOTPEngine
+
+
+class _Entry:
+    """只包含计算引擎所需字段的测试条目"""
+    
+    def __init__(self, token: bytes, secret: str):
+        self.encrypted_key = token
+        self.secret = secret
+
+
+def _make_engine(**kwargs) -> TOTPEngine:
+    return TOTPEngine(lambda entry: entry.secret, **kwargs)
+
+
+def test_rfc6238_vectors():
+    """测试RFC 6238附录B的SHA1测试向量"""
+    print("=== 测试1: RFC 6238测试向量 ===")
+    
+    # ASCII "12345678901234567890" 的base32编码
+    entry = _Entry(b"rfc", "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ")
+    engine = _make_engine(digits=8)
+    
+    vectors = {
+        59: "94287082",
+        1111111109: "07081804",
+        1111111111: "14050471",
+        1234567890: "89005924",
+        2000000000: "69279037",
+        20000000000: "65353130",
+    }
+    for for_time, expected in vectors.items():
+        code = engine.generate(entry, for_time)
+        print(f"1.x T={for_time}: {code} (应为: {expected})")
+        assert code == expected, f"T={for_time} 的代码不匹配"
+    
+    print("✅ RFC 6238测试向量通过\n")
+
+
+def test_matches_pyotp():
+    """测试批量计算结果与pyotp一致"""
+    print("=== 测试2: 与pyotp结果一致 ===")
+    
+    entries = [_Entry(str(i).encode(), pyotp.random_base32()) for i in range(200)]
+    entries.append(_Entry(b"short", "JBSWY3DPEHPK3PXP"))
+    engine = _make_engine()
+    
+    for for_time in (0, 29, 30, time.time(), 1700000000):
+        codes = engine.generate_many(entries, for_time)
+        expected = [pyotp.TOTP(entry.secret).at(int(for_time)) for entry in entries]
+        assert codes == expected, f"T={for_time} 的批量结果与pyotp不一致"
+    
+    print(f"2.1 {len(entries)} 个条目在5个时间点的结果全部一致")
+    print("✅ pyotp一致性测试通过\n")
+
+
+def test_invalid_secret():
+    """测试无效密钥返回None且不影响其他条目"""
+    print("=== 测试3: 无效密钥 ===")
+    
+    entries = [_Entry(b"bad", "不是base32"), _Entry(b"good", "JBSWY3DPEHPK3PXP")]
+    codes = _make_engine().generate_many(entries, 59)
+    
+    print(f"3.1 结果: {codes}")
+    assert codes[0] is None, "无效密钥应返回None"
+    assert codes[1] == pyotp.TOTP("JBSWY3DPEHPK3PXP").at(59), "有效条目应正常计算"
+    print("✅ 无效密钥测试通过\n")
+
+
+if __name__ == "__main__":
+    test_rfc6238_vectors()
+    test_matches_pyotp()
+    test_invalid_secret()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+测试保险库数据密钥
+验证条目由随机数据密钥加密、旧格式数据在首次解锁时自动迁移
+"""
+
+import sys
+import os
+import json
+import base64
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.encryption import EncryptionManager
+from src.core.journal_store import JournalStore
+from src.core.totp_manager import TOTPManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+
+
+def _write_legacy_vault(password: str, secrets: dict):
+    """按旧格式写入数据文件：每个条目使用独立盐值加密"""
+    entries = []
+    for name, secret in secrets.items():
+        em = EncryptionManager()
+        em.initialize_encryption(password)
+        encrypted_key, salt = em.encrypt_totp_key(secret)
+        entries.append({
+            "name": name,
+            "issuer": "",
+            "encrypted_key": base64.b64encode(encrypted_key).decode(),
+            "salt": base64.b64encode(salt).decode(),
+            "icon": "",
+            "created_time": 0
+        })
+    
+    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"entries": entries, "version": "1.0.0"}, f)
+
+
+def test_new_vault_uses_data_key():
+    """测试新保险库使用数据密钥加密条目"""
+    print("=== 测试1: 新保险库使用数据密钥 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("VaultPassword123")
+    totp_manager.clear_all_entries()
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    
+    # 新增的条目先写入日志，通过存储读取重放后的数据
+    data = JournalStore(DATA_FILE).load_all()
+    
+    print(f"1.1 数据文件版本: {data['version']} (应为: 2.0.0)")
+    assert data["version"] == "2.0.0", "新保险库应使用新格式"
+    assert "wrapped_key" in data["keyring"], "数据文件应包含包装后的数据密钥"
+    assert data["entries"][0]["salt"] is None, "新条目不应再携带独立盐值"
+    
+    # 模拟重新启动后解锁
+    totp_manager2 = TOTPManager()
+    assert not totp_manager2.unlock("WrongPassword"), "错误密码不应解锁"
+    assert totp_manager2.unlock("VaultPassword123"), "正确密码应该解锁"
+    code = totp_manager2.generate_totp(totp_manager2.get_entry("服务A"))
+    print(f"1.2 重新解锁后的代码: {code}")
+    assert code == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "代码应与pyotp一致"
+    print("✅ 新保险库测试通过\n")
+
+
+def test_unlock_derives_once():
+    """测试解锁只运行一次密钥派生"""
+    print("=== 测试2: 解锁只派生一次密钥 ===")
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("SinglePass123")
+    totp_manager.clear_all_entries()
+    for i in range(5):
+        assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+    
+    # 模拟重新启动后解锁，记录派生次数
+    totp_manager2 = TOTPManager()
+    calls = []
+    original = totp_manager2.encryption._derive_key
+    
+    def counting_derive(password, salt, params=None):
+        calls.append(salt)
+        return original(password, salt, params)
+    
+    totp_manager2.encryption._derive_key = counting_derive
+    
+    assert totp_manager2.unlock("SinglePass123"), "正确密码应该解锁"
+    codes = totp_manager2.generate_many()
+    print(f"2.1 解锁并生成 {len(codes)} 个代码的派生次数: {len(calls)} (应为: 1)")
+    assert len(calls) == 1, "解锁应只派生一次密钥"
+    assert all(codes), "所有条目都应生成代码"
+    
+    assert not TOTPManager().unlock("WrongPassword"), "错误密码不应解锁"
+    print("✅ 单次派生测试通过\n")
+
+
+def test_legacy_vault_migration():
+    """测试旧格式数据在首次解锁时迁移"""
+    print("=== 测试3: 旧格式数据迁移 ===")
+    
+    password = "LegacyPassword123"
+    em = EncryptionManager()
+    assert em.set_password(password)
+    secrets = {"旧服务A": "JBSWY3DPEHPK3PXP", "旧服务B": "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ"}
+    _write_legacy_vault(password, secrets)
+    
+    totp_manager = TOTPManager()
+    assert totp_manager.unlock(password), "旧格式数据应该可以解锁"
+    
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    print(f"3.1 迁移后版本: {data['version']} (应为: 2.0.0)")
+    assert data["version"] == "2.0.0", "首次解锁后应迁移到新格式"
+    assert all(entry["salt"] is None for entry in data["entries"]), "迁移后条目不应携带独立盐值"
+    
+    for name, secret in secrets.items():
+        code = totp_manager.generate_totp(totp_manager.get_entry(name))
+        assert code == pyotp.TOTP(secret).now(), f"{name} 迁移后代码应保持不变"
+    print("3.2 迁移后代码全部一致")
+    
+    # 迁移后的数据可以重新解锁
+    assert TOTPManager().unlock(password), "迁移后的数据应该可以重新解锁"
+    print("✅ 旧格式数据迁移测试通过\n")
+    
+    if DATA_FILE.exists():
+        DATA_FILE.unlink()
+
+
+def test_damaged_vault_is_not_overwritten():
+    """测试数据文件损坏时拒绝解锁，且不写入任何数据"""
+    print("=== 测试4: 损坏的数据文件 ===")
+    
+    password = "DamagedPassword123"
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password(password)
+    totp_manager.clear_all_entries()
+    for i in range(3):
+        assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+    
+    # 截断快照（例如磁盘写满或同步工具只复制了一半）
+    journal_file = DATA_FILE.with_suffix(".journal")
+    raw = DATA_FILE.read_bytes()
+    DATA_FILE.write_bytes(raw[:len(raw) // 2])
+    journal = journal_file.read_bytes()
+    
+    totp_manager2 = TOTPManager()
+    assert totp_manager2.has_existing_password(), "损坏的保险库仍应视为已设置密码"
+    assert not totp_manager2.unlock(password), "数据文件无法读取时不应解锁"
+    print(f"4.1 解锁失败原因: {totp_manager2.get_load_error()}")
+    assert totp_manager2.get_load_error(), "应记录数据文件无法读取的原因"
+    assert not totp_manager2.initialize_with_password(password), "也不应重新初始化"
+    assert not totp_manager2.add_entry("新服务", "JBSWY3DPEHPK3PXP"), "不应写入新条目"
+    assert not totp_manager2.clear_all_entries(), "不应写入空快照"
+    
+    assert DATA_FILE.read_bytes() == raw[:len(raw) // 2], "损坏的快照不应被覆盖"
+    assert journal_file.exists() and journal_file.read_bytes() == journal, "日志不应被删除或改动"
+    print("4.2 快照和日志均保持原样")
+    
+    # 恢复快照后可以正常解锁
+    DATA_FILE.write_bytes(raw)
+    totp_manager3 = TOTPManager()
+    assert totp_manager3.unlock(password), "恢复后应可以解锁"
+    assert totp_manager3.get_load_error() is None
+    assert totp_manager3.get_entry_count() == 3, "恢复后条目应完整"
+    print("✅ 损坏的数据文件测试通过\n")
+    
+    totp_manager3.clear_all_entries()
+    for path in (DATA_FILE, journal_file):
+        if path.exists():
+            path.unlink()
+
+
+if __name__ == "__main__":
+    test_new_vault_uses_data_key()
+    test_unlock_derives_once()
+    test_legacy_vault_migration()
+    test_damaged_vault_is_not_overwritten()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+测试快照清单
+验证启动时检查保险库状态只读取清单、清单缺失或过期时自动重建，以及用校验和发现损坏的快照
+"""
+
+import sys
+import os
+import json
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.encryption import EncryptionManager
+from src.core.journal_store import JournalStore
+from src.core.totp_manager import TOTPManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+MANIFEST_FILE = Path("data") / "totp_data.json.manifest"
+
+
+def _create_vault(count: int) -> TOTPManager:
+    """创建包含count个条目的保险库（清空时写入快照）"""
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("ManifestPass123"), "初始化应该成功"
+    with totp_manager.batch():
+        totp_manager.clear_all_entries()
+        for i in range(count):
+            assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+    return totp_manager
+
+
+def test_probe_reads_manifest_only():
+    """测试检查保险库状态只读取清单"""
+    print("=== 测试1: 只读取清单 ===")
+    
+    _create_vault(200)
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    print(f"1.1 清单大小: {MANIFEST_FILE.stat().st_size} 字节，快照大小: {DATA_FILE.stat().st_size} 字节")
+    assert manifest["version"] == "2.0.0" and manifest["entry_count"] == 200, "清单应记录版本和条目数"
+    assert manifest["kdf"]["algorithm"] and "salt" not in manifest["kdf"], "清单应记录KDF参数但不含盐值"
+    assert manifest["size"] == DATA_FILE.stat().st_size, "清单应记录快照大小"
+    
+    store = JournalStore(DATA_FILE)
+    
+    def fail_read(secrets=True):
+        raise AssertionError("检查状态时不应读取快照")
+    
+    store._read_snapshot = fail_read
+    assert store.has_data(), "有清单时应直接判断为已有数据"
+    
+    # 没有配置密码记录时也只通过存储检查
+    em = EncryptionManager(store=store)
+    em.config.set("password.is_set", False)
+    assert em.has_encrypted_data(), "应通过清单判断已有加密数据"
+    em.config.set("password.is_set", True)
+    print("✅ 只读取清单测试通过\n")
+
+
+def test_manifest_rebuild():
+    """测试清单缺失或过期时重建"""
+    print("=== 测试2: 重建清单 ===")
+    
+    _create_vault(3)
+    MANIFEST_FILE.unlink()
+    assert JournalStore(DATA_FILE).has_data(), "清单缺失时应读取快照判断"
+    assert MANIFEST_FILE.exists(), "读取快照后应重建清单"
+    
+    # 手动替换快照（例如从备份恢复）后清单大小不符，视为过期
+    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"entries": []}, f)
+    assert not JournalStore(DATA_FILE).has_data(), "过期的清单不应被采用"
+    manifest = JournalStore(DATA_FILE).read_manifest()
+    print(f"2.1 重建后的清单: {manifest}")
+    assert manifest["version"] is None and manifest["entry_count"] == 0, "清单应按新快照重建"
+    
+    DATA_FILE.unlink()
+    assert JournalStore(DATA_FILE).read_manifest() is None, "没有快照时不应返回清单"
+    print("✅ 重建清单测试通过\n")
+
+
+def test_checksum_detects_corruption():
+    """测试校验和发现损坏的快照"""
+    print("=== 测试3: 校验和 ===")
+    
+    _create_vault(3)
+    raw = DATA_FILE.read_bytes()
+    # 改动一个字符但保持文件大小和JSON格式不变
+    corrupted = raw.replace("服务1".encode('utf-8'), "服务9".encode('utf-8'), 1)
+    assert corrupted != raw and len(corrupted) == len(raw)
+    DATA_FILE.write_bytes(corrupted)
+    
+    try:
+        JournalStore(DATA_FILE).load_all()
+        assert False, "校验和不符时应抛出ValueError"
+    except ValueError as e:
+        print(f"3.1 读取损坏的快照: {e}")
+    
+    # 校验和不符时拒绝解锁，也不写入任何数据
+    totp_manager = TOTPManager()
+    assert not totp_manager.unlock("ManifestPass123"), "快照损坏时不应解锁"
+    print(f"3.2 解锁失败原因: {totp_manager.get_load_error()}")
+    assert "校验和" in totp_manager.get_load_error(), "应报告校验和错误"
+    assert not totp_manager.clear_all_entries(), "快照损坏时不应写入"
+    assert DATA_FILE.read_bytes() == corrupted, "损坏的快照不应被覆盖"
+    
+    DATA_FILE.write_bytes(raw)
+    assert len(JournalStore(DATA_FILE).load_all()["entries"]) == 3, "恢复后应可以正常读取"
+    assert totp_manager.unlock("ManifestPass123") and totp_manager.get_entry_count() == 3, "恢复后应可以解锁"
+    print("✅ 校验和测试通过\n")
+    
+    # 清理
+    for path in (DATA_FILE, DATA_FILE.with_suffix(".journal"), MANIFEST_FILE):
+        if path.exists():
+            path.unlink()
+
+
+if __name__ == "__main__":
+    test_probe_reads_manifest_only()
+    test_manifest_rebuild()
+    test_checksum_detects_corruption()
+    print("🎉 所有测试通过！")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试保险库存储接口
+对内存、JSON日志、二进制和SQLite四种后端运行相同的检查，并验证TOTPManager可以使用内存存储
+"""
+
+import sys
+import os
+import shutil
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from src.core.binary_store import BinaryVaultStore
+from src.core.journal_store import JournalStore
+from src.core.sqlite_store import SqliteStore
+from src.core.totp_manager import TOTPManager
+from src.core.vault_store import MemoryVaultStore
+
+STORE_DIR = Path("data") / "store_test"
+
+
+def _entry(entry_id: str, name: str) -> dict:
+    return {"id": entry_id, "name": name, "issuer": "", "encrypted_key": "YWJj", "salt": None,
+            "icon": "", "created_time": 1.0}
+
+
+def _check_store(store):
+    """存储接口的通用检查"""
+    assert not store.has_data(), "新存储不应有数据"
+    keyring = {"kdf": {"salt": "c2FsdA==", "iterations": 1}, "wrapped_key": "key"}
+    assert store.write_snapshot({"entries": [_entry("a", "A"), _entry("b", "B")],
+                                 "version": "2.0.0", "keyring": keyring})
+    assert store.has_data(), "写入快照后应有数据"
+    
+    assert store.put(_entry("c", "C"))
+    assert store.put(dict(_entry("a", "A2")))
+    assert store.delete("b")
+    assert store.batch([{"op": "put", "entry": _entry("d", "D")}, {"op": "delete", "id": "c"}])
+    
+    assert store.get("a")["name"] == "A2", "更新后的条目应可按ID读取"
+    assert store.get("b") is None, "删除的条目不应再能读取"
+    assert [entry["name"] for entry in store.iterate()] == ["A2", "D"], "遍历顺序应保持插入顺序"
+    
+    data = store.load_all()
+    assert data["version"] == "2.0.0" and data["keyring"] == keyring, "应保留版本和密钥环"
+    assert [entry["id"] for entry in data["entries"]] == ["a", "d"]
+    
+    index = store.load_index()
+    assert index["keyring"] == keyring, "索引应包含密钥环"
+    assert [entry["name"] for entry in index["entries"]] == ["A2", "D"]
+    assert all("encrypted_key" not in entry for entry in index["entries"]), "索引不应包含密文"
+    found = store.get_many(["d", "b", "a"])
+    assert sorted(found) == ["a", "d"], "批量读取应跳过不存在的ID"
+    assert found["a"]["encrypted_key"] == "YWJj" and found["a"]["name"] == "A2", "批量读取应返回完整条目"
+
+
+def test_store_backends():
+    """测试四种存储后端"""
+    print("=== 测试1: 存储后端 ===")
+    
+    shutil.rmtree(STORE_DIR, ignore_errors=True)
+    STORE_DIR.mkdir(parents=True)
+    try:
+        backends = {
+            "memory": MemoryVaultStore(),
+            "journal": JournalStore(STORE_DIR / "vault.json"),
+            "binary": BinaryVaultStore(STORE_DIR / "vault.vault"),
+            "sqlite": SqliteStore(STORE_DIR / "vault.db"),
+        }
+        for name, store in backends.items():
+            print(f"1.{list(backends).index(name) + 1} 检查 {name} 后端...")
+            _check_store(store)
+        
+        # 重新打开文件后端，数据应保持一致
+        backends["sqlite"].close()
+        for store in (JournalStore(STORE_DIR / "vault.json"), BinaryVaultStore(STORE_DIR / "vault.vault"),
+                      SqliteStore(STORE_DIR / "vault.db")):
+            assert [entry["name"] for entry in store.iterate()] == ["A2", "D"], "重新打开后数据应一致"
+            if isinstance(store, SqliteStore):
+                store.close()
+        print("✅ 存储后端测试通过\n")
+    finally:
+        shutil.rmtree(STORE_DIR, ignore_errors=True)
+
+
+def test_manager_with_memory_store():
+    """测试TOTPManager使用内存存储"""
+    print("=== 测试2: TOTPManager使用内存存储 ===")
+    
+    store = MemoryVaultStore()
+    totp_manager = TOTPManager(store=store)
+    assert totp_manager.initialize_with_password("MemoryPass123"), "初始化应该成功"
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.has_existing_password(), "应检测到已有保险库"
+    
+    # 同一个存储上的新实例可以解锁
+    totp_manager2 = TOTPManager(store=store)
+    assert totp_manager2.unlock("MemoryPass123"), "应该可以解锁"
+    code = totp_manager2.generate_totp(totp_manager2.get_entry("服务A"))
+    print(f"2.1 内存存储中的代码: {code}")
+    assert code == pyotp.TOTP("JBSWY3DPEHPK3PXP").now(), "代码应与pyotp一致"
+    print("✅ 内存存储测试通过\n")
+
+
+if __name__ == "__main__":
+    test_store_backends()
+    test_manager_with_memory_store()
+    print("🎉 所有测试通过！")
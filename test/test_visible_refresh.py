@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试只刷新可见行的代码
+验证每秒刷新只为视口中的行和当前条目生成代码，滚动和过滤后立即补上新出现的行
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from src.core.totp_manager import TOTPManager
+from src.core.vault_store import MemoryVaultStore
+from src.ui.entry_list import CODE_ROLE
+from src.ui.main_window import MainWindow
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def _create_window(count: int):
+    """创建已解锁的主窗口（跳过密码对话框）"""
+    totp_manager = TOTPManager(store=MemoryVaultStore())
+    assert totp_manager.initialize_with_password("Visible12345"), "初始化应该成功"
+    totp_manager.add_entries([(f"服务{i}", "JBSWY3DPEHPK3PXP", "GitHub") for i in range(count)])
+    
+    original = MainWindow.check_initialization
+    MainWindow.check_initialization = lambda self: None
+    try:
+        window = MainWindow(totp_manager)
+    finally:
+        MainWindow.check_initialization = original
+    window.resize(900, 600)
+    window.show()
+    window.load_entries()
+    app.processEvents()
+    
+    # 记录每次传给管理器的条目数量
+    calls = []
+    generate_many = totp_manager.generate_many
+    
+    def counting_generate(entries=None):
+        calls.append(len(entries))
+        return generate_many(entries)
+    
+    totp_manager.generate_many = counting_generate
+    return window, calls
+
+
+def test_visible_refresh():
+    """测试刷新只计算可见行"""
+    print("=== 测试只刷新可见行 ===")
+    
+    window, calls = _create_window(2000)
+    visible = window.visible_indexes()
+    print(f"1. 可见行: {len(visible)} / 2000")
+    assert 0 < len(visible) < 20, "视口中只应有少量可见行"
+    assert visible[0].row() == 0, "初始时应从第一行开始可见"
+    
+    print("2. 定时刷新...")
+    window.update_all_codes()
+    print(f"   生成代码的条目数: {calls} (应为: [{len(visible)}])")
+    assert calls == [len(visible)], "刷新只应为可见行生成代码"
+    assert all(index.data(CODE_ROLE) for index in visible), "可见行都应有代码"
+    assert window.entry_filter.index(1000, 0).data(CODE_ROLE) is None, "不可见的行不应生成代码"
+    
+    print("3. 选中条目后滚动到别处...")
+    window.entry_list.setCurrentIndex(window.entry_filter.index(0, 0))
+    current_code = window.code_display.text()
+    calls.clear()
+    window.entry_list.verticalScrollBar().setValue(window.entry_list.verticalScrollBar().maximum() // 2)
+    scrolled = window.visible_indexes()
+    print(f"   滚动后可见行: {scrolled[0].row()}-{scrolled[-1].row()}，补充的条目数: {calls}")
+    assert scrolled[0].row() > 0, "滚动后可见行应改变"
+    assert sum(calls) <= len(scrolled), "滚动只应为新出现的行生成代码"
+    assert all(index.data(CODE_ROLE) for index in scrolled), "滚动后新出现的行应立即有代码"
+    
+    print("4. 当前条目不在视口中时只额外计算一次...")
+    calls.clear()
+    window.update_all_codes()
+    print(f"   生成代码的条目数: {calls} (应为: [{len(scrolled) + 1}])")
+    assert calls == [len(scrolled) + 1], "刷新应为可见行和当前条目各计算一次"
+    assert window.code_display.text() == current_code, "详情视图应显示当前条目的代码"
+    assert window.entry_filter.index(0, 0).data(CODE_ROLE) is None, "滚出视口的行的旧代码应被丢弃"
+    
+    print("5. 过滤后补上匹配的行...")
+    calls.clear()
+    window.filter_entries("服务1999")
+    print(f"   过滤后行数: {window.entry_filter.rowCount()}，补充的条目数: {calls}")
+    assert window.entry_filter.rowCount() == 1
+    assert window.entry_filter.index(0, 0).data(CODE_ROLE), "过滤后可见的行应立即有代码"
+    
+    window.hide()
+    print("✅ 只刷新可见行测试通过\n")
+
+
+if __name__ == "__main__":
+    test_visible_refresh()
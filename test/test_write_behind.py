@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试延迟写入
+验证连续修改在去抖后合并为一次写入、flush立即写入、锁定时写入，以及写入失败时报告并保留修改
+"""
+
+import sys
+import os
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.totp_manager import TOTPManager
+from src.utils.config import ConfigManager
+
+DATA_FILE = Path("data") / "totp_data.json"
+JOURNAL_FILE = Path("data") / "totp_data.journal"
+
+
+def _count_batches(totp_manager: TOTPManager) -> list:
+    """包装存储的batch，记录每次写入的记录数"""
+    calls = []
+    original = totp_manager.store.batch
+    
+    def counting_batch(records):
+        calls.append(len(records))
+        return original(records)
+    
+    totp_manager.store.batch = counting_batch
+    return calls
+
+
+def _create_manager() -> TOTPManager:
+    """创建启用延迟写入的管理器"""
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set("storage.write_behind", True)
+        config.set("storage.write_behind_delay_ms", 100)
+    totp_manager = TOTPManager()
+    assert totp_manager.initialize_with_password("WriteBehind123"), "初始化应该成功"
+    totp_manager.clear_all_entries()
+    assert totp_manager.flush(), "清空后的快照应该写入成功"
+    return totp_manager
+
+
+def test_debounced_flush():
+    """测试连续修改合并为一次写入"""
+    print("=== 测试1: 去抖合并写入 ===")
+    
+    totp_manager = _create_manager()
+    calls = _count_batches(totp_manager)
+    
+    for i in range(20):
+        assert totp_manager.add_entry(f"服务{i}", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.update_entry("服务0", "服务0改")
+    print(f"1.1 修改后立即检查写入次数: {len(calls)} (应为: 0)")
+    assert calls == [], "去抖时间内不应写入"
+    assert totp_manager.has_pending_changes(), "应有待写入的修改"
+    
+    deadline = time.monotonic() + 5
+    while totp_manager.has_pending_changes() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    print(f"1.2 去抖结束后的写入: {calls} (应为: [21])")
+    assert calls == [21], "连续修改应合并为一次写入"
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("WriteBehind123"), "应该可以解锁"
+    assert reloaded.get_entry_count() == 20 and reloaded.get_entry("服务0改"), "写入的数据应完整"
+    print("✅ 去抖合并写入测试通过\n")
+
+
+def test_explicit_flush_and_lock():
+    """测试flush和锁定立即写入"""
+    print("=== 测试2: 立即写入 ===")
+    
+    totp_manager = _create_manager()
+    calls = _count_batches(totp_manager)
+    
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.flush(), "flush应该成功"
+    print(f"2.1 flush后的写入: {calls} (应为: [1])")
+    assert calls == [1] and not totp_manager.has_pending_changes()
+    assert totp_manager.flush() and calls == [1], "没有修改时flush不应写入"
+    
+    assert totp_manager.add_entry("服务B", "JBSWY3DPEHPK3PXP")
+    totp_manager.lock()
+    print(f"2.2 锁定后的写入: {calls} (应为: [1, 1])")
+    assert calls == [1, 1], "锁定时应写入待保存的修改"
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("WriteBehind123"), "应该可以解锁"
+    assert reloaded.get_entry("服务B") is not None, "锁定前的修改应已保存"
+    print("✅ 立即写入测试通过\n")
+
+
+def test_flush_failure():
+    """测试写入失败时报告并保留修改"""
+    print("=== 测试3: 写入失败 ===")
+    
+    totp_manager = _create_manager()
+    errors = []
+    totp_manager.flush_error_callback = errors.append
+    original = totp_manager.store.batch
+    totp_manager.store.batch = lambda records: False
+    
+    assert totp_manager.add_entry("服务A", "JBSWY3DPEHPK3PXP")
+    assert not totp_manager.flush(), "写入失败时flush应返回False"
+    print(f"3.1 错误报告: {errors}")
+    assert len(errors) == 1, "写入失败应通过回调报告"
+    assert totp_manager.has_pending_changes(), "写入失败的修改应保留以便重试"
+    
+    totp_manager.store.batch = original
+    assert totp_manager.add_entry("服务B", "JBSWY3DPEHPK3PXP")
+    assert totp_manager.flush(), "恢复后重试应该成功"
+    
+    reloaded = TOTPManager()
+    assert reloaded.unlock("WriteBehind123"), "应该可以解锁"
+    assert reloaded.get_entry("服务A") and reloaded.get_entry("服务B"), "重试后两次修改都应保存"
+    print("✅ 写入失败测试通过\n")
+    
+    # 清理
+    config = ConfigManager.shared()
+    with config.transaction():
+        config.set("storage.write_behind", False)
+        config.set("storage.write_behind_delay_ms", 500)
+    for path in (DATA_FILE, JOURNAL_FILE):
+        if path.exists():
+            path.unlink()
+
+
+if __name__ == "__main__":
+    test_debounced_flush()
+    test_explicit_flush_and_lock()
+    test_flush_failure()
+    print("🎉 所有测试通过！")